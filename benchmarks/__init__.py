@@ -0,0 +1,5 @@
+"""
+Benchmarks for the PCAP Hex Editor.
+
+Run with python -m benchmarks.run; see benchmarks/run.py.
+"""
@@ -0,0 +1,108 @@
+"""
+Synthetic capture generator for the benchmarks
+
+Writes classic pcap files of any size with a deterministic mix of
+protocols: TCP and UDP over IPv4 and IPv6, VLAN-tagged traffic, ICMP, ARP
+and a share of jumbo frames.  Packets are assembled from struct templates
+rather than scapy so that multi-million packet captures are quick to
+produce; checksums are left zero.
+
+    python -m benchmarks.generate synthetic.pcap 1000000 --seed 1
+"""
+
+import argparse
+import random
+import struct
+
+PCAP_GLOBAL_HEADER = struct.pack("<IHHiIII", 0xa1b2c3d4, 2, 4, 0, 0, 65535, 1)
+RECORD_HEADER = struct.Struct("<IIII")
+
+JUMBO_SIZE = 9000
+START_TIME = 1700000000.0
+
+# Protocol mix, as (kind, weight)
+MIX = (("tcp4", 45), ("udp4", 25), ("tcp6", 8), ("udp6", 6), ("vlan", 8), ("icmp", 4), ("arp", 4))
+
+
+def _ethernet(rng, ethertype):
+    return rng.randbytes(6) + rng.randbytes(6) + struct.pack(">H", ethertype)
+
+
+def _ipv4(rng, proto, payload_len):
+    src = bytes([10, rng.randrange(256), rng.randrange(256), rng.randrange(1, 255)])
+    dst = bytes([192, 168, rng.randrange(256), rng.randrange(1, 255)])
+    return struct.pack(">BBHHHBBH4s4s", 0x45, 0, 20 + payload_len, rng.randrange(65536), 0x4000,
+                       64, proto, 0, src, dst)
+
+
+def _ipv6(rng, proto, payload_len):
+    return (struct.pack(">IHBB", 0x60000000, payload_len, proto, 64)
+            + b"\xfd\x00" + rng.randbytes(14) + b"\xfd\x00" + rng.randbytes(14))
+
+
+def _tcp(rng, payload_len):
+    flags = rng.choice((0x02, 0x12, 0x10, 0x18, 0x11))
+    return struct.pack(">HHIIBBHHH", rng.randrange(1024, 65536), rng.choice((80, 443, 22, 8080)),
+                       rng.getrandbits(32), rng.getrandbits(32), 5 << 4, flags, 65535, 0, 0)
+
+
+def _udp(rng, payload_len):
+    return struct.pack(">HHHH", rng.randrange(1024, 65536), rng.choice((123, 514, 5060, 4789)),
+                       8 + payload_len, 0)
+
+
+def make_packet(rng, payloads, jumbo_ratio=0.01):
+    """Bytes of one random packet of the mix."""
+    kind = rng.choices([k for k, _ in MIX], [w for _, w in MIX])[0]
+    if kind == "arp":
+        return _ethernet(rng, 0x0806) + struct.pack(">HHBBH", 1, 0x0800, 6, 4, rng.choice((1, 2))) \
+            + rng.randbytes(6) + rng.randbytes(4) + bytes(6) + rng.randbytes(4) + bytes(18)
+    if rng.random() < jumbo_ratio:
+        size = rng.randrange(JUMBO_SIZE // 2, JUMBO_SIZE - 100)
+    else:
+        size = int(rng.paretovariate(1.2) * 40) % 1400
+    start = rng.randrange(len(payloads) - size)
+    payload = payloads[start:start + size]
+    if kind == "icmp":
+        icmp = struct.pack(">BBHHH", 8, 0, 0, rng.randrange(65536), rng.randrange(65536)) + payload
+        return _ethernet(rng, 0x0800) + _ipv4(rng, 1, len(icmp)) + icmp
+    transport = _tcp if kind in ("tcp4", "tcp6") else _udp
+    proto = 6 if transport is _tcp else 17
+    l4 = transport(rng, len(payload)) + payload
+    if kind in ("tcp6", "udp6"):
+        return _ethernet(rng, 0x86DD) + _ipv6(rng, proto, len(l4)) + l4
+    if kind == "vlan":
+        return (_ethernet(rng, 0x8100) + struct.pack(">HH", rng.randrange(1, 4095), 0x0800)
+                + _ipv4(rng, proto, len(l4)) + l4)
+    return _ethernet(rng, 0x0800) + _ipv4(rng, proto, len(l4)) + l4
+
+
+def generate_capture(filename, count, seed=0, jumbo_ratio=0.01):
+    """Write count packets to filename; the same seed gives the same file."""
+    rng = random.Random(seed)
+    payloads = rng.randbytes(1 << 16)
+    timestamp = START_TIME
+    pack = RECORD_HEADER.pack
+    with open(filename, "wb") as f:
+        f.write(PCAP_GLOBAL_HEADER)
+        for _ in range(count):
+            data = make_packet(rng, payloads, jumbo_ratio)
+            timestamp += rng.expovariate(2000.0)
+            sec = int(timestamp)
+            f.write(pack(sec, int((timestamp - sec) * 1000000), len(data), len(data)))
+            f.write(data)
+    return filename
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic pcap file for benchmarks.")
+    parser.add_argument("output", help="pcap file to write")
+    parser.add_argument("count", type=int, help="number of packets")
+    parser.add_argument("--seed", type=int, default=0, help="random seed (default 0)")
+    parser.add_argument("--jumbo-ratio", type=float, default=0.01, help="share of jumbo frames (default 0.01)")
+    args = parser.parse_args(argv)
+    generate_capture(args.output, args.count, args.seed, args.jumbo_ratio)
+
+
+if __name__ == "__main__":
+    main()
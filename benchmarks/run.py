@@ -0,0 +1,227 @@
+"""
+Benchmarks of the PCAP Hex Editor on synthetic captures
+
+Each capture size is measured in a fresh interpreter, so that peak RSS and
+the scapy import are not shared between sizes.  The app is driven
+headlessly with Textual's pilot:
+
+    load_s            PacketStore construction (record index only)
+    mount_s           app start up to a mounted, painted packet list
+    select_*_ms       row selection to rendered hex, command and finished
+                      dissection (which runs in a worker thread)
+    keystroke_*_ms    one hex digit typed into HexEditorPanel.on_key, rendered
+    save_mb_s         action_save_pcap throughput after one committed edit
+    peak_rss_mb       peak resident set size of the process
+
+Results are written as JSON; --compare checks them against an earlier run:
+
+    python -m benchmarks.run --sizes 1k 100k 1M --output results.json
+    python -m benchmarks.run --sizes 1k 100k 1M --compare results.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import time
+
+from .generate import generate_capture
+
+DEFAULT_SIZES = ["1k", "10k", "100k", "1M"]
+SCREEN_SIZE = (160, 48)
+SELECT_SAMPLES = 50
+KEYSTROKE_SAMPLES = 64
+
+# Metrics compared with --compare; True if larger is better
+COMPARED = {
+    "load_s": False,
+    "mount_s": False,
+    "select_p50_ms": False,
+    "select_p95_ms": False,
+    "keystroke_p50_ms": False,
+    "keystroke_p95_ms": False,
+    "save_mb_s": True,
+    "peak_rss_mb": False,
+}
+
+
+def parse_size(text):
+    """Packet count from text such as 1000, 10k or 10M."""
+    multiplier = {"k": 1000, "m": 1000000}.get(text[-1:].lower(), 1)
+    return int(text[:-1] if multiplier > 1 else text) * multiplier
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _percentiles(samples):
+    samples = sorted(s * 1000 for s in samples)
+    return statistics.median(samples), samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+
+
+async def _drive_app(filename, workdir, result):
+    from textual import events
+    from pcap_hex_editor.capture import scapy_loaded
+    from pcap_hex_editor.main import PcapHexEditorApp
+
+    app = PcapHexEditorApp(filename)
+    start = time.perf_counter()
+    async with app.run_test(size=SCREEN_SIZE) as pilot:
+        await pilot.pause()
+        result["mount_s"] = time.perf_counter() - start
+        while not scapy_loaded():
+            await pilot.pause(0.01)
+        await pilot.pause()
+        result["scapy_ready_s"] = time.perf_counter() - start
+
+        count = len(app.packets)
+        rng = random.Random(count)
+        rows = [rng.randrange(count) for _ in range(SELECT_SAMPLES)]
+        samples = []
+        for row in rows:
+            start = time.perf_counter()
+            app.packet_list_panel.select(row)
+            await pilot.pause()
+            while app.dissection_panel.dissecting:
+                await pilot.pause(0.001)
+            samples.append(time.perf_counter() - start)
+        result["select_p50_ms"], result["select_p95_ms"] = _percentiles(samples)
+
+        app.packet_list_panel.select(0)
+        await pilot.pause()
+        panel = app.hex_editor_panel
+        samples = []
+        for i in range(KEYSTROKE_SAMPLES):
+            digit = "0123456789abcdef"[i % 16]
+            start = time.perf_counter()
+            panel.on_key(events.Key(digit, digit))
+            await pilot.pause()
+            samples.append(time.perf_counter() - start)
+        result["keystroke_p50_ms"], result["keystroke_p95_ms"] = _percentiles(samples)
+        panel.on_key(events.Key("enter", None))
+        await pilot.pause()
+
+        app.save_filenames = [os.path.join(workdir, f"saved_{i}.pcap") for i in range(len(app.pcap_files))]
+        start = time.perf_counter()
+        app.action_save_pcap()
+        elapsed = time.perf_counter() - start
+        if app.status_message.startswith("Save failed"):
+            raise RuntimeError(app.status_message)
+        size = sum(os.path.getsize(name) for name in app.save_filenames)
+        result["save_s"] = elapsed
+        result["save_mb_s"] = size / (1024 * 1024) / elapsed
+        for name in app.save_filenames:
+            os.remove(name)
+
+
+def measure(filename, workdir):
+    """Measurements of one capture, taken in this process."""
+    from pcap_hex_editor.capture import PacketStore
+
+    result = {"file_mb": os.path.getsize(filename) / (1024 * 1024)}
+    start = time.perf_counter()
+    store = PacketStore(filename)
+    result["load_s"] = time.perf_counter() - start
+    result["packets"] = len(store)
+    store.close()
+    result["load_rss_mb"] = _peak_rss_mb()
+    asyncio.run(_drive_app(filename, workdir, result))
+    result["peak_rss_mb"] = _peak_rss_mb()
+    return result
+
+
+def capture_for(count, workdir, seed=0):
+    """Synthetic capture of count packets in workdir, generated once per seed."""
+    filename = os.path.join(workdir, f"synthetic_{count}_{seed}.pcap")
+    if not os.path.exists(filename):
+        generate_capture(filename + ".tmp", count, seed)
+        os.replace(filename + ".tmp", filename)
+    return filename
+
+
+def run_size(count, workdir, seed=0):
+    """Measure a capture of count packets in a fresh interpreter."""
+    filename = capture_for(count, workdir, seed)
+    output = os.path.join(workdir, f"result_{count}.json")
+    subprocess.run([sys.executable, "-m", "benchmarks.run", "--measure", filename,
+                    "--workdir", workdir, "--output", output], check=True)
+    with open(output) as f:
+        return json.load(f)
+
+
+def compare(results, baseline, tolerance):
+    """Descriptions of the metrics of results that regressed from baseline."""
+    regressions = []
+    for size, metrics in results["sizes"].items():
+        old = baseline.get("sizes", {}).get(size)
+        if not old:
+            continue
+        for name, larger_is_better in COMPARED.items():
+            if name not in metrics or not old.get(name):
+                continue
+            change = metrics[name] / old[name] - 1
+            if (-change if larger_is_better else change) > tolerance:
+                regressions.append(f"{size}: {name} {old[name]:.4g} -> {metrics[name]:.4g} ({change:+.0%})")
+    return regressions
+
+
+def environment():
+    import textual
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpus": os.cpu_count(),
+        "textual": getattr(textual, "__version__", None),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the PCAP Hex Editor on synthetic captures.")
+    parser.add_argument("--sizes", nargs="+", default=DEFAULT_SIZES,
+                        help="packet counts, e.g. 1k 100k 10M (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0, help="generator seed (default 0)")
+    parser.add_argument("--workdir", default="benchmark_data", help="directory for generated captures")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file for the results")
+    parser.add_argument("--compare", metavar="BASELINE", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="relative change reported as a regression (default 0.2)")
+    parser.add_argument("--measure", metavar="PCAP", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    os.makedirs(args.workdir, exist_ok=True)
+
+    if args.measure:
+        with open(args.output, "w") as f:
+            json.dump(measure(args.measure, args.workdir), f)
+        return 0
+
+    results = {"environment": environment(), "seed": args.seed, "sizes": {}}
+    for size in args.sizes:
+        count = parse_size(size)
+        print(f"Benchmarking {count} packets...", file=sys.stderr)
+        results["sizes"][str(count)] = metrics = run_size(count, args.workdir, args.seed)
+        print("  " + ", ".join(f"{k}={v:.4g}" for k, v in metrics.items()), file=sys.stderr)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -10,4 +10,13 @@ __author__ = "Christos Rikoudis <ricudis.christos@gmail.com>"
 __description__ = "A PCAP Hex Editor with Textual UI"
 
 # Define what should be available when importing the package
-__all__ = ["PcapHexEditorApp"] 
\ No newline at end of file
+__all__ = ["PcapHexEditorApp"]
+
+
+def __getattr__(name):
+    # The app is imported on first use: worker processes and batch runs
+    # import the capture modules without Textual and the UI
+    if name == "PcapHexEditorApp":
+        from .main import PcapHexEditorApp
+        return PcapHexEditorApp
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
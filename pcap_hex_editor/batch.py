@@ -0,0 +1,358 @@
+"""
+Headless batch editing of PCAP files.
+
+Applies an edit script to a capture without starting the Textual UI.  The
+capture is streamed record by record from the input to the output, so
+memory use depends on the edit script and not on the capture size, and the
+work can be split across worker processes by record range.
+
+An edit script has one edit per line; blank lines and lines starting with
+'#' are ignored.  Rows are 0-based record numbers of the input capture, and
+the edits of a row are applied in script order:
+
+    timestamp ROW SECONDS          set the record timestamp, to the precision
+                                   of the capture
+    patch ROW OFFSET HEXBYTES      overwrite bytes of the record at OFFSET
+    command ROW EXPRESSION         replace the record with a scapy expression;
+                                   the current packet is available as pkt
+    insert ROW SECONDS EXPRESSION  insert a packet before ROW (ROW may be the
+                                   record count to append at the end)
+
+With --fixup, the checksums of each edited record, and its IP and UDP
+lengths if its size changed, are brought up to date after its edits, see
+capture.fixup.
+
+Usage:
+    pcap-hex-editor batch INPUT SCRIPT -o OUTPUT [-j JOBS] [--fixup]
+"""
+
+import argparse
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal, InvalidOperation
+from .capture.fixup import fix_packet
+from .capture.scapy_loader import load_scapy
+from .capture.pcap_index import (
+    parse_global_header, iter_records, PCAP_GLOBAL_HEADER_LEN, PCAP_RECORD_HEADER_LEN,
+)
+
+EDIT_OPS = ("timestamp", "patch", "command", "insert")
+
+# Output buffer size; unchanged records are passed through in these blocks
+BUFFER_SIZE = 1 << 20
+
+
+def _seconds(text):
+    """Exact decimal value of a timestamp of the script."""
+    try:
+        seconds = Decimal(text)
+    except InvalidOperation:
+        raise ValueError(f"invalid timestamp {text!r}") from None
+    if not seconds.is_finite() or seconds < 0:
+        raise ValueError(f"invalid timestamp {text!r}")
+    return seconds
+
+
+def parse_script(lines):
+    """Edits of a script as {row: [(op, args...)]}, in script order per row."""
+    edits = {}
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        parts = line.split(None, 1)
+        op = parts[0]
+        if op not in EDIT_OPS or len(parts) < 2:
+            raise ValueError(f"line {lineno}: expected one of {', '.join(EDIT_OPS)} and a row")
+        try:
+            if op == "timestamp":
+                row, seconds = parts[1].split()
+                edit = (op, _seconds(seconds))
+            elif op == "patch":
+                row, offset, hexbytes = parts[1].split()
+                edit = (op, int(offset, 0), bytes.fromhex(hexbytes))
+            elif op == "command":
+                row, expression = parts[1].split(None, 1)
+                edit = (op, expression)
+            else:
+                row, seconds, expression = parts[1].split(None, 2)
+                edit = (op, _seconds(seconds), expression)
+            row = int(row)
+        except ValueError as e:
+            raise ValueError(f"line {lineno}: malformed {op} edit: {e}") from None
+        if row < 0:
+            raise ValueError(f"line {lineno}: negative row {row}")
+        edits.setdefault(row, []).append(edit)
+    return edits
+
+
+class RecordEditor:
+    """Applies the edits of single records and serializes them."""
+
+    def __init__(self, endian, nsec, linktype, fixup=False):
+        self.endian = endian
+        self.header = struct.Struct(endian + "IIII")
+        self.scale = 1000000000 if nsec else 1000000
+        self.linktype = linktype
+        self.fixup = fixup
+        # Names of scapy.all for expressions; scapy is only imported by
+        # scripts that have command or insert edits
+        self.namespace = None
+
+    def evaluate(self, expression, data=None):
+        """Bytes of a scapy expression; pkt is the dissected data, if given."""
+        if self.namespace is None:
+            self.namespace = dict(vars(load_scapy()))
+        from scapy.all import conf, Raw
+        namespace = self.namespace
+        namespace.pop("pkt", None)
+        if data is not None:
+            cls = conf.l2types.get(self.linktype, Raw)
+            try:
+                namespace["pkt"] = cls(data)
+            except Exception:
+                namespace["pkt"] = Raw(load=data)
+        packet = eval(expression, namespace)
+        if not hasattr(packet, "show"):
+            raise ValueError(f"{expression!r} did not return a packet")
+        return bytes(packet)
+
+    def split(self, seconds):
+        """(sec, frac) of a record header for a decimal timestamp."""
+        return divmod(round(seconds * self.scale), self.scale)
+
+    def record(self, sec, frac, data, wirelen=0):
+        return self.header.pack(sec, frac, len(data), max(len(data), wirelen)) + data
+
+    def edit(self, sec, frac, wirelen, data, edits):
+        """Inserted records followed by the edited record, as bytes.
+
+        The record keeps its header timestamp unless an edit sets it.
+        """
+        out = []
+        original = data
+        data = bytearray(data)
+        spans = []
+        for edit in edits:
+            op = edit[0]
+            if op == "timestamp":
+                sec, frac = self.split(edit[1])
+            elif op == "patch":
+                offset, chunk = edit[1], edit[2]
+                if offset + len(chunk) > len(data):
+                    raise ValueError(f"patch at {offset} runs past the end of a {len(data)} byte packet")
+                data[offset:offset + len(chunk)] = chunk
+                spans.append((offset, offset + len(chunk)))
+            elif op == "command":
+                data = bytearray(self.evaluate(edit[1], bytes(data)))
+                # Scapy keeps the length and checksum fields of a dissected packet
+                spans = [(0, len(data))]
+            else:
+                out.append(self.inserted(edit))
+        if self.fixup and len(data) != len(original):
+            if wirelen <= len(original):
+                fix_packet(data, self.linktype)
+        elif self.fixup and spans:
+            fix_packet(data, self.linktype, original, spans, lengths=False)
+        if any(edit[0] != "insert" for edit in edits):
+            out.append(self.record(sec, frac, bytes(data), wirelen))
+        else:
+            # Only inserts before this row; keep the record bit for bit
+            out.append(None)
+        return out
+
+    def inserted(self, edit):
+        return self.record(*self.split(edit[1]), self.evaluate(edit[2]))
+
+
+def rewrite_records(f, out, editor, edits, first=0, count=None):
+    """Stream count records from f to out, applying edits keyed by row.
+
+    Returns the number of records read.
+    """
+    write = out.write
+    pack = editor.header.pack
+    row = first
+    for sec, frac, caplen, wirelen, data in iter_records(f, editor.endian, count):
+        record_edits = edits.get(row)
+        if record_edits is None:
+            write(pack(sec, frac, caplen, wirelen))
+            write(data)
+        else:
+            for chunk in editor.edit(sec, frac, wirelen, data, record_edits):
+                if chunk is None:
+                    write(pack(sec, frac, caplen, wirelen))
+                    write(data)
+                else:
+                    write(chunk)
+        row += 1
+    return row - first
+
+
+def _rewrite_range(filename, part, endian, nsec, linktype, offset, first, count, edits, fixup=False):
+    """Rewrite records first..first+count into the file part; runs in a worker process."""
+    editor = RecordEditor(endian, nsec, linktype, fixup)
+    with open(filename, "rb", buffering=BUFFER_SIZE) as f, open(part, "wb", buffering=BUFFER_SIZE) as out:
+        f.seek(offset)
+        return rewrite_records(f, out, editor, edits, first, count)
+
+
+def _append_file(out, part):
+    """Append the file part to out, in the kernel if possible."""
+    out.flush()
+    with open(part, "rb") as f:
+        remaining = os.fstat(f.fileno()).st_size
+        offset = 0
+        try:
+            while remaining:
+                copied = os.sendfile(out.fileno(), f.fileno(), offset, remaining)
+                if copied == 0:
+                    break
+                offset += copied
+                remaining -= copied
+        except (AttributeError, OSError):
+            pass
+        f.seek(offset)
+        while True:
+            block = f.read(BUFFER_SIZE)
+            if not block:
+                break
+            out.write(block)
+
+
+def split_records(filename, endian, jobs):
+    """(record count, [(first row, count, offset)]) of at most jobs ranges of
+    about as many records each, where offset is that of the first record's
+    header.
+
+    The record headers are walked once, keeping the offset of every
+    step-th record only; step doubles whenever more than 4 * jobs offsets
+    are kept, so memory does not grow with the capture.
+    """
+    unpack_caplen = struct.Struct(endian + "I").unpack_from
+    marks = array("Q")
+    step = 1
+    total = 0
+    with open(filename, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size <= PCAP_GLOBAL_HEADER_LEN:
+            return 0, []
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            pos = PCAP_GLOBAL_HEADER_LEN
+            last_header = size - PCAP_RECORD_HEADER_LEN
+            while pos <= last_header:
+                end = pos + PCAP_RECORD_HEADER_LEN + unpack_caplen(buf, pos + 8)[0]
+                if end > size:
+                    break
+                if total % step == 0:
+                    marks.append(pos)
+                    if len(marks) > 4 * jobs:
+                        marks = marks[::2]
+                        step *= 2
+                total += 1
+                pos = end
+    # Range i starts at the kept record nearest to i * total / jobs
+    starts = sorted({min(round(i * total / jobs / step), len(marks) - 1) for i in range(jobs)}) if total else []
+    ranges = []
+    for n, mark in enumerate(starts):
+        first = mark * step
+        stop = starts[n + 1] * step if n + 1 < len(starts) else total
+        ranges.append((first, stop - first, marks[mark]))
+    return total, ranges
+
+
+def _rewrite_parallel(filename, out, workdir, header, edits, jobs, fixup=False):
+    """Split the records into jobs ranges, rewrite them in worker processes
+    and concatenate the parts into out.  Returns the number of records."""
+    endian, nsec, _, linktype = header
+    total, ranges = split_records(filename, endian, jobs)
+    # Parts go next to the output, so appending them can stay in the kernel
+    with tempfile.TemporaryDirectory(dir=workdir) as tmpdir:
+        parts = []
+        with ProcessPoolExecutor(jobs, mp_context=multiprocessing.get_context("spawn")) as executor:
+            futures = []
+            for n, (first, count, offset) in enumerate(ranges):
+                part = os.path.join(tmpdir, f"part{n}")
+                parts.append(part)
+                range_edits = {row: e for row, e in edits.items() if first <= row < first + count}
+                futures.append(executor.submit(
+                    _rewrite_range, filename, part, endian, nsec, linktype,
+                    offset, first, count, range_edits, fixup,
+                ))
+            for future in futures:
+                future.result()
+        for part in parts:
+            _append_file(out, part)
+    return total
+
+
+def run(input_filename, script_lines, output_filename, jobs=1, fixup=False):
+    """Apply an edit script to a capture, writing the result atomically.
+
+    With fixup, patched records get their lengths and checksums fixed up.
+
+    Returns the number of records read from the input.
+    """
+    edits = parse_script(script_lines)
+    target = os.path.abspath(output_filename)
+    fd, tmp = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=os.path.dirname(target))
+    try:
+        with open(input_filename, "rb", buffering=BUFFER_SIZE) as f, \
+                os.fdopen(fd, "wb", buffering=BUFFER_SIZE) as out:
+            global_header = f.read(PCAP_GLOBAL_HEADER_LEN)
+            header = parse_global_header(global_header, input_filename)
+            editor = RecordEditor(header[0], header[1], header[3], fixup)
+            out.write(global_header)
+            if jobs > 1:
+                total = _rewrite_parallel(input_filename, out, os.path.dirname(target), header, edits, jobs, fixup)
+            else:
+                total = rewrite_records(f, out, editor, edits)
+            # Inserts past the last record append to the capture
+            for row in sorted(edits):
+                if row < total:
+                    continue
+                if row > total or any(edit[0] != "insert" for edit in edits[row]):
+                    raise ValueError(f"row {row} is past the end of a {total} record capture")
+                for edit in edits[row]:
+                    out.write(editor.inserted(edit))
+        os.chmod(tmp, os.stat(input_filename).st_mode & 0o7777)
+        os.replace(tmp, target)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+    return total
+
+
+def main(argv=None):
+    """Entry point of the batch subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="pcap-hex-editor batch",
+        description="Apply an edit script to a PCAP file without the UI.",
+    )
+    parser.add_argument("input", help="capture to edit")
+    parser.add_argument("script", help="edit script, or - for standard input")
+    parser.add_argument("-o", "--output", required=True, help="file to write the edited capture to")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="worker processes to split the capture across (default: 1)")
+    parser.add_argument("--fixup", action="store_true",
+                        help="update the checksums and lengths of edited records")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.script == "-":
+            script_lines = sys.stdin.readlines()
+        else:
+            with open(args.script, "r", encoding="utf-8") as f:
+                script_lines = f.readlines()
+        total = run(args.input, script_lines, args.output, max(1, args.jobs), args.fixup)
+    except Exception as e:
+        print(f"batch: {e}", file=sys.stderr)
+        return 1
+    print(f"Wrote {args.output} ({total} records read)")
+    return 0
@@ -0,0 +1,22 @@
+"""
+Capture file access for the PCAP Hex Editor.
+
+This package contains the indexed, lazily dissected packet model.
+"""
+
+from .pcap_index import PcapIndex
+from .pcapng_index import PcapngIndex, open_index
+from .packet_store import PacketStore
+from .cache import LRUCache
+from .summaries import SummaryLoader
+from .search import PacketSearch, compile_pattern, SEARCH_MODES
+from .display_filter import DisplayFilter, FilterScan
+from .headers import header_summary
+from .fixup import fix_packet
+from .transform import PacketTransform, compile_transform
+from .scapy_loader import load_scapy, scapy_loaded
+
+__all__ = ["PcapIndex", "PcapngIndex", "open_index", "PacketStore", "LRUCache", "SummaryLoader",
+           "PacketSearch", "compile_pattern", "SEARCH_MODES",
+           "DisplayFilter", "FilterScan", "header_summary", "fix_packet",
+           "PacketTransform", "compile_transform", "load_scapy", "scapy_loaded"]
@@ -0,0 +1,59 @@
+from collections import OrderedDict
+
+
+class LRUCache:
+    """Size-bounded least-recently-used cache with hit/miss counters.
+
+    Keys are usually PacketStore.key(row), i.e. (record id, generation):
+    an edit bumps the generation, so stale entries are never hit again and
+    simply age out.
+    """
+
+    def __init__(self, maxsize=65536):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def get(self, key, default=None):
+        try:
+            value = self._data[key]
+        except KeyError:
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def clear(self):
+        self._data.clear()
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self):
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hit_rate,
+        }
+
+    def __repr__(self):
+        return (f"LRUCache(size={len(self._data)}/{self.maxsize}, "
+                f"hits={self.hits}, misses={self.misses}, hit_rate={self.hit_rate:.1%})")
@@ -0,0 +1,351 @@
+import re
+import struct
+from functools import lru_cache
+from .scan import ChunkedScan
+
+# Link-layer prologues of the compiled predicate: set etype (the EtherType
+# of the network layer, or -1) and l3 (its offset in the packet)
+_ETHERNET = """\
+    etype = (data[12] << 8) | data[13] if n >= 14 else -1
+    l3 = 14
+    if etype in (0x8100, 0x88a8) and n >= 18:
+        etype = (data[16] << 8) | data[17]
+        l3 = 18"""
+_RAW_IP = """\
+    version = data[0] >> 4 if n else 0
+    etype = 0x0800 if version == 4 else 0x86dd if version == 6 else -1
+    l3 = 0"""
+_NULL = """\
+    family = (data[0] | data[3]) if n >= 4 else -1
+    etype = 0x0800 if family == 2 else 0x86dd if family in (10, 24, 28, 30) else -1
+    l3 = 4"""
+_SLL = """\
+    etype = (data[14] << 8) | data[15] if n >= 16 else -1
+    l3 = 16"""
+_SLL2 = """\
+    etype = (data[0] << 8) | data[1] if n >= 20 else -1
+    l3 = 20"""
+_UNKNOWN = """\
+    etype = -1
+    l3 = 0"""
+
+LINKTYPE_PROLOGUES = {
+    1: _ETHERNET,
+    0: _NULL, 108: _NULL,
+    12: _RAW_IP, 14: _RAW_IP, 101: _RAW_IP, 228: _RAW_IP, 229: _RAW_IP,
+    113: _SLL,
+    276: _SLL2,
+}
+
+# Network and transport headers, decoded once per packet; lines that set
+# variables the filter does not use are left out
+_DECODE = (
+    ((), "    proto = l4 = sport = dport = -1"),
+    ((), "    ip_src = ip_dst = ip_ttl = ip_len = -1"),
+    ((), "    if etype == 0x0800 and n >= l3 + 20:"),
+    ((), "        proto = data[l3 + 9]"),
+    (("ip_ttl",), "        ip_ttl = data[l3 + 8]"),
+    (("ip_len",), "        ip_len = (data[l3 + 2] << 8) | data[l3 + 3]"),
+    (("ip_src", "ip_dst"), "        ip_src, ip_dst = unpack_addresses(data, l3 + 12)"),
+    ((), "        if not ((data[l3 + 6] & 0x1f) | data[l3 + 7]):"),
+    ((), "            l4 = l3 + (data[l3] & 0x0f) * 4"),
+    ((), "    elif etype == 0x86dd and n >= l3 + 40:"),
+    ((), "        proto = data[l3 + 6]"),
+    ((), "        l4 = l3 + 40"),
+    (("sport", "dport"), "    if (proto == 6 or proto == 17) and 0 <= l4 and n >= l4 + 4:"),
+    (("sport", "dport"), "        sport, dport = unpack_ports(data, l4)"),
+)
+
+
+def _decode_source(expression):
+    used = set(re.findall(r"[a-z_]+", expression))
+    return "\n".join(line for needs, line in _DECODE if not needs or used.intersection(needs))
+
+
+# Bare protocol names, as conditions on the decoded headers
+PROTOCOLS = {
+    "ip": "etype == 0x0800",
+    "ipv6": "etype == 0x86dd",
+    "arp": "etype == 0x0806",
+    "tcp": "(proto == 6 and l4 >= 0)",
+    "udp": "(proto == 17 and l4 >= 0)",
+    "icmp": "(etype == 0x0800 and proto == 1)",
+    "icmpv6": "(etype == 0x86dd and proto == 58)",
+}
+
+# Field name -> (kind, variables it is made of, condition for its presence)
+FIELDS = {
+    "frame.len": ("number", ("wirelen",), None),
+    "frame.cap_len": ("number", ("n",), None),
+    "frame.time_epoch": ("number", ("ts",), None),
+    "ip.src": ("address", ("ip_src",), PROTOCOLS["ip"]),
+    "ip.dst": ("address", ("ip_dst",), PROTOCOLS["ip"]),
+    "ip.addr": ("address", ("ip_src", "ip_dst"), PROTOCOLS["ip"]),
+    "ip.proto": ("number", ("proto",), PROTOCOLS["ip"]),
+    "ip.ttl": ("number", ("ip_ttl",), PROTOCOLS["ip"]),
+    "ip.len": ("number", ("ip_len",), PROTOCOLS["ip"]),
+    "tcp.srcport": ("number", ("sport",), PROTOCOLS["tcp"]),
+    "tcp.dstport": ("number", ("dport",), PROTOCOLS["tcp"]),
+    "tcp.port": ("number", ("sport", "dport"), PROTOCOLS["tcp"]),
+    "udp.srcport": ("number", ("sport",), PROTOCOLS["udp"]),
+    "udp.dstport": ("number", ("dport",), PROTOCOLS["udp"]),
+    "udp.port": ("number", ("sport", "dport"), PROTOCOLS["udp"]),
+}
+
+COMPARISONS = {
+    "==": "==", "eq": "==", "!=": "!=", "ne": "!=",
+    "<": "<", "lt": "<", "<=": "<=", "le": "<=",
+    ">": ">", "gt": ">", ">=": ">=", "ge": ">=",
+}
+
+_TOKEN = re.compile(r"""
+    \s*(?:
+        (?P<address>\d+\.\d+\.\d+\.\d+(?:/\d+)?)
+      | (?P<number>0x[0-9a-fA-F]+|\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)
+      | (?P<range>\.\.)
+      | (?P<op>==|!=|<=|>=|<|>|&&|\|\||!|[(){}])
+      | (?P<name>[A-Za-z_][A-Za-z0-9_.]*)
+    )""", re.VERBOSE)
+
+
+def _tokenize(text):
+    tokens = []
+    pos = 0
+    text = text.rstrip()
+    while pos < len(text):
+        match = _TOKEN.match(text, pos)
+        if match is None:
+            raise ValueError(f"unexpected {text[pos:].strip()[:20]!r} in filter")
+        pos = match.end()
+        tokens.append((match.lastgroup, match.group(match.lastgroup)))
+    return tokens
+
+
+class _Parser:
+    """Recursive descent parser that turns a filter into a Python expression."""
+
+    def __init__(self, text):
+        self.tokens = _tokenize(text)
+        self.pos = 0
+
+    def peek(self):
+        return self.tokens[self.pos] if self.pos < len(self.tokens) else (None, None)
+
+    def take(self):
+        token = self.peek()
+        if token[0] is None:
+            raise ValueError("unexpected end of filter")
+        self.pos += 1
+        return token
+
+    def expect(self, value):
+        kind, text = self.take()
+        if text != value:
+            raise ValueError(f"expected {value!r}, found {text!r}")
+
+    def parse(self):
+        expression = self.parse_or()
+        if self.peek()[0] is not None:
+            raise ValueError(f"unexpected {self.peek()[1]!r} in filter")
+        return expression
+
+    def parse_or(self):
+        terms = [self.parse_and()]
+        while self.peek()[1] in ("or", "||"):
+            self.take()
+            terms.append(self.parse_and())
+        return terms[0] if len(terms) == 1 else "(" + " or ".join(terms) + ")"
+
+    def parse_and(self):
+        terms = [self.parse_not()]
+        while self.peek()[1] in ("and", "&&"):
+            self.take()
+            terms.append(self.parse_not())
+        return terms[0] if len(terms) == 1 else "(" + " and ".join(terms) + ")"
+
+    def parse_not(self):
+        if self.peek()[1] in ("not", "!"):
+            self.take()
+            return f"(not {self.parse_not()})"
+        return self.parse_primary()
+
+    def parse_primary(self):
+        kind, text = self.take()
+        if text == "(":
+            expression = self.parse_or()
+            self.expect(")")
+            return expression
+        if kind != "name":
+            raise ValueError(f"expected a field or protocol, found {text!r}")
+        if text in FIELDS:
+            return self.parse_field(text)
+        if text in PROTOCOLS:
+            return PROTOCOLS[text]
+        raise ValueError(f"unknown field {text!r}")
+
+    def parse_value(self, kind):
+        token_kind, text = self.take()
+        if kind == "address":
+            if token_kind != "address":
+                raise ValueError(f"expected an IPv4 address, found {text!r}")
+            return _parse_address(text)
+        if token_kind != "number":
+            raise ValueError(f"expected a number, found {text!r}")
+        value = int(text, 16) if text.startswith("0x") else float(text)
+        return int(value) if value == int(value) else value
+
+    def parse_field(self, name):
+        kind, variables, present = FIELDS[name]
+        op = self.peek()[1]
+        if op in COMPARISONS:
+            self.take()
+            value = self.parse_value(kind)
+            tests = [_compare(variable, COMPARISONS[op], value) for variable in variables]
+            # Like Wireshark, != holds only if no occurrence of the field is equal
+            test = " and ".join(tests) if COMPARISONS[op] == "!=" else " or ".join(tests)
+        elif op == "in":
+            self.take()
+            items = self.parse_set(kind)
+            test = " or ".join(_member(variable, items) for variable in variables)
+        else:
+            # A bare field tests for its presence
+            return present or "True"
+        return f"({present} and ({test}))" if present else f"({test})"
+
+    def parse_set(self, kind):
+        self.expect("{")
+        items = []
+        while self.peek()[1] != "}":
+            low = self.parse_value(kind)
+            if self.peek()[0] == "range":
+                self.take()
+                items.append((low, self.parse_value(kind)))
+            else:
+                items.append((low, None))
+        self.take()
+        if not items:
+            raise ValueError("empty set in filter")
+        return items
+
+
+def _parse_address(text):
+    """(address, mask) as integers of an IPv4 address with an optional prefix length."""
+    address, _, prefix = text.partition("/")
+    parts = [int(part) for part in address.split(".")]
+    if any(part > 255 for part in parts):
+        raise ValueError(f"invalid IPv4 address {text!r}")
+    prefix = int(prefix) if prefix else 32
+    if prefix > 32:
+        raise ValueError(f"invalid prefix length in {text!r}")
+    mask = (0xffffffff << (32 - prefix)) & 0xffffffff
+    value = (parts[0] << 24) | (parts[1] << 16) | (parts[2] << 8) | parts[3]
+    return value & mask, mask
+
+
+def _compare(variable, op, value):
+    if isinstance(value, tuple):
+        address, mask = value
+        if mask != 0xffffffff:
+            variable = f"({variable} & {mask:#x})"
+        return f"{variable} {op} {address:#x}"
+    return f"{variable} {op} {value!r}"
+
+
+def _member(variable, items):
+    tests = []
+    for low, high in items:
+        if high is None:
+            tests.append(_compare(variable, "==", low))
+        elif isinstance(low, tuple):
+            tests.append(f"{low[0]:#x} <= {variable} <= {high[0] | (~high[1] & 0xffffffff):#x}")
+        else:
+            tests.append(f"{low!r} <= {variable} <= {high!r}")
+    return "(" + " or ".join(tests) + ")"
+
+
+class DisplayFilter:
+    """Display filter compiled into a predicate over raw packet bytes.
+
+    Supports a Wireshark-like subset: the protocols ip, ipv6, arp, tcp,
+    udp, icmp and icmpv6; the fields frame.len, frame.cap_len,
+    frame.time_epoch, ip.src, ip.dst, ip.addr (with optional /prefix),
+    ip.proto, ip.ttl, ip.len and tcp/udp .port, .srcport and .dstport;
+    the comparisons == != < <= > >= (or eq ne lt le gt ge), set and range
+    membership such as 'tcp.port in {80 443 8000..8080}', and
+    and/or/not (&& || !) with parentheses.
+
+    The filter is parsed once and compiled into Python source for each
+    link type it meets, the capture's own one first; calling it with
+    (data, wirelen, timestamp) runs plain byte indexing and never builds
+    scapy packets.  Records on another link type, such as those of a
+    second pcapng interface or of a merged file, pass theirs.
+    """
+
+    def __init__(self, text, linktype=1):
+        self.text = text.strip()
+        self.linktype = linktype
+        self._expression = _Parser(self.text).parse() if self.text else "True"
+        self._predicates = {}
+        self.predicate = self.predicate_for(linktype)
+        self.source = self._source(linktype)
+
+    def _source(self, linktype):
+        prologue = LINKTYPE_PROLOGUES.get(linktype, _UNKNOWN)
+        return (
+            "def predicate(data, wirelen, ts):\n"
+            "    n = len(data)\n"
+            f"{prologue}\n{_decode_source(self._expression)}\n"
+            f"    return {self._expression}\n"
+        )
+
+    def predicate_for(self, linktype):
+        """predicate(data, wirelen, ts) for records of linktype."""
+        predicate = self._predicates.get(linktype)
+        if predicate is None:
+            namespace = {
+                "unpack_addresses": struct.Struct(">II").unpack_from,
+                "unpack_ports": struct.Struct(">HH").unpack_from,
+            }
+            exec(compile(self._source(linktype), f"<filter {self.text!r}>", "exec"), namespace)
+            predicate = self._predicates[linktype] = namespace["predicate"]
+        return predicate
+
+    def __call__(self, data, wirelen, timestamp, linktype=None):
+        predicate = self.predicate if linktype is None else self.predicate_for(linktype)
+        return predicate(data, wirelen, timestamp)
+
+    def __repr__(self):
+        return f"DisplayFilter({self.text!r}, linktype={self.linktype})"
+
+
+@lru_cache(maxsize=16)
+def compile_filter(text, linktype=1):
+    """DisplayFilter for text, compiled once per process."""
+    return DisplayFilter(text, linktype)
+
+
+def filter_view(view, params, rows, offsets, caplens, wirelens, timestamps, linktypes):
+    """Rows whose records pass the filter given as (text, linktype)."""
+    predicate_for = compile_filter(*params).predicate_for
+    return [
+        row for row, offset, caplen, wirelen, ts, linktype
+        in zip(rows, offsets, caplens, wirelens, timestamps, linktypes)
+        if predicate_for(linktype)(view[offset:offset + caplen], wirelen, ts)
+    ]
+
+
+class FilterScan(ChunkedScan):
+    """Applies a display filter to a range of rows; each chunk yields the
+    rows that pass, in row order."""
+
+    scan_view = staticmethod(filter_view)
+
+    def __init__(self, store, display_filter, **kwargs):
+        super().__init__(store, (display_filter.text, display_filter.linktype), **kwargs)
+        self.display_filter = display_filter
+
+    def scan_memory(self, rows):
+        predicate_for = self.display_filter.predicate_for
+        store = self.store
+        return [row for row in rows
+                if predicate_for(store.linktype_at(row))(store.raw(row), store.wirelen(row), store.timestamp(row))]
@@ -0,0 +1,240 @@
+import struct
+import sys
+from array import array
+from collections import namedtuple
+from .headers import ip_offset
+
+# Offset of the checksum in the layer 4 headers that have one, and the
+# shortest header that holds it
+L4_CHECKSUMS = {1: 2, 6: 16, 17: 6, 58: 2}
+L4_HEADER_SIZES = {1: 4, 6: 18, 17: 8, 58: 4}
+
+IPV6_HOP_BY_HOP, IPV6_ROUTING, IPV6_FRAGMENT, IPV6_AH, IPV6_DEST_OPTS = 0, 43, 44, 51, 60
+IPV6_EXTENSIONS = (IPV6_HOP_BY_HOP, IPV6_ROUTING, IPV6_FRAGMENT, IPV6_AH, IPV6_DEST_OPTS)
+
+# Ethernet frames up to this size may be padded after the IP packet
+MIN_ETHERNET_FRAME = 64
+
+# l4_checked is False where the layer 4 checksum cannot be kept up to date:
+# non-first fragments, routed IPv6 packets, unknown or cut off headers
+Layout = namedtuple("Layout", "l3 version header_end l4 proto end l4_checked")
+
+
+def _layout(data, linktype):
+    """Layout of the IP packet in data, or None if there is none."""
+    l3 = ip_offset(data, linktype)
+    if l3 is None:
+        return None
+    version = data[l3] >> 4
+    if version == 4:
+        header_end = l3 + (data[l3] & 0x0F) * 4
+        if header_end < l3 + 20 or header_end > len(data):
+            return None
+        total, fragment = struct.unpack_from(">H2xH", data, l3 + 2)
+        proto = data[l3 + 9]
+        l4 = header_end
+        end = l3 + total
+        checked = not fragment & 0x3FFF and proto != 58
+    else:
+        header_end = l3 + 40
+        if header_end > len(data):
+            return None
+        end = header_end + struct.unpack_from(">H", data, l3 + 4)[0]
+        proto = data[l3 + 6]
+        l4 = header_end
+        checked = proto != 1
+        while proto in IPV6_EXTENSIONS and l4 + 8 <= len(data):
+            if proto == IPV6_FRAGMENT:
+                # Offset or more fragments set
+                checked = checked and not struct.unpack_from(">H", data, l4 + 2)[0] & 0xFFF9
+                size = 8
+            elif proto == IPV6_AH:
+                size = (data[l4 + 1] + 2) * 4
+            else:
+                # The pseudo-header of a routed packet holds the final destination
+                checked = checked and proto != IPV6_ROUTING
+                size = (data[l4 + 1] + 1) * 8
+            proto = data[l4]
+            l4 += size
+    if proto not in L4_CHECKSUMS or l4 + L4_HEADER_SIZES[proto] > min(end, len(data)):
+        checked = False
+    return Layout(l3, version, header_end, l4, proto, end, checked)
+
+
+def _fold(total):
+    while total >> 16:
+        total = (total & 0xFFFF) + (total >> 16)
+    return total
+
+
+def _sum(data, start, end):
+    """One's complement sum of the big-endian 16-bit words of data[start:end]."""
+    if end <= start:
+        return 0
+    chunk = bytes(data[start:end])
+    if len(chunk) % 2:
+        chunk += b"\0"
+    # Summed in native byte order, which only swaps the bytes of the result
+    total = _fold(sum(array("H", chunk)))
+    if sys.byteorder == "little":
+        total = (total >> 8) | (total & 0xFF) << 8
+    return total
+
+
+def _merge(spans, start, end):
+    """spans clipped to [start, end) and widened to 16-bit words from start, merged."""
+    words = []
+    for first, last in sorted(spans):
+        first, last = max(first, start), min(last, end)
+        if first >= last:
+            continue
+        first = start + ((first - start) & ~1)
+        last = start + ((last - start + 1) & ~1)
+        if words and first <= words[-1][1]:
+            words[-1][1] = max(words[-1][1], last)
+        else:
+            words.append([first, last])
+    return words
+
+
+def _delta(old, new, start, old_end, new_end, spans):
+    """Sums of the words of a checksummed region that spans cover, before and
+    after; the region runs from start to old_end before and new_end after."""
+    if old_end != new_end:
+        spans = spans + [(min(old_end, new_end), max(old_end, new_end))]
+    before = after = 0
+    for first, last in _merge(spans, start, max(old_end, new_end)):
+        before = _fold(before + _sum(old, first, min(last, old_end)))
+        after = _fold(after + _sum(new, first, min(last, new_end)))
+    return before, after
+
+
+def _update(checksum, before, after):
+    """Checksum after words summing to before were changed to words summing to after.
+
+    RFC 1624, eqn. 3: HC' = ~(~HC + ~m + m').
+    """
+    return ~_fold((~checksum & 0xFFFF) + (~before & 0xFFFF) + after) & 0xFFFF
+
+
+def _pseudo_sum(data, layout):
+    """Sum of the pseudo-header of the layer 4 checksum; ICMP has none."""
+    l3, length = layout.l3, layout.end - layout.l4
+    if layout.version == 4:
+        if layout.proto == 1:
+            return 0
+        return _fold(_sum(data, l3 + 12, l3 + 20) + layout.proto + length)
+    return _fold(_sum(data, l3 + 8, l3 + 40) + (length >> 16) + (length & 0xFFFF) + layout.proto)
+
+
+def _checksum(data, start, end, field, pseudo=0):
+    """Checksum of data[start:end] computed from scratch, skipping the field at field."""
+    return ~_fold(_sum(data, start, field) + _sum(data, field + 2, end) + pseudo) & 0xFFFF
+
+
+def _fix_lengths(data, linktype, layout):
+    """Set the IP and UDP length fields from the captured packet length."""
+    changed = []
+    l3 = layout.l3
+    available = len(data) - l3
+    padded = linktype == 1 and len(data) <= MIN_ETHERNET_FRAME
+    if layout.version == 4:
+        total = layout.end - l3
+        if total != available and not (padded and layout.header_end - l3 <= total < available):
+            if available <= 0xFFFF:
+                struct.pack_into(">H", data, l3 + 2, available)
+                changed.append((l3 + 2, l3 + 4))
+    else:
+        payload = layout.end - layout.header_end
+        expected = available - 40
+        # A zero payload length is a jumbogram, sized by an option
+        if payload and payload != expected and not (padded and 0 < payload < expected):
+            if expected <= 0xFFFF:
+                struct.pack_into(">H", data, l3 + 4, expected)
+                changed.append((l3 + 4, l3 + 6))
+    if changed:
+        layout = _layout(data, linktype)
+    if layout.proto == 17 and layout.l4_checked:
+        length = min(layout.end, len(data)) - layout.l4
+        if struct.unpack_from(">H", data, layout.l4 + 4)[0] != length and 8 <= length <= 0xFFFF:
+            struct.pack_into(">H", data, layout.l4 + 4, length)
+            changed.append((layout.l4 + 4, layout.l4 + 6))
+    return changed
+
+
+def fix_packet(data, linktype=1, old=None, spans=None, wirelen=None, lengths=True):
+    """Bring the length fields and checksums of an IP packet up to date, in place.
+
+    data is a bytearray.  old is the packet before an edit, of the same
+    length, and spans are the (start, end) byte ranges the edit changed;
+    the IPv4 header checksum and the TCP, UDP, ICMP and ICMPv6 checksums,
+    with their IPv4 and IPv6 pseudo-headers, are then updated incrementally
+    from the words in those ranges (RFC 1624), without summing the rest of
+    the packet.  A checksum the edit itself changed is left as it is, and a
+    checksum that was wrong before the edit stays wrong by as much.  If the
+    edit changed where the headers are, the checksums are computed from
+    scratch instead.
+
+    If lengths is set and the packet is not truncated, as told by wirelen,
+    the IPv4 total length, IPv6 payload length and UDP length are also set
+    from the captured length, allowing for Ethernet padding, and the
+    checksums updated for them.  Without old, only this is done, and the
+    checksums are computed from scratch if a length was set, since the
+    rest of a resized packet may have changed as well.
+
+    Returns the (start, end) ranges that were changed, in order.
+    """
+    layout = _layout(data, linktype)
+    if layout is None:
+        return []
+    if old is None or len(old) != len(data) or not spans:
+        # Nothing to compute an update from
+        old, spans = bytes(data), []
+        before = None
+    else:
+        spans = list(spans)
+        before = _layout(old, linktype)
+    changed = []
+    if lengths and (wirelen is None or wirelen <= len(data)):
+        changed = _fix_lengths(data, linktype, layout)
+        if changed:
+            layout = _layout(data, linktype)
+            spans += changed
+    if not spans:
+        return []
+    rebuilt = before is None or before[:5] != layout[:5] or before.l4_checked != layout.l4_checked
+
+    def unchanged(field):
+        return old[field:field + 2] == data[field:field + 2]
+
+    l3 = layout.l3
+    if layout.version == 4 and unchanged(l3 + 10):
+        checksum = struct.unpack_from(">H", data, l3 + 10)[0]
+        if rebuilt:
+            new = _checksum(data, l3, layout.header_end, l3 + 10)
+        else:
+            new = _update(checksum, *_delta(old, data, l3, layout.header_end, layout.header_end, spans))
+        if new != checksum:
+            struct.pack_into(">H", data, l3 + 10, new)
+            changed.append((l3 + 10, l3 + 12))
+
+    field = layout.l4 + L4_CHECKSUMS.get(layout.proto, 0)
+    if layout.l4_checked and unchanged(field):
+        checksum = struct.unpack_from(">H", data, field)[0]
+        if layout.proto == 17 and layout.version == 4 and checksum == 0:
+            # No checksum was computed
+            return sorted(changed)
+        end = min(layout.end, len(data))
+        if rebuilt:
+            new = _checksum(data, layout.l4, end, field, _pseudo_sum(data, layout))
+        else:
+            old_sum, new_sum = _delta(old, data, layout.l4, min(before.end, len(old)), end, spans)
+            old_sum = _fold(old_sum + _pseudo_sum(old, before))
+            new_sum = _fold(new_sum + _pseudo_sum(data, layout))
+            new = _update(checksum, old_sum, new_sum) if old_sum != new_sum else checksum
+        if layout.proto == 17 and new == 0:
+            new = 0xFFFF
+        if new != checksum:
+            struct.pack_into(">H", data, field, new)
+            changed.append((field, field + 2))
+    return sorted(changed)
@@ -0,0 +1,122 @@
+import ipaddress
+import struct
+
+# Linktypes whose packets start with an IP header
+RAW_IP_LINKTYPES = (12, 14, 101, 228, 229)
+
+ETHERTYPE_IPV4 = 0x0800
+ETHERTYPE_ARP = 0x0806
+ETHERTYPE_IPV6 = 0x86DD
+ETHERTYPE_VLANS = (0x8100, 0x88A8)
+
+TCP_FLAGS = "FSRPAUEC"
+
+
+def _mac(data, offset):
+    return ":".join(f"{b:02x}" for b in data[offset:offset + 6])
+
+
+def _ports(data, l4):
+    return struct.unpack_from(">HH", data, l4)
+
+
+def _transport(data, proto, l4, src, dst):
+    """Summary of the layer 4 header at l4, as in scapy's summaries."""
+    if proto == 6 and len(data) >= l4 + 14:
+        sport, dport = _ports(data, l4)
+        flags = "".join(f for bit, f in enumerate(TCP_FLAGS) if data[l4 + 13] >> bit & 1)
+        return f"TCP {src}:{sport} > {dst}:{dport} {flags}"
+    if proto == 17 and len(data) >= l4 + 4:
+        sport, dport = _ports(data, l4)
+        return f"UDP {src}:{sport} > {dst}:{dport}"
+    if proto in (1, 58) and len(data) >= l4 + 2:
+        name = "ICMP" if proto == 1 else "ICMPv6"
+        return f"{name} {src} > {dst} type {data[l4]} code {data[l4 + 1]}"
+    return f"{src} > {dst} proto {proto}"
+
+
+def _ip(data, l3):
+    version = data[l3] >> 4
+    if version == 4 and len(data) >= l3 + 20:
+        src = ipaddress.IPv4Address(bytes(data[l3 + 12:l3 + 16]))
+        dst = ipaddress.IPv4Address(bytes(data[l3 + 16:l3 + 20]))
+        fragment = struct.unpack_from(">H", data, l3 + 6)[0] & 0x1FFF
+        if fragment:
+            return f"IP {src} > {dst} fragment"
+        return "IP / " + _transport(data, data[l3 + 9], l3 + (data[l3] & 0x0F) * 4, src, dst)
+    if version == 6 and len(data) >= l3 + 40:
+        src = ipaddress.IPv6Address(bytes(data[l3 + 8:l3 + 24]))
+        dst = ipaddress.IPv6Address(bytes(data[l3 + 24:l3 + 40]))
+        return "IPv6 / " + _transport(data, data[l3 + 6], l3 + 40, src, dst)
+    return f"IP version {version}"
+
+
+def _ethertype(data, ethertype, l3):
+    if ethertype in (ETHERTYPE_IPV4, ETHERTYPE_IPV6) and len(data) > l3:
+        return _ip(data, l3)
+    if ethertype == ETHERTYPE_ARP and len(data) >= l3 + 28:
+        op = struct.unpack_from(">H", data, l3 + 6)[0]
+        sender = ipaddress.IPv4Address(bytes(data[l3 + 14:l3 + 18]))
+        target = ipaddress.IPv4Address(bytes(data[l3 + 24:l3 + 28]))
+        if op == 1:
+            return f"ARP who has {target} says {sender}"
+        return f"ARP is at {_mac(data, l3 + 8)} says {sender}"
+    return f"type 0x{ethertype:04x}"
+
+
+def ip_offset(data, linktype=1):
+    """Offset of the IPv4 or IPv6 header in a packet, or None if it has none."""
+    l3 = None
+    if linktype == 1 and len(data) >= 14:
+        ethertype = struct.unpack_from(">H", data, 12)[0]
+        l3 = 14
+        while ethertype in ETHERTYPE_VLANS and len(data) >= l3 + 4:
+            ethertype = struct.unpack_from(">H", data, l3 + 2)[0]
+            l3 += 4
+        if ethertype not in (ETHERTYPE_IPV4, ETHERTYPE_IPV6):
+            return None
+    elif linktype in RAW_IP_LINKTYPES:
+        l3 = 0
+    elif linktype == 0:
+        l3 = 4
+    elif linktype == 113 and len(data) >= 16:
+        if struct.unpack_from(">H", data, 14)[0] not in (ETHERTYPE_IPV4, ETHERTYPE_IPV6):
+            return None
+        l3 = 16
+    elif linktype == 276 and len(data) >= 20:
+        if struct.unpack_from(">H", data, 0)[0] not in (ETHERTYPE_IPV4, ETHERTYPE_IPV6):
+            return None
+        l3 = 20
+    if l3 is None or len(data) <= l3 or data[l3] >> 4 not in (4, 6):
+        return None
+    return l3
+
+
+def header_summary(data, linktype=1):
+    """A one-line summary of a packet from its raw headers, without scapy.
+
+    Covers Ethernet (with VLAN tags), raw IP, BSD loopback and Linux
+    cooked captures carrying IPv4, IPv6 and ARP, in the style of scapy's
+    summary() but with numeric ports.  It is shown until scapy is loaded.
+    """
+    try:
+        if linktype == 1 and len(data) >= 14:
+            ethertype = struct.unpack_from(">H", data, 12)[0]
+            if ethertype < 0x0600:
+                return f"802.3 {_mac(data, 6)} > {_mac(data, 0)}"
+            l3 = 14
+            while ethertype in ETHERTYPE_VLANS and len(data) >= l3 + 4:
+                ethertype = struct.unpack_from(">H", data, l3 + 2)[0]
+                l3 += 4
+            return "Ether / " + _ethertype(data, ethertype, l3)
+        if linktype in RAW_IP_LINKTYPES and data:
+            return _ip(data, 0)
+        if linktype == 0 and len(data) > 4:
+            return "Loopback / " + _ip(data, 4)
+        if linktype == 113 and len(data) >= 16:
+            return "cooked linux / " + _ethertype(data, struct.unpack_from(">H", data, 14)[0], 16)
+        if linktype == 276 and len(data) >= 20:
+            return "cooked linux v2 / " + _ethertype(data, struct.unpack_from(">H", data, 0)[0], 20)
+    except (struct.error, IndexError, ValueError):
+        pass
+    return f"linktype {linktype}, {len(data)} bytes"
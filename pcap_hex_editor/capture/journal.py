@@ -0,0 +1,78 @@
+from array import array
+from collections import deque, namedtuple
+
+# row: the row the edit is about; undo, redo: (store method name, args)
+JournalEntry = namedtuple("JournalEntry", "row undo redo size")
+
+DEFAULT_UNDO_BYTES = 128 * 1024 * 1024
+ENTRY_OVERHEAD = 200  # Rough size of an entry's tuples, excluding its buffers
+
+
+def _size(args):
+    size = 0
+    for arg in args:
+        if isinstance(arg, array):
+            size += len(arg) * arg.itemsize
+        elif isinstance(arg, (bytes, bytearray)):
+            size += len(arg)
+    return size
+
+
+class EditJournal:
+    """Bounded undo/redo history of a PacketStore, kept as reversible deltas.
+
+    Entries hold only what an edit changed: the replaced byte range of a
+    packet, the record id and timestamp of a removed row, the previous
+    timestamps of a bulk operation.  Undoing or redoing an entry costs time
+    in proportion to that delta, not to the capture.  Once the entries hold
+    more than max_bytes the oldest ones are dropped, and an edit that is
+    larger than max_bytes on its own clears the history.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_UNDO_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._undo = deque()
+        self._redo = []
+
+    @property
+    def can_undo(self):
+        return bool(self._undo)
+
+    @property
+    def can_redo(self):
+        return bool(self._redo)
+
+    def record(self, row, undo, redo):
+        """Add an edit; any edits that were undone can no longer be redone."""
+        entry = JournalEntry(row, undo, redo, ENTRY_OVERHEAD + _size(undo[1]) + _size(redo[1]))
+        self.size -= sum(e.size for e in self._redo)
+        self._redo.clear()
+        if entry.size > self.max_bytes:
+            self.clear()
+            return
+        self._undo.append(entry)
+        self.size += entry.size
+        while self.size > self.max_bytes:
+            self.size -= self._undo.popleft().size
+
+    def pop_undo(self):
+        """The latest edit, moved to the redo history, or None."""
+        if not self._undo:
+            return None
+        entry = self._undo.pop()
+        self._redo.append(entry)
+        return entry
+
+    def pop_redo(self):
+        """The latest undone edit, moved back to the undo history, or None."""
+        if not self._redo:
+            return None
+        entry = self._redo.pop()
+        self._undo.append(entry)
+        return entry
+
+    def clear(self):
+        self._undo.clear()
+        self._redo.clear()
+        self.size = 0
@@ -0,0 +1,121 @@
+import heapq
+from array import array
+from bisect import bisect_right
+from itertools import chain, islice
+from operator import le
+from .pcapng_index import open_index
+
+
+class _MergedColumn:
+    """One per-record array of a MergedIndex, such as the offsets, read
+    through the arrays of the parts rather than copied from them."""
+
+    def __init__(self, index, name):
+        self.index = index
+        self.name = name
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, record):
+        if isinstance(record, slice):
+            first, last, step = record.indices(len(self.index))
+            values = array(getattr(self.index.parts[0], self.name).typecode)
+            for part, index in enumerate(self.index.parts):
+                base = self.index.bases[part]
+                start, stop = max(first, base), min(last, base + len(index))
+                if start < stop:
+                    values.extend(getattr(index, self.name)[start - base:stop - base])
+            return values[::step]
+        part, local = self.index.part_of(record)
+        return getattr(self.index.parts[part], self.name)[local]
+
+    def __iter__(self):
+        return chain.from_iterable(getattr(index, self.name) for index in self.index.parts)
+
+
+class MergedIndex:
+    """Index of several capture files, such as the files of a rotated capture.
+
+    Each file keeps its own pcap or pcapng index in parts; records are
+    numbered file after file, so the records of part i have the ids
+    bases[i] to bases[i + 1] - 1, and the offsets, lengths and timestamps
+    of all parts are available by record id as for a single file, looked
+    up in the part's own index.  Packet bytes stay in the files; only the
+    per-record indexes of the parts are held in memory.
+    """
+
+    def __init__(self, filenames):
+        self.filenames = list(filenames)
+        if not self.filenames:
+            raise ValueError("no capture files to merge")
+        self.parts = [open_index(filename) for filename in self.filenames]
+        self.bases = array("q")
+        self._length = 0
+        for part in self.parts:
+            self.bases.append(self._length)
+            self._length += len(part)
+        self.offsets = _MergedColumn(self, "offsets")
+        self.caplens = _MergedColumn(self, "caplens")
+        self.wirelens = _MergedColumn(self, "wirelens")
+        self.timestamps = _MergedColumn(self, "timestamps")
+        self.linktype = self.parts[0].linktype
+        self.truncated = any(part.truncated for part in self.parts)
+
+    def __len__(self):
+        return self._length
+
+    def part_of(self, record):
+        """(part number, record id within the part) of a record."""
+        part = bisect_right(self.bases, record) - 1
+        return part, record - self.bases[part]
+
+    def linktype_of(self, record):
+        part, local = self.part_of(record)
+        return self.parts[part].linktype_of(local)
+
+    def record_linktypes(self, first, last):
+        """Linktype of each of the records first to last - 1."""
+        linktypes = []
+        for part, index in enumerate(self.parts):
+            base = self.bases[part]
+            start, stop = max(first, base), min(last, base + len(index))
+            if start < stop:
+                linktypes.extend(index.record_linktypes(start - base, stop - base))
+        return linktypes
+
+    def merged_order(self):
+        """Record ids and timestamps of all records, in time order.
+
+        Parts that do not overlap in time, as with rotated files, are
+        simply chained, in time order, each in its file's order.  Otherwise
+        the parts are merged with a k-way heap merge if each is in time order
+        itself, and sorted as a whole if not.  Either way the full order is
+        built, as the store keeps it as its row order.
+        """
+        spans = []
+        for part, index in enumerate(self.parts):
+            if len(index):
+                spans.append((min(index.timestamps), max(index.timestamps), part))
+        spans.sort()
+        order = array("q")
+        timestamps = array("d")
+        if all(spans[i][1] <= spans[i + 1][0] for i in range(len(spans) - 1)):
+            for _, _, part in spans:
+                base = self.bases[part]
+                order.extend(range(base, base + len(self.parts[part])))
+                timestamps.extend(self.parts[part].timestamps)
+            return order, timestamps
+        runs = [
+            zip(self.parts[part].timestamps, range(self.bases[part], self.bases[part] + len(self.parts[part])))
+            for _, _, part in spans
+        ]
+        if all(all(map(le, index.timestamps, islice(index.timestamps, 1, None))) for index in self.parts):
+            merged = heapq.merge(*runs)
+        else:
+            merged = sorted(chain.from_iterable(runs))
+        for timestamp, record in merged:
+            order.append(record)
+            timestamps.append(timestamp)
+        return order, timestamps
+
@@ -0,0 +1,793 @@
+import mmap
+import os
+from bisect import bisect_left, bisect_right
+from operator import lt
+import tempfile
+from array import array
+from .pcapng_index import open_index
+from .merged_index import MergedIndex
+from .journal import EditJournal, DEFAULT_UNDO_BYTES
+from .redissect import redissect
+from .fixup import fix_packet
+from ..profiler import profiled
+
+try:
+    import numpy
+except ImportError:  # A requirement, but bulk timestamp operations fall back to pure Python, ~30x slower
+    numpy = None
+
+
+def _copy_file_range(src, dst, offset, count):
+    return os.copy_file_range(src, dst, count, offset)
+
+
+def _sendfile(src, dst, offset, count):
+    return os.sendfile(dst, src, offset, count)
+
+
+if not hasattr(os, "copy_file_range"):
+    _copy_file_range = None
+if not hasattr(os, "sendfile"):
+    _sendfile = None
+
+
+def _changed_span(old, new):
+    """(start, old end, new end) of the bytes that differ between old and new."""
+    size = min(len(old), len(new))
+    # Binary search on slice comparisons, which run at memcmp speed
+    lo, hi = 0, size
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[:mid] == new[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    start = lo
+    lo, hi = 0, size - start
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if old[len(old) - mid:] == new[len(new) - mid:]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return start, len(old) - lo, len(new) - lo
+
+
+class PacketStore:
+    """Sequence of packets backed by memory-mapped pcap or pcapng files.
+
+    Unedited packets are served as zero-copy memoryview slices of the
+    mapping and are only dissected when they are requested; dissected
+    packets are not kept around.  Replaced and inserted packets keep their
+    bytes (and the Packet they were built from, if any) in memory, keyed by
+    record id, so memory scales with the index plus the edits.
+
+    Every change is reported to the registered listeners, which implement
+    rows_changed(first, last), rows_inserted(row, count),
+    rows_removed(row, count) and rows_moved(row, new_row), so that views can
+    patch only the rows that were affected.
+
+    Every edit is also recorded in the journal as a reversible delta, at
+    most undo_limit bytes of them, for undo() and redo().
+
+    filename may also be a list of files, such as the files of a rotated
+    capture, which are then shown as one capture in time order; each file
+    is a part of a MergedIndex, and saving writes each part back to a file
+    of its own.
+    """
+
+    def __init__(self, filename, undo_limit=DEFAULT_UNDO_BYTES):
+        self.filenames = [filename] if isinstance(filename, (str, os.PathLike)) else list(filename)
+        self.filename = self.filenames[0]
+        if len(self.filenames) == 1:
+            self.index = open_index(self.filename)
+            self._parts = [self.index]
+            self._bases = array("q", [0])
+            # Row -> record id; ids below len(self.index) are records of the file
+            self._order = array("q", range(len(self.index)))
+            self._timestamps = array("d", self.index.timestamps)  # Row -> timestamp
+        else:
+            self.index = MergedIndex(self.filenames)
+            self._parts = self.index.parts
+            self._bases = self.index.bases
+            self._order, self._timestamps = self.index.merged_order()
+        self.linktype = self.index.linktype
+        self._files = [open(name, "rb") for name in self.filenames]
+        self._mmaps = [mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) for f in self._files]
+        self._views = [memoryview(m) for m in self._mmaps]
+        self._view = self._views[0]
+        # Rows whose timestamp is earlier than that of the row before them;
+        # while there are none, the timestamps can be binary searched
+        self._descents = self._count_descents(0, len(self._timestamps) - 1)
+        self._data = {}     # record id -> bytes of an edited or inserted record
+        self._packets = {}  # record id -> Packet an edited record was built from
+        self._generations = {}  # record id -> number of edits, for cache keys
+        self._next_id = len(self.index)
+        self._listeners = []
+        self.journal = EditJournal(undo_limit)
+        self._replaying = False  # Set while undoing or redoing, which is not journaled
+
+    def add_listener(self, listener):
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, method, *args):
+        for listener in self._listeners:
+            getattr(listener, method)(*args)
+
+    def __len__(self):
+        return len(self._order)
+
+    def __iter__(self):
+        for row in range(len(self._order)):
+            yield self[row]
+
+    def __getitem__(self, row):
+        """Packet at row, dissected from its raw bytes if needed."""
+        record = self._order[row]
+        packet = self._packets.get(record)
+        if packet is None:
+            packet = self._dissect(self.raw(row), self._linktype(record))
+            packet.wirelen = self.wirelen(row)
+        packet.time = self._timestamps[row]
+        return packet
+
+    def __setitem__(self, row, packet):
+        """Replace the packet at row, keeping its timestamp."""
+        self.replace(row, bytes(packet), packet)
+
+    def generation(self, row):
+        """Number of times the packet at row has been edited."""
+        return self._generations.get(self._order[row], 0)
+
+    def key(self, row):
+        """Cache key of the packet at row; changes whenever the packet is edited."""
+        record = self._order[row]
+        return record, self._generations.get(record, 0)
+
+    def _touch(self, row):
+        record = self._order[row]
+        self._generations[record] = self._generations.get(record, 0) + 1
+
+    def raw(self, row):
+        """Raw bytes of the packet at row; a memoryview for unedited packets."""
+        record = self._order[row]
+        data = self._data.get(record)
+        if data is not None:
+            return data
+        offset = self.index.offsets[record]
+        return self._views[self._part_of(record)][offset:offset + self.index.caplens[record]]
+
+    def _part_of(self, record):
+        """Number of the file a record of the files comes from."""
+        return bisect_right(self._bases, record) - 1
+
+    def linktype_at(self, row):
+        """Linktype of the packet at row."""
+        return self._linktype(self._order[row])
+
+    def file_record(self, row):
+        """(file number, offset, caplen, wirelen) of the packet at row in its
+        capture file, or None if it was edited or inserted."""
+        record = self._order[row]
+        if record >= len(self.index) or record in self._data:
+            return None
+        index = self.index
+        return self._part_of(record), index.offsets[record], index.caplens[record], index.wirelens[record]
+
+    def view(self, part):
+        """Memory mapping of the capture file numbered part."""
+        return self._views[part]
+
+    @property
+    def bases(self):
+        """Record id of the first record of each capture file."""
+        return self._bases
+
+    def wirelen(self, row):
+        record = self._order[row]
+        data = self._data.get(record)
+        if data is not None:
+            return len(data)
+        return self.index.wirelens[record]
+
+    def replace(self, row, data, packet=None):
+        """Replace the bytes of the packet at row."""
+        record = self._order[row]
+        if not self._replaying:
+            old = self.raw(row)
+            start, old_end, new_end = _changed_span(old, data)
+            if record < len(self.index) and record not in self._data:
+                undo = ("_restore", (row,))
+            else:
+                undo = ("_splice", (row, start, new_end - start, bytes(old[start:old_end])))
+            redo = ("_splice", (row, start, old_end - start, bytes(data[start:new_end])))
+            self.journal.record(row, undo, redo)
+        self._data[record] = bytes(data)
+        if packet is not None:
+            self._packets[record] = packet
+        else:
+            self._packets.pop(record, None)
+        self._touch(row)
+        self._notify("rows_changed", row, row)
+
+    def replace_rows(self, rows, datas):
+        """Replace the bytes of the packets at rows with datas, as one edit
+        in the journal and one notification.  Returns the number of packets."""
+        rows = array("q", rows)
+        starts = array("q")
+        old_sizes = array("q")
+        new_sizes = array("q")
+        before = bytearray()
+        after = bytearray()
+        for row, data in zip(rows, datas):
+            record = self._order[row]
+            old = self.raw(row)
+            start, old_end, new_end = _changed_span(old, data)
+            starts.append(start)
+            old_sizes.append(old_end - start)
+            new_sizes.append(new_end - start)
+            before += old[start:old_end]
+            after += data[start:new_end]
+            self._data[record] = bytes(data)
+            self._packets.pop(record, None)
+            self._touch(row)
+        if rows:
+            if not self._replaying:
+                self.journal.record(rows[0], ("_splice_rows", (rows, starts, new_sizes, bytes(before), old_sizes)),
+                                    ("_splice_rows", (rows, starts, old_sizes, bytes(after), new_sizes)))
+            self._notify("rows_changed", min(rows), max(rows))
+        return len(rows)
+
+    def patch(self, row, patches, packet=None, fixup=False):
+        """Overwrite byte ranges of the packet at row; patches is [(offset, bytes)].
+
+        packet is the dissection of the bytes before the edit, if the caller
+        has one.  The edited packet is then dissected again only from the
+        first layer the patches touch, reusing the layers outside them.
+
+        With fixup, the checksums the patches invalidated are brought up to
+        date as well, see fix_packet().
+        """
+        old = self.raw(row)
+        data = bytearray(old)
+        for offset, chunk in patches:
+            data[offset:offset + len(chunk)] = chunk
+        spans = [(offset, offset + len(chunk)) for offset, chunk in patches]
+        if fixup:
+            record = self._order[row]
+            spans += fix_packet(data, self._linktype(record), old, spans, lengths=False)
+        if packet is None:
+            packet = self._packets.get(self._order[row])
+        new_packet = None
+        if packet is not None and spans and packet.original == old:
+            first = min(start for start, _ in spans)
+            last = max(end for _, end in spans)
+            new_packet = redissect(packet, data, first, last)
+        self.replace(row, data, new_packet)
+
+    def fixup(self, rows=None):
+        """Bring the lengths and checksums of rows (default: all) up to date.
+
+        Works on the raw bytes, see fix_packet().  Packets edited since
+        they were read from the file have their checksums updated from
+        their changes to the file's bytes.  Packets whose size changed,
+        such as scapy edits that kept the dissected length fields, and
+        inserted packets have their IP and UDP lengths set from their size
+        as well.  Packets as read from the file are left alone.  The
+        changes are one edit in the journal.  Returns the number of
+        packets changed.
+        """
+        if rows is None:
+            rows = range(len(self._order))
+        fixed = array("q")
+        starts = array("q")
+        sizes = array("q")
+        before = bytearray()
+        after = bytearray()
+        index = self.index
+        for row in rows:
+            record = self._order[row]
+            current = self._data.get(record)
+            if current is None:
+                continue
+            data = bytearray(current)
+            old = spans = None
+            wirelen = None
+            if record < len(index):
+                offset = index.offsets[record]
+                source = self._views[self._part_of(record)][offset:offset + index.caplens[record]]
+                if len(source) == len(data):
+                    start, _, end = _changed_span(source, data)
+                    old, spans = source, [(start, end)]
+                elif index.wirelens[record] > len(source):
+                    wirelen = index.wirelens[record]  # Truncated by the capture
+            changed = fix_packet(data, self._linktype(record), old, spans, wirelen, lengths=old is None)
+            if not changed:
+                continue
+            start, end = changed[0][0], changed[-1][1]
+            fixed.append(row)
+            starts.append(start)
+            sizes.append(end - start)
+            before += current[start:end]
+            after += data[start:end]
+            self._data[record] = bytes(data)
+            self._packets.pop(record, None)
+            self._touch(row)
+        if fixed:
+            if not self._replaying:
+                self.journal.record(fixed[0], ("_splice_rows", (fixed, starts, sizes, bytes(before))),
+                                    ("_splice_rows", (fixed, starts, sizes, bytes(after))))
+            self._notify("rows_changed", min(fixed), max(fixed))
+        return len(fixed)
+
+    def insert(self, row, packet):
+        """Insert a packet before row, using the packet's own timestamp."""
+        record = self._next_id
+        self._next_id += 1
+        self._data[record] = bytes(packet)
+        self._packets[record] = packet
+        self._order.insert(row, record)
+        self._insert_timestamp(row, float(getattr(packet, "time", 0)))
+        if not self._replaying:
+            redo = ("_reinsert", (row, record, self._data[record], self._timestamps[row]))
+            self.journal.record(row, ("remove", (row,)), redo)
+        self._notify("rows_inserted", row, 1)
+
+    def remove(self, row):
+        """Remove the packet at row."""
+        record = self._order.pop(row)
+        timestamp = self._pop_timestamp(row)
+        if not self._replaying:
+            # Records of the file come back from the file; only edits are kept
+            undo = ("_reinsert", (row, record, self._data.get(record), timestamp))
+            self.journal.record(row, undo, ("remove", (row,)))
+        self._data.pop(record, None)
+        self._packets.pop(record, None)
+        # The generation stays, so cache keys stay unique if the row comes back
+        self._notify("rows_removed", row, 1)
+
+    def move(self, row, new_row):
+        """Move the packet at row so that it ends up at new_row."""
+        record = self._order.pop(row)
+        timestamp = self._pop_timestamp(row)
+        self._order.insert(new_row, record)
+        self._insert_timestamp(new_row, timestamp)
+        if not self._replaying:
+            self.journal.record(new_row, ("move", (new_row, row)), ("move", (row, new_row)))
+        self._notify("rows_moved", row, new_row)
+
+    def timestamp(self, row):
+        """Timestamp of the packet at row, without dissecting it."""
+        return self._timestamps[row]
+
+    def set_timestamp(self, row, timestamp):
+        if not self._replaying:
+            undo = ("set_timestamp", (row, self._timestamps[row]))
+            self.journal.record(row, undo, ("set_timestamp", (row, timestamp)))
+        self._descents -= self._count_descents(row, row + 1)
+        self._timestamps[row] = timestamp
+        self._descents += self._count_descents(row, row + 1)
+        self._touch(row)
+        self._notify("rows_changed", row, row)
+
+    def _span(self, first, last):
+        if last is None:
+            last = len(self._order) - 1
+        if not 0 <= first <= last < len(self._order):
+            raise IndexError(f"row range {first}..{last} out of range")
+        return first, last
+
+    def _timestamp_view(self, first, last):
+        """NumPy view of the timestamps of rows first..last, sharing memory.
+
+        Drop the view before returning: the array cannot grow or shrink
+        while it is exported.
+        """
+        return numpy.frombuffer(self._timestamps, dtype=numpy.float64)[first:last + 1]
+
+    # The bulk operations below leave the generations alone: they only move
+    # packets in time, and touching millions of records would dominate the
+    # cost.  Views keyed by key() must key timestamp text by the value.
+
+    def shift_timestamps(self, delta, first=0, last=None):
+        """Add delta seconds to the timestamps of rows first..last (default: all)."""
+        first, last = self._span(first, last)
+        self._journal_timestamps(first, last, ("shift_timestamps", (delta, first, last)))
+        self._descents -= self._count_descents(first, last + 1)
+        if numpy is not None:
+            ts = self._timestamp_view(first, last)
+            ts += delta
+            del ts
+        else:
+            self._timestamps[first:last + 1] = array("d", [t + delta for t in self._timestamps[first:last + 1]])
+        self._descents += self._count_descents(first, last + 1)
+        self._notify("rows_changed", first, last)
+
+    def scale_timestamps(self, factor, first=0, last=None):
+        """Multiply the gaps between rows first..last by factor, keeping the first timestamp."""
+        first, last = self._span(first, last)
+        self._journal_timestamps(first, last, ("scale_timestamps", (factor, first, last)))
+        self._descents -= self._count_descents(first, last + 1)
+        origin = self._timestamps[first]
+        if numpy is not None:
+            ts = self._timestamp_view(first, last)
+            ts -= origin
+            ts *= factor
+            ts += origin
+            del ts
+        else:
+            self._timestamps[first:last + 1] = array(
+                "d", [origin + (t - origin) * factor for t in self._timestamps[first:last + 1]]
+            )
+        self._descents += self._count_descents(first, last + 1)
+        self._notify("rows_changed", first, last)
+
+    def space_timestamps(self, interval, first=0, last=None, start=None):
+        """Re-space rows first..last interval seconds apart, from start
+        (default: the current timestamp of row first)."""
+        first, last = self._span(first, last)
+        if start is None:
+            start = self._timestamps[first]
+        self._journal_timestamps(first, last, ("space_timestamps", (interval, first, last, start)))
+        self._descents -= self._count_descents(first, last + 1)
+        if numpy is not None:
+            ts = self._timestamp_view(first, last)
+            ts[:] = numpy.arange(last - first + 1, dtype=numpy.float64)
+            ts *= interval
+            ts += start
+            del ts
+        else:
+            self._timestamps[first:last + 1] = array(
+                "d", [start + i * interval for i in range(last - first + 1)]
+            )
+        self._descents += self._count_descents(first, last + 1)
+        self._notify("rows_changed", first, last)
+
+    def _journal_timestamps(self, first, last, redo):
+        if not self._replaying:
+            self.journal.record(first, ("_restore_timestamps", (first, self._timestamps[first:last + 1])), redo)
+
+    def _restore_timestamps(self, first, timestamps):
+        last = first + len(timestamps) - 1
+        self._descents -= self._count_descents(first, last + 1)
+        self._timestamps[first:last + 1] = timestamps
+        self._descents += self._count_descents(first, last + 1)
+        self._notify("rows_changed", first, last)
+
+    def _splice(self, row, start, length, chunk):
+        data = bytearray(self.raw(row))
+        data[start:start + length] = chunk
+        self.replace(row, data)
+
+    def _splice_rows(self, rows, starts, lengths, chunks, sizes=None):
+        """Replace byte ranges of several rows, as one change: lengths bytes
+        at starts with sizes bytes of chunks, by default as many."""
+        if sizes is None:
+            sizes = lengths
+        offset = 0
+        for row, start, length, size in zip(rows, starts, lengths, sizes):
+            record = self._order[row]
+            data = bytearray(self.raw(row))
+            data[start:start + length] = chunks[offset:offset + size]
+            offset += size
+            self._data[record] = bytes(data)
+            self._packets.pop(record, None)
+            self._touch(row)
+        if rows:
+            self._notify("rows_changed", min(rows), max(rows))
+
+    def _restore(self, row):
+        """Go back to the bytes of the file for the record at row."""
+        record = self._order[row]
+        self._data.pop(record, None)
+        self._packets.pop(record, None)
+        self._touch(row)
+        self._notify("rows_changed", row, row)
+
+    def _reinsert(self, row, record, data, timestamp):
+        if data is not None:
+            self._data[record] = data
+        self._order.insert(row, record)
+        self._insert_timestamp(row, timestamp)
+        self._touch(row)
+        self._notify("rows_inserted", row, 1)
+
+    def _replay(self, step):
+        name, args = step
+        self._replaying = True
+        try:
+            getattr(self, name)(*args)
+        finally:
+            self._replaying = False
+
+    def undo(self):
+        """Revert the latest edit; returns the row it was about, or None if there is none."""
+        entry = self.journal.pop_undo()
+        if entry is None:
+            return None
+        self._replay(entry.undo)
+        return entry.row
+
+    def redo(self):
+        """Apply the latest undone edit again; returns its row, or None."""
+        entry = self.journal.pop_redo()
+        if entry is None:
+            return None
+        self._replay(entry.redo)
+        return entry.row
+
+    def _count_descents(self, first, last):
+        """Number of rows in first..last that are earlier than the row before them."""
+        first, last = max(first, 1), min(last, len(self._timestamps) - 1)
+        if first > last:
+            return 0
+        if numpy is not None:
+            ts = self._timestamp_view(first - 1, last)
+            count = int(numpy.count_nonzero(ts[1:] < ts[:-1]))
+            del ts
+            return count
+        ts = self._timestamps
+        return sum(map(lt, ts[first:last + 1], ts[first - 1:last]))
+
+    def _insert_timestamp(self, row, timestamp):
+        # The new row splits the pair (row - 1, row) in two
+        self._descents -= self._count_descents(row, row)
+        self._timestamps.insert(row, timestamp)
+        self._descents += self._count_descents(row, row + 1)
+
+    def _pop_timestamp(self, row):
+        self._descents -= self._count_descents(row, row + 1)
+        timestamp = self._timestamps.pop(row)
+        self._descents += self._count_descents(row, row)
+        return timestamp
+
+    @property
+    def chronological(self):
+        """True if no packet is earlier than the one before it."""
+        return self._descents == 0
+
+    def out_of_order_regions(self):
+        """(first, last) row ranges that each start with a packet earlier
+        than the one before it and run while timestamps keep falling
+        behind the latest one seen before the range."""
+        if self._descents == 0:
+            return []
+        if numpy is not None:
+            ts = numpy.frombuffer(self._timestamps, dtype=numpy.float64)
+            # behind[row + 1] is set if row is earlier than a row before it
+            behind = numpy.zeros(len(ts) + 2, dtype=numpy.int8)
+            behind[2:-1] = ts[1:] < numpy.maximum.accumulate(ts)[:-1]
+            del ts
+            edges = numpy.flatnonzero(numpy.diff(behind))
+            return [(int(start), int(stop) - 1) for start, stop in zip(edges[::2], edges[1::2])]
+        regions = []
+        ts = self._timestamps
+        latest = ts[0]
+        first = None
+        for row in range(1, len(ts)):
+            if ts[row] < latest:
+                if first is None:
+                    first = row
+            else:
+                if first is not None:
+                    regions.append((first, row - 1))
+                    first = None
+                latest = ts[row]
+        if first is not None:
+            regions.append((first, len(ts) - 1))
+        return regions
+
+    def find_time(self, timestamp):
+        """First row whose timestamp is at or after timestamp, or len(self).
+
+        Binary search while the capture is chronological; otherwise the
+        first such row in file order is found with a scan.
+        """
+        if self._descents == 0:
+            return bisect_left(self._timestamps, timestamp)
+        if numpy is not None:
+            ts = numpy.frombuffer(self._timestamps, dtype=numpy.float64)
+            later = numpy.flatnonzero(ts >= timestamp)
+            del ts
+            return int(later[0]) if len(later) else len(self._timestamps)
+        for row, value in enumerate(self._timestamps):
+            if value >= timestamp:
+                return row
+        return len(self._timestamps)
+
+    def chronological_row(self, timestamp, near=None):
+        """Row at which a packet with timestamp keeps the capture in time order.
+
+        near is a preferred row, used if the packet fits there.  Otherwise
+        the row is that of the first packet later than timestamp, so that
+        no packet before it is later, found by binary search while the
+        capture is chronological and over the running maximum of the
+        timestamps if not.
+        """
+        ts = self._timestamps
+        if near is not None and 0 <= near <= len(ts):
+            if (near == 0 or ts[near - 1] <= timestamp) and (near == len(ts) or timestamp <= ts[near]):
+                return near
+        if self._descents == 0:
+            return bisect_right(ts, timestamp)
+        if numpy is not None:
+            latest = numpy.maximum.accumulate(numpy.frombuffer(ts, dtype=numpy.float64))
+            return int(numpy.searchsorted(latest, timestamp, side="right"))
+        return next((row for row, value in enumerate(ts) if value > timestamp), len(ts))
+
+    def insert_chronological(self, packet, near=None):
+        """Insert a packet where its timestamp belongs and return its row."""
+        row = self.chronological_row(float(getattr(packet, "time", 0)), near)
+        self.insert(row, packet)
+        return row
+
+    def _linktype(self, record):
+        if record < len(self.index):
+            return self.index.linktype_of(record)
+        return self.linktype
+
+    @profiled("dissect")
+    def _dissect(self, data, linktype=None):
+        from scapy.all import conf, Raw
+        cls = conf.l2types.get(self.linktype if linktype is None else linktype, Raw)
+        data = bytes(data)
+        try:
+            return cls(data)
+        except Exception:
+            return Raw(load=data)
+
+    def _is_unchanged(self, row):
+        record = self._order[row]
+        return (record < len(self.index) and record not in self._data
+                and self._timestamps[row] == self.index.timestamps[record])
+
+    def _output(self):
+        """Yield the output in order, as (part, row, None) for rows to write
+        and (part, None, (start, end)) for byte ranges of the source to
+        copy, where part is the number of the source file.
+
+        Blocks of a source that hold no packet (pcapng section and
+        interface headers, comments, statistics...) are copied ahead of the
+        first packet that followed them in the source.  Inserted packets go
+        with the packet of the files before them.
+        """
+        parts, bases = self._parts, self._bases
+        pending = [0] * len(parts)  # Next block of each part to copy
+        for part, index in enumerate(parts):
+            blocks = index.blocks
+            while pending[part] < len(blocks) and blocks[pending[part]][0] == 0:
+                yield part, None, blocks[pending[part]][1:]
+                pending[part] += 1
+        part = 0
+        for row in range(len(self._order)):
+            record = self._order[row]
+            if record < len(self.index):
+                part = self._part_of(record)
+                local = record - bases[part]
+                blocks = parts[part].blocks
+                while pending[part] < len(blocks) and blocks[pending[part]][0] <= local:
+                    yield part, None, blocks[pending[part]][1:]
+                    pending[part] += 1
+                if self._is_unchanged(row):
+                    yield part, None, parts[part].record_range(local)
+                    continue
+            yield part, row, None
+        for part, index in enumerate(parts):
+            for _, start, end in index.blocks[pending[part]:]:
+                yield part, None, (start, end)
+
+    def _copy_runs(self):
+        """The output of _output(), with byte ranges that follow each other
+        in a source merged, so that unchanged stretches of the files are
+        copied at once."""
+        runs = {}  # part -> (start, end) of the range being extended
+        for part, row, byte_range in self._output():
+            run = runs.get(part)
+            if row is None and run is not None and byte_range[0] == run[1]:
+                runs[part] = (run[0], byte_range[1])
+                continue
+            if run is not None:
+                yield part, None, runs.pop(part)
+            if row is None:
+                runs[part] = byte_range
+            else:
+                yield part, row, None
+        for part, run in runs.items():
+            yield part, None, run
+
+    def _near_record(self, row):
+        """The closest record of the file at or before row, if any."""
+        for row in range(row, -1, -1):
+            if self._order[row] < len(self.index):
+                return self._order[row]
+        return None
+
+    def _copy_range(self, f, part, start, end):
+        """Copy bytes [start, end) of a source file to f, in the kernel if possible."""
+        f.flush()
+        src, dst = self._files[part].fileno(), f.fileno()
+        for copy in (_copy_file_range, _sendfile):
+            if copy is None:
+                continue
+            try:
+                while start < end:
+                    copied = copy(src, dst, start, end - start)
+                    if copied == 0:
+                        break
+                    start += copied
+                if start >= end:
+                    return
+            except OSError:
+                # Not supported between these files; try the next way
+                pass
+        f.write(self._views[part][start:end])
+
+    @profiled("save")
+    def save(self, filename):
+        """Write the capture atomically, copying unchanged records from the source.
+
+        Runs of unchanged records that are still adjacent in the file are
+        copied as single byte ranges, so saving costs time in proportion to
+        the edited, inserted and moved records rather than the capture size.
+        The file keeps the format of the source; edited pcapng packets keep
+        their interface and options.  The output goes to a temporary file
+        that is renamed over filename.
+
+        A capture of several files is saved to a list of files, one per
+        source file, each getting the rows of its source in row order.
+        """
+        targets = [filename] if isinstance(filename, (str, os.PathLike)) else list(filename)
+        if len(targets) != len(self.filenames):
+            raise ValueError(f"expected {len(self.filenames)} output files, one per source file")
+        temps, outputs = [], []
+        try:
+            for target in targets:
+                target = os.path.abspath(target)
+                fd, tmp = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=os.path.dirname(target))
+                temps.append((tmp, target))
+                outputs.append(os.fdopen(fd, "wb"))
+            for f, index in zip(outputs, self._parts):
+                f.write(index.global_header)
+            for part, row, byte_range in self._copy_runs():
+                f = outputs[part]
+                if byte_range is not None:
+                    self._copy_range(f, part, *byte_range)
+                    continue
+                record = self._order[row]
+                is_file_record = record < len(self.index)
+                if not is_file_record:
+                    record = self._near_record(row)
+                self._parts[part].write_record(
+                    f, self._views[part], self.raw(row), self._timestamps[row], self.wirelen(row),
+                    None if record is None else record - self._bases[part], options=is_file_record,
+                )
+            for f in outputs:
+                f.close()
+            for (tmp, target), source in zip(temps, self.filenames):
+                # Keep the permissions of the file being replaced, or of the source
+                mode_from = target if os.path.exists(target) else source
+                os.chmod(tmp, os.stat(mode_from).st_mode & 0o7777)
+                os.replace(tmp, target)
+        except BaseException:
+            for f in outputs:
+                f.close()
+            for tmp, _ in temps:
+                if os.path.exists(tmp):
+                    os.unlink(tmp)
+            raise
+
+    def close(self):
+        for view, mapping in zip(self._views, self._mmaps):
+            try:
+                view.release()
+                mapping.close()
+            except BufferError:
+                # A panel still holds a slice; the mapping goes away with it
+                pass
+        for f in self._files:
+            f.close()
@@ -0,0 +1,157 @@
+import mmap
+import os
+import struct
+from array import array
+from decimal import Decimal
+
+# Global header magic numbers, as read in little-endian byte order
+PCAP_MAGIC_USEC = 0xa1b2c3d4
+PCAP_MAGIC_NSEC = 0xa1b23c4d
+
+PCAP_GLOBAL_HEADER_LEN = 24
+PCAP_RECORD_HEADER_LEN = 16
+
+
+def parse_global_header(header, filename=""):
+    """(endian, nsec, snaplen, linktype) of a pcap global header."""
+    if len(header) < PCAP_GLOBAL_HEADER_LEN:
+        raise ValueError(f"{filename}: file too short for a pcap header")
+    magic = struct.unpack("<I", header[:4])[0]
+    if magic in (PCAP_MAGIC_USEC, PCAP_MAGIC_NSEC):
+        endian = "<"
+    else:
+        magic = struct.unpack(">I", header[:4])[0]
+        if magic not in (PCAP_MAGIC_USEC, PCAP_MAGIC_NSEC):
+            raise ValueError(f"{filename}: not a pcap file (magic {header[:4].hex()})")
+        endian = ">"
+    _, _, _, _, snaplen, linktype = struct.unpack(endian + "HHiIII", header[4:24])
+    return endian, magic == PCAP_MAGIC_NSEC, snaplen, linktype
+
+
+def timestamp_units(timestamp, units, offset=0):
+    """Whole units (per second) since offset of a timestamp in epoch seconds.
+
+    Converted through the decimal the float prints as, which is exact to
+    the float's precision, rather than by multiplying the float.
+    """
+    return round((Decimal(repr(timestamp)) - offset) * units)
+
+
+def iter_records(f, endian, count=None):
+    """Read records sequentially from the current position of f.
+
+    Yields (sec, frac, caplen, wirelen, data) for at most count records,
+    holding one record in memory at a time; stops at end of file or at a
+    truncated record.
+    """
+    unpack = struct.Struct(endian + "IIII").unpack
+    read = f.read
+    while count is None or count > 0:
+        header = read(PCAP_RECORD_HEADER_LEN)
+        if len(header) < PCAP_RECORD_HEADER_LEN:
+            return
+        sec, frac, caplen, wirelen = unpack(header)
+        data = read(caplen)
+        if len(data) < caplen:
+            return
+        yield sec, frac, caplen, wirelen, data
+        if count is not None:
+            count -= 1
+
+
+class PcapIndex:
+    """Offset/length/timestamp index of the records in a classic pcap file.
+
+    The index is built with a single pass over the record headers; packet
+    bytes are never read, so memory only grows with the number of records
+    (32 bytes each) and not with the size of the capture.  The seconds and
+    fractions of the record headers are kept as they are, so that saving
+    writes back the timestamps that were not edited exactly.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.endian = "<"
+        self.nsec = False
+        self.linktype = 1
+        self.snaplen = 65535
+        self.global_header = b""
+        self.blocks = []               # Classic pcap files have no other blocks
+        self.offsets = array("Q")      # Offset of the packet data of each record
+        self.caplens = array("I")      # Captured length of each record
+        self.wirelens = array("I")     # Original (on the wire) length of each record
+        self.timestamps = array("d")   # Epoch seconds of each record
+        self.secs = array("I")         # Seconds of the header of each record
+        self.fracs = array("I")        # Micro- or nanoseconds of the header of each record
+        self.truncated = False         # True if the file ends in the middle of a record
+        self._build()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def _parse_global_header(self, header):
+        self.endian, self.nsec, self.snaplen, self.linktype = parse_global_header(header, self.filename)
+        self.global_header = bytes(header[:PCAP_GLOBAL_HEADER_LEN])
+        self._record_header = struct.Struct(self.endian + "IIII")
+
+    def _build(self):
+        with open(self.filename, "rb") as f:
+            self._parse_global_header(f.read(PCAP_GLOBAL_HEADER_LEN))
+            size = os.fstat(f.fileno()).st_size
+            if size <= PCAP_GLOBAL_HEADER_LEN:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                self._scan(buf, size)
+
+    def _scan(self, buf, size):
+        unpack_from = struct.Struct(self.endian + "IIII").unpack_from
+        scale = 1e-9 if self.nsec else 1e-6
+        # Bind the append methods once; this loop runs once per record
+        add_offset = self.offsets.append
+        add_caplen = self.caplens.append
+        add_wirelen = self.wirelens.append
+        add_timestamp = self.timestamps.append
+        add_sec = self.secs.append
+        add_frac = self.fracs.append
+
+        pos = PCAP_GLOBAL_HEADER_LEN
+        last_header = size - PCAP_RECORD_HEADER_LEN
+        while pos <= last_header:
+            sec, frac, caplen, wirelen = unpack_from(buf, pos)
+            pos += PCAP_RECORD_HEADER_LEN
+            if pos + caplen > size:
+                break
+            add_offset(pos)
+            add_caplen(caplen)
+            add_wirelen(wirelen)
+            add_timestamp(sec + frac * scale)
+            add_sec(sec)
+            add_frac(frac)
+            pos += caplen
+        self.truncated = pos != size
+
+    def linktype_of(self, record):
+        return self.linktype
+
+    def record_linktypes(self, first, last):
+        """Linktype of each of the records first to last - 1."""
+        return [self.linktype] * (min(last, len(self)) - first)
+
+    def record_range(self, record):
+        """(start, end) of a record, including its header, in the file."""
+        offset = self.offsets[record]
+        return offset - PCAP_RECORD_HEADER_LEN, offset + self.caplens[record]
+
+    def write_record(self, f, view, data, timestamp, wirelen, record=None, options=True):
+        """Write a record header and data; records carry nothing else to keep.
+
+        The header timestamp of record is kept unless timestamp differs
+        from it; for a new packet record is a nearby one, with options False.
+        """
+        if options and record is not None and timestamp == self.timestamps[record]:
+            sec, frac = self.secs[record], self.fracs[record]
+        else:
+            scale = 1000000000 if self.nsec else 1000000
+            sec, frac = divmod(timestamp_units(timestamp, scale), scale)
+        f.write(self._record_header.pack(sec, frac, len(data), max(len(data), wirelen)))
+        f.write(data)
@@ -0,0 +1,216 @@
+import mmap
+import os
+import struct
+from array import array
+from collections import namedtuple
+from .pcap_index import PcapIndex, timestamp_units
+
+# Block types; the section header's type reads the same in both byte orders
+SHB_TYPE = 0x0A0D0D0A
+IDB_TYPE = 0x00000001
+SPB_TYPE = 0x00000003
+EPB_TYPE = 0x00000006
+BYTE_ORDER_MAGIC = 0x1A2B3C4D
+
+EPB_HEADER_LEN = 28
+SPB_HEADER_LEN = 12
+BLOCK_TRAILER_LEN = 4
+
+# Interface description options
+IF_TSRESOL = 9
+IF_TSOFFSET = 14
+
+Interface = namedtuple("Interface", "linktype snaplen units offset endian local_id")
+
+
+def _pad(length):
+    return -length % 4
+
+
+def _parse_interface(buf, pos, length, endian, local_id):
+    linktype, _, snaplen = struct.unpack_from(endian + "HHI", buf, pos + 8)
+    units, offset = 1000000, 0
+    end = pos + length - BLOCK_TRAILER_LEN
+    option = pos + 16
+    while option + 4 <= end:
+        code, size = struct.unpack_from(endian + "HH", buf, option)
+        if code == 0:
+            break
+        value = option + 4
+        if code == IF_TSRESOL and size >= 1:
+            resolution = buf[value]
+            units = 2 ** (resolution & 0x7f) if resolution & 0x80 else 10 ** resolution
+        elif code == IF_TSOFFSET and size >= 8:
+            offset = struct.unpack_from(endian + "q", buf, value)[0]
+        option = value + size + _pad(size)
+    return Interface(linktype, snaplen, units, offset, endian, local_id)
+
+
+def open_index(filename):
+    """PcapngIndex or PcapIndex of filename, depending on its first block."""
+    with open(filename, "rb") as f:
+        magic = f.read(4)
+    if len(magic) == 4 and struct.unpack("<I", magic)[0] == SHB_TYPE:
+        return PcapngIndex(filename)
+    return PcapIndex(filename)
+
+
+class PcapngIndex:
+    """Offset/length/timestamp index of the packets in a pcapng file.
+
+    Enhanced and simple packet blocks are indexed like the records of a
+    classic pcap file, with one pass over the block headers.  Every other
+    block (section and interface headers, name resolution, statistics,
+    custom blocks...) is remembered as a byte range of the file together
+    with the number of packets before it, so that it can be copied back
+    unchanged on save.  Interfaces are numbered across sections; each
+    packet records the interface it was captured on, and so its linktype
+    and timestamp resolution, and the timestamp units of its block, which
+    are written back as they are unless the timestamp was edited.
+    """
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.endian = "<"
+        self.linktype = 1
+        self.global_header = b""      # Section headers are kept in blocks
+        self.interfaces = []          # Interface of each interface id, across sections
+        self.blocks = []              # (packets before it, start, end) of each non-packet block
+        self.offsets = array("Q")     # Offset of the packet data of each packet
+        self.caplens = array("I")     # Captured length of each packet
+        self.wirelens = array("I")    # Original (on the wire) length of each packet
+        self.timestamps = array("d")  # Epoch seconds of each packet
+        self.units = array("Q")       # Timestamp of the block of each packet, in its interface's units
+        self.record_interfaces = array("I")  # Interface id of each packet
+        self.block_offsets = array("Q")      # Offset of the block of each packet
+        self.block_lengths = array("I")      # Total length of the block of each packet
+        self.truncated = False        # True if the file ends in the middle of a block
+        self._build()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def _build(self):
+        with open(self.filename, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < 12:
+                raise ValueError(f"{self.filename}: file too short for a pcapng header")
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                self._scan(buf, size)
+        if self.interfaces:
+            self.linktype = self.interfaces[0].linktype
+
+    def _scan(self, buf, size):
+        add_block = self.blocks.append
+        add_offset = self.offsets.append
+        add_caplen = self.caplens.append
+        add_wirelen = self.wirelens.append
+        add_timestamp = self.timestamps.append
+        add_units = self.units.append
+        add_interface = self.record_interfaces.append
+        add_block_offset = self.block_offsets.append
+        add_block_length = self.block_lengths.append
+
+        endian = self.endian
+        section = []  # Interface ids of the current section, by local id
+        epb = struct.Struct(endian + "IIIII")
+        pos = 0
+        while pos + 12 <= size:
+            block_type = struct.unpack_from(endian + "I", buf, pos)[0]
+            if block_type == SHB_TYPE:
+                if struct.unpack_from("<I", buf, pos + 8)[0] == BYTE_ORDER_MAGIC:
+                    endian = "<"
+                elif struct.unpack_from(">I", buf, pos + 8)[0] == BYTE_ORDER_MAGIC:
+                    endian = ">"
+                else:
+                    raise ValueError(f"{self.filename}: bad pcapng byte-order magic at offset {pos}")
+                if pos == 0:
+                    self.endian = endian
+                epb = struct.Struct(endian + "IIIII")
+                section = []
+            length = struct.unpack_from(endian + "I", buf, pos + 4)[0]
+            if length < 12 or length % 4 or pos + length > size:
+                break
+
+            if block_type == EPB_TYPE and length >= EPB_HEADER_LEN + BLOCK_TRAILER_LEN:
+                local_id, high, low, caplen, wirelen = epb.unpack_from(buf, pos + 8)
+                if local_id < len(section):
+                    interface = section[local_id]
+                    info = self.interfaces[interface]
+                    add_offset(pos + EPB_HEADER_LEN)
+                    add_caplen(min(caplen, length - EPB_HEADER_LEN - BLOCK_TRAILER_LEN))
+                    add_wirelen(wirelen)
+                    add_timestamp(((high << 32) | low) / info.units + info.offset)
+                    add_units((high << 32) | low)
+                    add_interface(interface)
+                    add_block_offset(pos)
+                    add_block_length(length)
+                    pos += length
+                    continue
+            elif block_type == SPB_TYPE and section:
+                wirelen = struct.unpack_from(endian + "I", buf, pos + 8)[0]
+                info = self.interfaces[section[0]]
+                caplen = min(wirelen, length - SPB_HEADER_LEN - BLOCK_TRAILER_LEN)
+                if info.snaplen:
+                    caplen = min(caplen, info.snaplen)
+                add_offset(pos + SPB_HEADER_LEN)
+                add_caplen(caplen)
+                add_wirelen(wirelen)
+                add_timestamp(0.0)
+                add_units(0)
+                add_interface(section[0])
+                add_block_offset(pos)
+                add_block_length(length)
+                pos += length
+                continue
+            elif block_type == IDB_TYPE and length >= 20:
+                section.append(len(self.interfaces))
+                self.interfaces.append(_parse_interface(buf, pos, length, endian, len(section) - 1))
+
+            # Anything else, including packets on unknown interfaces, is kept as is
+            add_block((len(self.offsets), pos, pos + length))
+            pos += length
+        self.truncated = pos != size
+
+    def linktype_of(self, record):
+        return self.interfaces[self.record_interfaces[record]].linktype
+
+    def record_linktypes(self, first, last):
+        """Linktype of each of the records first to last - 1."""
+        interfaces = self.interfaces
+        return [interfaces[i].linktype for i in self.record_interfaces[first:last]]
+
+    def record_range(self, record):
+        """(start, end) of the block of a record in the file."""
+        start = self.block_offsets[record]
+        return start, start + self.block_lengths[record]
+
+    def write_record(self, f, view, data, timestamp, wirelen, record=None, options=True):
+        """Write a packet as an enhanced packet block.
+
+        record is the packet of the file that data replaces, whose
+        interface and options (comments, flags...) are kept; for a new
+        packet it is a nearby packet whose interface the new one is written
+        on, with options False.  Without any, the first interface is used.
+        The block timestamp of record is kept unless timestamp differs from it.
+        """
+        interface = self.interfaces[self.record_interfaces[record] if record is not None else 0]
+        trailer = b""
+        if options and record is not None and self.offsets[record] - self.block_offsets[record] == EPB_HEADER_LEN:
+            start, end = self.record_range(record)
+            caplen = self.caplens[record]
+            trailer = view[start + EPB_HEADER_LEN + caplen + _pad(caplen):end - BLOCK_TRAILER_LEN]
+        padding = _pad(len(data))
+        length = EPB_HEADER_LEN + len(data) + padding + len(trailer) + BLOCK_TRAILER_LEN
+        if options and record is not None and timestamp == self.timestamps[record]:
+            units = self.units[record]
+        else:
+            units = max(0, timestamp_units(timestamp, interface.units, interface.offset))
+        f.write(struct.pack(
+            interface.endian + "IIIIIII", EPB_TYPE, length, interface.local_id,
+            units >> 32, units & 0xffffffff, len(data), max(len(data), wirelen),
+        ))
+        f.write(data)
+        f.write(b"\0" * padding)
+        f.write(trailer)
+        f.write(struct.pack(interface.endian + "I", length))
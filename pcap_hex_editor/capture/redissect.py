@@ -0,0 +1,73 @@
+def layer_spans(packet):
+    """(layer, start, size) of each layer of a freshly dissected packet.
+
+    start is the offset of the layer's own bytes in the packet and size the
+    length of the buffer it was dissected from, which includes its payload
+    and padding.  Returns None if the layers do not line up with the
+    packet's original bytes, e.g. after a layer was built or modified.
+    """
+    data = packet.original
+    if not data:
+        return None
+    spans = []
+    start = 0
+    layer = packet
+    while layer:
+        own = layer.raw_packet_cache
+        original = layer.original
+        if own is None or not original or data[start:start + len(original)] != original:
+            return None
+        spans.append((layer, start, len(original)))
+        start += len(own)
+        layer = layer.payload
+    return spans if start == len(data) else None
+
+
+def redissect(packet, data, first, last):
+    """Dissect data, the bytes of packet with [first, last) overwritten.
+
+    Dissection restarts from the innermost layer whose buffer holds the
+    whole edited range; the layers outside it are copied from packet
+    rather than dissected again, which is valid because their own bytes
+    did not change.  Returns None if packet cannot be reused, in which case
+    the caller should dissect data from scratch.
+    """
+    from scapy.all import conf
+    spans = layer_spans(packet)
+    if spans is None or len(data) != len(packet.original):
+        return None
+    index = max(i for i, (_, start, size) in enumerate(spans) if start <= first and last <= start + size)
+    if index == 0:
+        return None
+    layer, start, size = spans[index]
+    end = start + size
+    data = bytes(data)
+
+    head = packet.copy()
+    copies = []
+    copy = head
+    while copy:
+        copies.append(copy)
+        copy = copy.payload
+    under = copies[index - 1]
+    # Padding of the outer layers follows the re-dissected buffer
+    trailer = [copies[i] for i in range(index + 1, len(spans)) if spans[i][1] >= end]
+    under.remove_payload()
+
+    chunk = data[start:end]
+    if isinstance(layer, conf.padding_layer):
+        cls = type(layer)
+    else:
+        cls = under.guess_payload_class(chunk)
+    try:
+        payload = cls(chunk, _internal=1, _underlayer=under)
+    except Exception:
+        payload = conf.raw_layer(chunk, _internal=1, _underlayer=under)
+    under.add_payload(payload)
+    for pad in trailer:
+        pad.remove_payload()
+        head.add_payload(pad)
+    for copy, (_, outer_start, outer_size) in zip(copies[:index], spans):
+        copy.original = data[outer_start:outer_start + outer_size]
+    head.dissection_done(head)
+    return head
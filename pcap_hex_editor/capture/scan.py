@@ -0,0 +1,110 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from .summaries import _worker_view, start_resource_tracker
+
+
+def scan_in_worker(scan_view, filename, params, rows, offsets, caplens, wirelens, timestamps, linktypes):
+    """Run scan_view over records of a capture file; runs in a worker process."""
+    return scan_view(_worker_view(filename), params, rows, offsets, caplens, wirelens, timestamps, linktypes)
+
+
+class ChunkedScan:
+    """Base of scans over the raw bytes of a range of rows, without dissecting.
+
+    Iterating yields a list of results for each consecutive chunk of rows,
+    in row order.  Unedited packets are scanned in the mappings of the
+    capture files, in worker processes if max_workers is not 0, by
+    scan_view(view, params, rows, offsets, caplens, wirelens, timestamps,
+    linktypes), a module-level function that returns results for the given
+    records.
+    Edited and inserted packets are scanned in memory by scan_memory(rows).
+    At most two chunks per worker are in flight at any time.
+    """
+
+    scan_view = None
+
+    def __init__(self, store, params, start=0, stop=None, chunk_size=8192, max_workers=None):
+        self.store = store
+        self.params = params
+        self.start = start
+        self.stop = len(store) if stop is None else min(stop, len(store))
+        self.chunk_size = chunk_size
+        self.max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self._executor = None
+        if self.max_workers:
+            start_resource_tracker()
+
+    def scan_memory(self, rows):
+        raise NotImplementedError
+
+    def _split(self, first):
+        """Rows of the chunk at first, split into the file records of each
+        source file, by file number, and edited rows."""
+        store = self.store
+        last = min(first + self.chunk_size, self.stop)
+        parts, edited = {}, []
+        for row in range(first, last):
+            location = store.file_record(row)
+            if location is not None:
+                part, offset, caplen, wirelen = location
+                records = parts.get(part)
+                if records is None:
+                    records = parts[part] = ([], [], [], [], [], [])
+                rows, offsets, caplens, wirelens, timestamps, linktypes = records
+                rows.append(row)
+                offsets.append(offset)
+                caplens.append(caplen)
+                wirelens.append(wirelen)
+                timestamps.append(store.timestamp(row))
+                linktypes.append(store.linktype_at(row))
+            else:
+                edited.append(row)
+        return parts, edited
+
+    def _submit(self, first):
+        parts, edited = self._split(first)
+        scan_view = type(self).scan_view
+        found = []
+        for part, records in parts.items():
+            if self._executor is None:
+                found.append(scan_view(self.store.view(part), self.params, *records))
+            else:
+                filename = self.store.filenames[part]
+                found.append(self._executor.submit(scan_in_worker, scan_view, filename, self.params, *records))
+        return found, self.scan_memory(edited)
+
+    def __iter__(self):
+        if self.max_workers:
+            # Spawned workers are safe to start from the UI's worker threads
+            self._executor = ProcessPoolExecutor(
+                self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        starts = iter(range(self.start, self.stop, self.chunk_size))
+        pending = deque()
+        in_flight = 2 * max(1, self.max_workers)
+        try:
+            for first in starts:
+                pending.append(self._submit(first))
+                if len(pending) >= in_flight:
+                    break
+            while pending:
+                found, edited = pending.popleft()
+                if self._executor is not None:
+                    found = [future.result() for future in found]
+                following = next(starts, None)
+                if following is not None:
+                    pending.append(self._submit(following))
+                results = found[0] if len(found) == 1 else [result for part in found for result in part]
+                if edited or len(found) > 1:
+                    # Rows of several files, or edited rows, are interleaved
+                    results = sorted(results + edited)
+                yield results
+        finally:
+            self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
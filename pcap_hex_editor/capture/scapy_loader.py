@@ -0,0 +1,18 @@
+import threading
+
+# Importing scapy takes most of the start-up time, so nothing imports it at
+# module level; it is imported in the background once the UI is up, or on
+# first use
+_loaded = threading.Event()
+
+
+def load_scapy():
+    """Import scapy.all, if it is not imported yet, and return it."""
+    import scapy.all
+    _loaded.set()
+    return scapy.all
+
+
+def scapy_loaded():
+    """True once load_scapy() has returned; until then packets are not dissected."""
+    return _loaded.is_set()
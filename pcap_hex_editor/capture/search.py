@@ -0,0 +1,56 @@
+import re
+from .scan import ChunkedScan
+
+SEARCH_MODES = ("ascii", "hex", "regex")
+
+
+def compile_pattern(text, mode="ascii"):
+    """Compile a search for text, given as ASCII, hex digits or a bytes regex."""
+    if mode == "ascii":
+        return re.compile(re.escape(text.encode("latin-1")))
+    if mode == "hex":
+        try:
+            return re.compile(re.escape(bytes.fromhex(text)))
+        except ValueError:
+            raise ValueError(f"invalid hex pattern: {text!r}") from None
+    if mode == "regex":
+        try:
+            return re.compile(text.encode("latin-1"), re.DOTALL)
+        except re.error as e:
+            raise ValueError(f"invalid regex: {e}") from None
+    raise ValueError(f"unknown search mode {mode!r}")
+
+
+def search_view(view, pattern, rows, offsets, caplens, wirelens, timestamps, linktypes):
+    """First match in each record as (row, start, end)."""
+    search = pattern.search
+    matches = []
+    for row, offset, caplen in zip(rows, offsets, caplens):
+        # Search a zero-copy slice, so that anchors see only the packet
+        match = search(view[offset:offset + caplen])
+        if match is not None:
+            matches.append((row, match.start(), match.end()))
+    return matches
+
+
+class PacketSearch(ChunkedScan):
+    """Searches the raw bytes of a range of rows for a compiled pattern.
+
+    Each chunk yields (row, start, end) for the first match in each
+    matching packet.
+    """
+
+    scan_view = staticmethod(search_view)
+
+    def __init__(self, store, pattern, **kwargs):
+        super().__init__(store, pattern, **kwargs)
+        self.pattern = pattern
+
+    def scan_memory(self, rows):
+        search = self.pattern.search
+        matches = []
+        for row in rows:
+            match = search(self.store.raw(row))
+            if match is not None:
+                matches.append((row, match.start(), match.end()))
+        return matches
@@ -0,0 +1,112 @@
+import mmap
+import multiprocessing
+import os
+import sys
+from bisect import bisect_right
+from collections import deque
+from multiprocessing import resource_tracker
+from concurrent.futures import ProcessPoolExecutor
+
+# Per-process mappings of the capture files, so each worker maps a file once
+_worker_maps = {}
+
+
+def _worker_view(filename):
+    view = _worker_maps.get(filename)
+    if view is None:
+        with open(filename, "rb") as f:
+            view = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        _worker_maps[filename] = view
+    return view
+
+
+def summarize_records(filename, linktypes, offsets, caplens):
+    """Summaries of the records at offsets; runs in a worker process."""
+    from scapy.all import conf, Raw
+    view = _worker_view(filename)
+    l2types = conf.l2types
+    summaries = []
+    for linktype, offset, caplen in zip(linktypes, offsets, caplens):
+        data = bytes(view[offset:offset + caplen])
+        try:
+            summaries.append(l2types.get(linktype, Raw)(data).summary())
+        except Exception:
+            summaries.append(Raw(load=data).summary())
+    return summaries
+
+
+def start_resource_tracker():
+    """Start multiprocessing's resource tracker against the real stderr.
+
+    Textual replaces sys.stderr with a capture object whose fileno() is -1,
+    which makes spawning the tracker (and so any worker process) fail.
+    Call this from the UI thread before a process pool is first used.
+    """
+    stderr = sys.stderr
+    sys.stderr = sys.__stderr__
+    try:
+        resource_tracker.ensure_running()
+    finally:
+        sys.stderr = stderr
+
+
+class SummaryLoader:
+    """Computes packet summaries for a range of records in a process pool.
+
+    Iterating yields (first record id, summaries) for consecutive chunks,
+    in record order.  Workers map the capture file themselves, so only
+    offsets and lengths are sent to them, and at most two chunks per worker
+    are in flight at any time.
+    """
+
+    def __init__(self, store, start=0, stop=None, chunk_size=2048, max_workers=None):
+        self.filenames = store.filenames
+        self.bases = store.bases
+        self.index = store.index
+        self.start = start
+        self.stop = len(store.index) if stop is None else min(stop, len(store.index))
+        self.chunk_size = chunk_size
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self._executor = None
+        start_resource_tracker()
+
+    def _chunks(self):
+        """First record ids of the chunks; a chunk never spans two files."""
+        for part, base in enumerate(self.bases):
+            end = self.bases[part + 1] if part + 1 < len(self.bases) else len(self.index)
+            yield from range(max(self.start, base), min(self.stop, end), self.chunk_size)
+
+    def _submit(self, first):
+        part = bisect_right(self.bases, first) - 1
+        last = min(first + self.chunk_size, self.stop)
+        if part + 1 < len(self.bases):
+            last = min(last, self.bases[part + 1])
+        return self._executor.submit(
+            summarize_records, self.filenames[part], self.index.record_linktypes(first, last),
+            self.index.offsets[first:last], self.index.caplens[first:last],
+        )
+
+    def __iter__(self):
+        # Spawned workers are safe to start from the UI's worker threads
+        self._executor = ProcessPoolExecutor(
+            self.max_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        starts = self._chunks()
+        pending = deque()
+        for first in starts:
+            pending.append((first, self._submit(first)))
+            if len(pending) >= 2 * self.max_workers:
+                break
+        while pending:
+            first, future = pending.popleft()
+            summaries = future.result()
+            following = next(starts, None)
+            if following is not None:
+                pending.append((following, self._submit(following)))
+            yield first, summaries
+        self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,170 @@
+import multiprocessing
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from .fixup import fix_packet
+from .packet_store import _changed_span
+from .summaries import start_resource_tracker
+
+# Errors reported per chunk; the rest are only counted
+MAX_CHUNK_ERRORS = 10
+
+_compiled = {}
+
+
+def compile_transform(text):
+    """(code, is_expression) of a transform, or ValueError if it does not compile.
+
+    A transform is an expression over pkt giving the new packet, such as
+    `Ether(dst="aa:bb:cc:dd:ee:ff") / pkt.payload`, a function of the
+    packet, such as `lambda p: p[IP].payload`, or statements that modify
+    pkt in place, such as `pkt[IP].ttl = 64`.
+    """
+    code = _compiled.get(text)
+    if code is None:
+        if not text.strip():
+            raise ValueError("Empty transform")
+        try:
+            code = compile(text, "<transform>", "eval"), True
+        except SyntaxError:
+            try:
+                code = compile(text, "<transform>", "exec"), False
+            except SyntaxError as e:
+                raise ValueError(f"Invalid transform: {e.msg}") from None
+        _compiled[text] = code
+    return code
+
+
+def _apply(code, is_expression, namespace, pkt):
+    namespace["pkt"] = pkt
+    if not is_expression:
+        exec(code, namespace)
+        return namespace["pkt"]
+    result = eval(code, namespace)
+    if callable(result) and not hasattr(result, "build"):
+        result = result(pkt)
+    # Expressions that modify pkt, such as setattr(), give None
+    return pkt if result is None else result
+
+
+def transform_records(text, linktypes, datas, timestamps, fixup=True):
+    """Apply the transform text to packets given as raw bytes; runs in a worker process.
+
+    Returns the new bytes of each packet, None for packets it left as they
+    were or failed on, the number of failures and [(position, message)]
+    for the first MAX_CHUNK_ERRORS of them.  With fixup, the checksums the
+    transform invalidated are brought up to date, see fix_packet(): scapy
+    keeps the checksums and lengths it dissected unless they are deleted.
+    """
+    import scapy.all
+    from scapy.all import conf, Raw
+    code, is_expression = compile_transform(text)
+    namespace = dict(vars(scapy.all))
+    results = []
+    errors = []
+    failed = 0
+    for position, (linktype, data, timestamp) in enumerate(zip(linktypes, datas, timestamps)):
+        try:
+            try:
+                pkt = conf.l2types.get(linktype, Raw)(data)
+            except Exception:
+                pkt = Raw(load=data)
+            pkt.time = timestamp
+            result = _apply(code, is_expression, namespace, pkt)
+            if not hasattr(result, "build"):
+                raise TypeError(f"transform gave {type(result).__name__}, not a packet")
+            new = bytearray(bytes(result))
+        except Exception as e:
+            results.append(None)
+            failed += 1
+            if len(errors) < MAX_CHUNK_ERRORS:
+                errors.append((position, f"{type(e).__name__}: {e}"))
+            continue
+        if new == data:
+            results.append(None)
+            continue
+        if fixup:
+            if len(new) == len(data):
+                start, _, end = _changed_span(data, new)
+                fix_packet(new, linktype, data, [(start, end)], lengths=False)
+            else:
+                fix_packet(new, linktype)
+        results.append(bytes(new))
+    return results, failed, errors
+
+
+class PacketTransform:
+    """Applies a transform, see compile_transform(), to the packets of rows.
+
+    The raw bytes of the packets are shipped in chunks to worker processes
+    if max_workers is not 0, where they are dissected and transformed by
+    scapy.  Iterating yields (count, changes, failed, errors) for each
+    consecutive chunk of rows, in row order: the number of rows in the
+    chunk, [(row, key, data)] for the packets the transform changed, the
+    number of packets it failed on and [(row, message)] for the first few
+    of those.  key is the store's key of the packet when it was read, to
+    tell whether it was edited since.  Nothing is written to the store;
+    see PacketStore.replace_rows().  At most two chunks per worker are in
+    flight at any time.
+    """
+
+    def __init__(self, store, text, rows=None, chunk_size=1024, max_workers=None, fixup=True):
+        compile_transform(text)
+        self.store = store
+        self.text = text
+        self.rows = range(len(store)) if rows is None else rows
+        self.chunk_size = chunk_size
+        self.fixup = fixup
+        self.max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self._executor = None
+        if self.max_workers:
+            start_resource_tracker()
+
+    def __len__(self):
+        return len(self.rows)
+
+    def _submit(self, first):
+        store = self.store
+        rows = self.rows[first:first + self.chunk_size]
+        keys = [store.key(row) for row in rows]
+        linktypes = [store.linktype_at(row) for row in rows]
+        datas = [bytes(store.raw(row)) for row in rows]
+        timestamps = [store.timestamp(row) for row in rows]
+        args = (self.text, linktypes, datas, timestamps, self.fixup)
+        if self._executor is None:
+            result = transform_records(*args)
+        else:
+            result = self._executor.submit(transform_records, *args)
+        return rows, keys, result
+
+    def __iter__(self):
+        if self.max_workers:
+            # Spawned workers are safe to start from the UI's worker threads
+            self._executor = ProcessPoolExecutor(
+                self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        starts = iter(range(0, len(self.rows), self.chunk_size))
+        pending = deque()
+        in_flight = 2 * max(1, self.max_workers)
+        try:
+            for first in starts:
+                pending.append(self._submit(first))
+                if len(pending) >= in_flight:
+                    break
+            while pending:
+                rows, keys, result = pending.popleft()
+                if self._executor is not None:
+                    result = result.result()
+                following = next(starts, None)
+                if following is not None:
+                    pending.append(self._submit(following))
+                datas, failed, errors = result
+                changes = [(row, key, data) for row, key, data in zip(rows, keys, datas) if data is not None]
+                yield len(rows), changes, failed, [(rows[position], message) for position, message in errors]
+        finally:
+            self.close()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -26,16 +26,9 @@ from textual.binding import Binding
 from textual.containers import Vertical, Horizontal
 from textual.widgets import Footer, Header, Static
 from textual.reactive import reactive
-from textual import events
-from scapy.all import rdpcap, Packet, wrpcap, PcapReader
-from scapy.all import Ether, Raw
-from scapy.layers.inet import IP, TCP, UDP
-from scapy.layers.l2 import Ether
-from scapy.layers import *
-from scapy.layers.inet import *
-from scapy.layers.l2 import *
-from scapy.layers.inet import *
+from textual import events, work
 import datetime
+import glob
 import sys
 
 # Import all the panel classes
@@ -46,7 +39,9 @@ from .panels import (
     DissectionPanel,
     ScapyCommandPanel
 )
-from .ui import HelpOverlay
+from .ui import HelpOverlay, ProfileOverlay
+from .capture import PacketStore, LRUCache, load_scapy, scapy_loaded
+from .profiler import profiler, profiled
 
 SAMPLE_PCAP = "data/sample.pcap"  # Hardcoded for now
 
@@ -72,10 +67,6 @@ class PcapHexEditorApp(App):
         width: 1fr;
         height: 1fr;
     }
-    #panel-hex Static {
-        width: 1fr;
-        padding: 1;
-    }
     #panel-command {
         width: 1fr;
         height: 1fr;
@@ -125,7 +116,7 @@ class PcapHexEditorApp(App):
         border: double $accent;
         padding: 2;
     }
-    #help-content {
+    #help-content, #profile-content {
         height: 1fr;
         padding: 1;
         background: $surface;
@@ -165,11 +156,11 @@ class PcapHexEditorApp(App):
         color: $text-muted;
     }
     
-    #input-label {
+    #input-label, #range-label {
         margin-bottom: 1;
     }
     
-    #timestamp-input {
+    #timestamp-input, #range-input, #search-input, #search-mode, #filter-input {
         margin-bottom: 2;
         border: round $accent;
     }
@@ -188,21 +179,38 @@ class PcapHexEditorApp(App):
         Binding(key="f1", action="show_help", description="Help"),
         Binding(key="f2", action="quit", description="Quit"),
         Binding(key="f3", action="save_pcap", description="Save"),
+        Binding(key="f4", action="show_profile", description="Profile"),
+        Binding(key="ctrl+z", action="undo", description="Undo"),
+        Binding(key="ctrl+y", action="redo", description="Redo"),
+        Binding(key="ctrl+k", action="toggle_fixup", description="Fix-up"),
     ]
 
+    # Shown in the status bar, see watch_status_message()
+    status_message = reactive("")
+
     def __init__(self, pcap_filename="sample.pcap"):
         super().__init__()
-        self.pcap_filename = pcap_filename
+        # Several files, such as a rotated capture, open as one capture in
+        # time order and are saved back file by file
+        self.pcap_files = [pcap_filename] if isinstance(pcap_filename, str) else list(pcap_filename)
+        self.pcap_filename = self.pcap_files[0]
+        if len(self.pcap_files) > 1:
+            self.pcap_filename += f" (+{len(self.pcap_files) - 1} more)"
         self.packets = []
         self.selected_index = 0
-        self.status_message = ""
-        self.save_filename = f"edited_{self.pcap_filename}"
+        self.save_filenames = [f"edited_{name}" for name in self.pcap_files]
+        # Whether hex edits also update the checksums they invalidate
+        self.fixup_edits = False
+        # Dissection text and scapy commands, keyed by (kind, PacketStore.key());
+        # edits bump the key's generation, so stale entries are never hit
+        self.render_cache = LRUCache(512)
+        profiler.watch_cache("dissections", self.render_cache)
 
     def compose(self) -> ComposeResult:
-        self.packet_list_panel = PacketListPanel("Packet List", self.on_packet_select, self.on_packet_add, self.on_timestamp_edit, id="panel-list")
+        self.packet_list_panel = PacketListPanel("Packet List", self.on_packet_select, self.on_packet_add, self.on_timestamp_edit, on_packet_move_callback=self.on_packet_move, on_timestamp_bulk_callback=self.on_timestamp_bulk, on_fixup_callback=self.on_fixup, on_transform_callback=self.on_transform, id="panel-list")
         self.hex_editor_panel = HexEditorPanel("Hex View", on_edit_callback=self.on_hex_edit, id="panel-hex")
-        self.scapy_command_panel = ScapyCommandPanel("Edit Scapy Command", on_edit_callback=self.on_command_edit, id="panel-command")
-        self.dissection_panel = DissectionPanel("Dissection", id="panel-dissect")
+        self.scapy_command_panel = ScapyCommandPanel("Edit Scapy Command", on_edit_callback=self.on_command_edit, cache=self.render_cache, id="panel-command")
+        self.dissection_panel = DissectionPanel("Dissection", cache=self.render_cache, id="panel-dissect")
 
         yield Header("PCAP Hex Editor")
         with Horizontal(classes="main-row"):
@@ -214,23 +222,48 @@ class PcapHexEditorApp(App):
         yield Static(f"Editing: {self.pcap_filename} | {self.status_message}", id="status-bar")
         yield Footer()
 
+    def watch_status_message(self, message):
+        # The status bar is only there once the app is composed
+        for status_bar in self.query("#status-bar"):
+            status_bar.update(f"Editing: {self.pcap_filename} | {message}")
+
     def on_mount(self):
         try:
-            # self.packets = PcapReader(self.pcap_filename)
-            packet_list = rdpcap(self.pcap_filename)
-            # Convert PacketList to regular list to allow item assignment
-            self.packets = list(packet_list)
+            # Index the record headers only; packets are dissected on demand
+            self.packets = PacketStore(self.pcap_files)
         except Exception as e:
             self.packets = []
             self.log(f"Failed to load {self.pcap_filename}: {e}")
             self.status_message = f"Failed to load {self.pcap_filename}: {e}"
         self.packet_list_panel.set_packets(self.packets)
+        self.packet_list_panel.load_summaries()
         self.on_packet_select(0)
+        if not scapy_loaded():
+            # The list paints from raw headers meanwhile
+            self.status_message = "Loading dissectors…"
+            self._load_scapy()
+
+    @work(thread=True, exclusive=True, group="scapy", exit_on_error=False)
+    def _load_scapy(self):
+        load_scapy()
+        self.call_from_thread(self._scapy_ready)
+
+    def _scapy_ready(self):
+        self.status_message = ""
+        self.packet_list_panel.list_view.invalidate()
+        if self.packets:
+            self.on_packet_select(self.selected_index)
+        self.refresh()
 
     def action_show_help(self) -> None:
         """Show the help overlay."""
         self.push_screen(HelpOverlay(on_close_callback=self.close_help))
 
+    def action_show_profile(self) -> None:
+        """Show the profiling overlay; timing starts the first time it is shown."""
+        profiler.enabled = True
+        self.push_screen(ProfileOverlay(on_close_callback=self.pop_screen))
+
     def action_quit(self) -> None:
         """Quit"""
         self.exit()
@@ -239,9 +272,15 @@ class PcapHexEditorApp(App):
         """Close the help overlay."""
         self.pop_screen()
 
+    @profiled("select")
     def on_packet_select(self, index):
         self.selected_index = index
+        if self.packets and not scapy_loaded():
+            # Dissected once scapy is loaded, by _scapy_ready()
+            return
         pkt = self.packets[index] if self.packets else None
+        raw = self.packets.raw(index) if self.packets else None
+        key = self.packets.key(index) if self.packets else None
         ts = getattr(pkt, 'time', None)
         if ts is not None:
             try:
@@ -250,18 +289,27 @@ class PcapHexEditorApp(App):
                 ts_str = str(ts)
         else:
             ts_str = None
-        self.hex_editor_panel.set_packet(pkt)
-        self.dissection_panel.set_packet(pkt)
-        self.scapy_command_panel.set_packet(pkt)
+        self.hex_editor_panel.set_packet(pkt, raw)
+        self.dissection_panel.set_packet(pkt, key)
+        self.scapy_command_panel.set_packet(pkt, key)
+        match = self.packet_list_panel.match_at(index)
+        if match is not None:
+            self.hex_editor_panel.set_highlight(*match)
 
     def on_packet_add(self, index, new_packet):
         """Handle new packet addition."""
         self.selected_index = index
         self.status_message = f"Added new packet at index {index}"
         # Update all panels with the new packet
-        self.hex_editor_panel.set_packet(new_packet)
-        self.dissection_panel.set_packet(new_packet)
-        self.scapy_command_panel.set_packet(new_packet)
+        key = self.packets.key(index)
+        self.hex_editor_panel.set_packet(new_packet, self.packets.raw(index))
+        self.dissection_panel.set_packet(new_packet, key)
+        self.scapy_command_panel.set_packet(new_packet, key)
+        self.refresh()
+
+    def on_packet_move(self, index, new_index):
+        """Handle a packet being moved to another row."""
+        self.status_message = f"Moved packet {index} to {new_index}"
         self.refresh()
 
     def on_timestamp_edit(self, index, new_timestamp):
@@ -271,10 +319,9 @@ class PcapHexEditorApp(App):
             
             # Update the packet timestamp
             if index < len(self.packets):
-                self.packets[index].time = new_ts
+                self.packets.set_timestamp(index, new_ts)
                 
-                # Update all panels
-                self.packet_list_panel.set_packets(self.packets)
+                # The packet list refreshes the changed row itself
                 self.packet_list_panel.select(index)
                 self.on_packet_select(index)
                 
@@ -289,27 +336,89 @@ class PcapHexEditorApp(App):
         
         self.refresh()
 
-    def on_hex_edit(self, new_bytes):
-        self.log(f"on_hex_edit: {new_bytes}")
-        # Update the selected packet by creating a new one from the raw bytes.
-        # This assumes an Ethernet link-type, which is common.
-        new_pkt = None
+    def on_timestamp_bulk(self, operation, packet_range):
+        """Handle a timestamp operation on a range of packets.
+
+        operation is +S/-S (shift), =T (shift so the range starts at T),
+        *F (scale the gaps) or @I (re-space); packet_range is "first-last".
+        """
         try:
-            # Re-create the packet from the link layer to ensure proper dissection
-            new_pkt = Ether(new_bytes)
-        except Exception:
-            # If dissection fails, store as Raw bytes
-            new_pkt = Raw(load=new_bytes)
-        self.packets[self.selected_index] = new_pkt
+            operation = operation.strip()
+            first, _, last = packet_range.partition("-")
+            first = int(first)
+            last = int(last) if last.strip() else len(self.packets) - 1
+            if not operation:
+                raise ValueError("empty operation")
+            if operation[0] in "=*@":
+                op, value = operation[0], float(operation[1:])
+            else:
+                op, value = "+", float(operation)
+            if op == "+":
+                self.packets.shift_timestamps(value, first, last)
+            elif op == "=":
+                self.packets.shift_timestamps(value - self.packets.timestamp(first), first, last)
+            elif op == "*":
+                self.packets.scale_timestamps(value, first, last)
+            else:
+                self.packets.space_timestamps(value, first, last)
+            # The store refreshed the rows; the selected packet may have moved in time
+            self.on_packet_select(self.selected_index)
+            self.status_message = f"Applied {operation} to packets {first}-{last}"
+        except (ValueError, IndexError) as e:
+            self.status_message = f"Invalid timestamp operation: {e}"
+        self.refresh()
 
-        # Update the dissection panel with the new packet
-        self.dissection_panel.set_packet(new_pkt)
+    def on_fixup(self, rows=None):
+        """Fix up the lengths and checksums of the edited packets among rows, by default all."""
+        count = self.packets.fixup(rows)
+        if count:
+            # The store refreshed the rows; the selected packet may have changed
+            self.on_packet_select(self.selected_index)
+        self.status_message = f"Fixed lengths and checksums of {count} packets"
+        self.refresh()
+
+    def on_transform(self, rows, datas, failed, errors, skipped=0):
+        """Write the packets a bulk transform changed to the store, as one edit.
+
+        failed counts the packets the transform failed on, errors are
+        [(row, message)] for the first of them; skipped counts changed
+        packets left alone because they were edited meanwhile.
+        """
+        count = self.packets.replace_rows(rows, datas) if rows else 0
+        if count:
+            # The store refreshed the rows; the selected packet may have changed
+            self.on_packet_select(self.selected_index)
+        message = f"Transformed {count} packets"
+        if skipped:
+            message += f", skipped {skipped} edited meanwhile"
+        if errors:
+            row, error = errors[0]
+            where = "" if row is None else f" at packet {row}"
+            message += f", {failed} failed{where}: {error}"
+            self.log(f"Transform errors: {errors}")
+        self.status_message = message
+        self.refresh()
+
+    def action_toggle_fixup(self) -> None:
+        """Toggle fixing checksums on each hex edit."""
+        self.fixup_edits = not self.fixup_edits
+        self.status_message = f"Checksum fix-up on hex edits {'on' if self.fixup_edits else 'off'}"
+        self.refresh()
+
+    def on_hex_edit(self, patches):
+        """Apply committed hex edits, given as [(offset, new bytes)] ranges."""
+        self.log(f"on_hex_edit: {patches}")
+        # Re-dissect from the first edited layer, reusing the outer layers
+        self.packets.patch(self.selected_index, patches, self.hex_editor_panel.packet, fixup=self.fixup_edits)
+        new_pkt = self.packets[self.selected_index]
+        key = self.packets.key(self.selected_index)
+
+        # Update the dissection and command panels with the new packet
+        self.dissection_panel.set_packet(new_pkt, key)
+        self.scapy_command_panel.set_packet(new_pkt, key)
 
-        # Update the packet list panel to show the new summary
-        self.packet_list_panel.set_packets(self.packets)
-        self.packet_list_panel.select(self.selected_index)
         # Update the hex editor panel to reflect the changes
-        self.hex_editor_panel.set_packet(new_pkt)
+        self.hex_editor_panel.set_packet(new_pkt, self.packets.raw(self.selected_index))
 
     def on_command_edit(self, new_command):
         self.log(f"on_command_edit: {new_command}")
@@ -320,9 +429,9 @@ class PcapHexEditorApp(App):
             return
             
         try:
-            # Evaluate the scapy command (scapy modules are already imported at module level)
+            # Evaluate the scapy command with all of scapy in scope
             self.log(f"Evaluating command: {new_command.strip()}")
-            new_packet = eval(new_command.strip())
+            new_packet = eval(new_command.strip(), dict(vars(load_scapy())))
             self.log(f"New packet: {new_packet}")
 
             # Check if the result is a valid packet
@@ -331,13 +440,10 @@ class PcapHexEditorApp(App):
                 self.packets[self.selected_index] = new_packet
                 
                 # Update all panels with the new packet
-                self.hex_editor_panel.set_packet(new_packet)
-                self.dissection_panel.set_packet(new_packet)
-                self.scapy_command_panel.set_packet(new_packet)
-                
-                # Update the packet list panel to show the new summary
-                self.packet_list_panel.set_packets(self.packets)
-                self.packet_list_panel.select(self.selected_index)
+                key = self.packets.key(self.selected_index)
+                self.hex_editor_panel.set_packet(new_packet, self.packets.raw(self.selected_index))
+                self.dissection_panel.set_packet(new_packet, key)
+                self.scapy_command_panel.set_packet(new_packet, key)
                 
                 self.status_message = f"Packet updated: {new_command[:50]}{'...' if len(new_command) > 50 else ''}"
             else:
@@ -349,24 +455,57 @@ class PcapHexEditorApp(App):
             
         self.refresh()
 
+    def action_undo(self) -> None:
+        """Revert the latest edit and select the packet it was about."""
+        self._step_history(self.packets.undo, "Undid", "Nothing to undo")
+
+    def action_redo(self) -> None:
+        """Apply the latest undone edit again."""
+        self._step_history(self.packets.redo, "Redid", "Nothing to redo")
+
+    def _step_history(self, step, done, nothing):
+        if not self.packets:
+            return
+        row = step()
+        if row is None:
+            self.status_message = nothing
+        else:
+            # The store notified the list, which patched the affected rows;
+            # selecting the row refreshes the other panels
+            self.packet_list_panel.select(row)
+            self.status_message = f"{done} edit of packet {row}"
+        self.refresh()
+
     def action_save_pcap(self) -> None:
         try:
-            wrpcap(self.save_filename, self.packets)
-            self.status_message = f"Saved to {self.save_filename}"
+            self.packets.save(self.save_filenames)
+            self.status_message = f"Saved to {', '.join(self.save_filenames)}"
         except Exception as e:
             self.status_message = f"Save failed: {e}"
         self.refresh()
 
 
 
+def expand_filenames(args):
+    """Capture files named by args, with glob patterns expanded in sorted order."""
+    filenames = []
+    for arg in args:
+        filenames.extend(sorted(glob.glob(arg)) or [arg])
+    return filenames
+
+
 def main():
     """Main entry point for the application."""
+    if len(sys.argv) > 1 and sys.argv[1] == "batch":
+        # Headless editing; see pcap_hex_editor.batch for the script format
+        from .batch import main as batch_main
+        sys.exit(batch_main(sys.argv[2:]))
     if len(sys.argv) > 1:
-        filename = sys.argv[1]
+        filenames = expand_filenames(sys.argv[1:])
     else:
-        filename = "data/sample.pcap"
-    print(f"Loading {filename}...")
-    PcapHexEditorApp(filename).run()
+        filenames = ["data/sample.pcap"]
+    print(f"Loading {', '.join(filenames)}...")
+    PcapHexEditorApp(filenames).run()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -5,14 +5,18 @@ This package contains all the UI panel classes used in the application.
 """
 
 from .focusable_panel import FocusablePanel
+from .packet_list_view import PacketListView
 from .packet_list_panel import PacketListPanel
+from .hex_view import HexView
 from .hex_editor_panel import HexEditorPanel
 from .dissection_panel import DissectionPanel
 from .scapy_command_panel import ScapyCommandPanel
 
 __all__ = [
     "FocusablePanel",
+    "PacketListView",
     "PacketListPanel", 
+    "HexView",
     "HexEditorPanel",
     "DissectionPanel",
     "ScapyCommandPanel"
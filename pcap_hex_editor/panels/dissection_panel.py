@@ -2,19 +2,36 @@ from textual.app import ComposeResult
 from textual.containers import ScrollableContainer
 from textual.widgets import Static
 from textual.reactive import reactive
-from textual import events
+from textual import events, work
+from textual.worker import get_current_worker
 from .focusable_panel import FocusablePanel
+from ..profiler import profiler
 
 class DissectionPanel(FocusablePanel):
-    """Panel to show Scapy dissection of the selected packet."""
+    """Panel to show Scapy dissection of the selected packet.
+
+    show(dump=True) can take a noticeable time for deep protocol stacks,
+    so it runs in a worker thread.  Starting a new dissection cancels the
+    previous one, and results for a packet that is no longer selected are
+    dropped, so holding down an arrow key in the packet list never waits
+    for packets that have already scrolled past.
+
+    Finished dissections are kept in the optional shared cache under
+    ("show", key), where key is the PacketStore.key() of the packet, so
+    going back to a packet that has not been edited since is free.
+    """
+    DISSECTING_PLACEHOLDER = "Dissecting…"
     packet = reactive(None)
 
-    def __init__(self, title, *args, **kwargs):
+    def __init__(self, title, *args, cache=None, **kwargs):
         kwargs.setdefault('id', 'panel-dissect')
         super().__init__(*args, **kwargs)
+        self.cache = cache
         self.original_title = title
         self.border_title = title
         self.content_widget = Static()
+        # Text shown, the placeholder while a dissection is running
+        self.text = ""
         self.scroll_container = ScrollableContainer()
 
     def on_focus(self, event: events.Focus) -> None:
@@ -31,12 +48,51 @@ class DissectionPanel(FocusablePanel):
         self.border_title = self.original_title
         self.refresh()  
 
-    def set_packet(self, packet):
+    def set_packet(self, packet, key=None):
+        """Show a packet; key is its PacketStore.key(), if it may be cached."""
         self.packet = packet
         if packet is not None:
-            self.content_widget.update(f"{packet.show(dump=True)}")
+            text = None
+            if key is not None and self.cache is not None:
+                text = self.cache.get(("show", key))
+            if text is not None:
+                self.workers.cancel_group(self, "dissection")
+                self._show(text)
+                return
+            self._show(self.DISSECTING_PLACEHOLDER)
+            self._dissect(packet, key)
         else:
-            self.content_widget.update("No packet selected.")
+            self.workers.cancel_group(self, "dissection")
+            self._show("No packet selected.")
+
+    @work(thread=True, exclusive=True, group="dissection", exit_on_error=False)
+    def _dissect(self, packet, key):
+        worker = get_current_worker()
+        try:
+            with profiler.timed("show"):
+                text = packet.show(dump=True)
+        except Exception as e:
+            text = f"Error dissecting packet: {e}"
+            key = None  # Do not cache failures
+        if not worker.is_cancelled:
+            self.app.call_from_thread(self._dissection_ready, packet, key, text)
+
+    def _dissection_ready(self, packet, key, text):
+        # The cache is only touched from the UI thread
+        if key is not None and self.cache is not None:
+            self.cache.put(("show", key), text)
+        # A newer selection may have arrived after the worker checked in
+        if packet is self.packet:
+            self._show(text)
+
+    @property
+    def dissecting(self):
+        """True while the selected packet's dissection is still running."""
+        return self.text is self.DISSECTING_PLACEHOLDER
+
+    def _show(self, text):
+        self.text = text
+        self.content_widget.update(text)
 
     def compose(self) -> ComposeResult:
         with self.scroll_container:
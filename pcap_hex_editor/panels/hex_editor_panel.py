@@ -1,16 +1,16 @@
 from textual.app import ComposeResult
-from textual.containers import ScrollableContainer
-from textual.widgets import Static
 from textual.reactive import reactive
 from textual import events
-import binascii
 from .focusable_panel import FocusablePanel
+from .hex_view import HexView
+from ..profiler import profiled
+
+# Width of a formatted line: offset, 16 hex bytes and the ASCII column
+LINE_WIDTH = 8 + 2 + 16 * 3 - 1 + 2 + 18
 
 class HexEditorPanel(FocusablePanel):
     """Panel to display and edit packet bytes in hex"""
     packet = reactive(None)
-    hex_str = reactive("")
-    working_hex_str = reactive("")  # Working copy for edits
     cursor_line = reactive(0)  # Current line (0-based)
     cursor_pos = reactive(0)   # Position within the line (0-15 for bytes, 0-31 for hex digits)
     on_edit_callback = None
@@ -21,14 +21,17 @@ class HexEditorPanel(FocusablePanel):
         self.on_edit_callback = on_edit_callback
         self.original_title = title
         self.border_title = title
-        self.content_widget = Static()
-        self.scroll_container = ScrollableContainer()
+        self.hex_view = HexView(self.format_line)
         self.visible_lines = 0  # Number of lines currently visible
+        self.original = b""          # Bytes of the packet as shown
+        self.working = bytearray()   # Working copy for edits
+        self.dirty = set()           # Offsets of bytes written since the last commit
+        self.highlight = None        # (start, end) byte range of a search hit
 
     def on_focus(self, event: events.Focus) -> None:
-        """When the panel gets focus, focus the scroll container."""
+        """When the panel gets focus, focus the hex view."""
         super().on_focus(event)
-        self.scroll_container.focus()
+        self.hex_view.focus()
         # Update border title to show helpful keystrokes
         self.border_title = f"{self.original_title} (↑↓←→: move, 0-9a-f: edit, enter: commit, esc: abort)"
         self.refresh()
@@ -40,95 +43,141 @@ class HexEditorPanel(FocusablePanel):
         self.border_title = self.original_title
         self.refresh()
 
-    def set_packet(self, packet):
+    def set_packet(self, packet, raw_bytes=None):
+        """Show a packet; raw_bytes avoids re-serializing it when already known."""
         self.packet = packet
         if packet is not None:
-            raw_bytes = bytes(packet)
-            self.hex_str = binascii.hexlify(raw_bytes).decode()
-            self.working_hex_str = self.hex_str  # Initialize working copy
+            if raw_bytes is None:
+                raw_bytes = bytes(packet)
+            self.original = bytes(raw_bytes)
+            self.working = bytearray(self.original)  # Initialize working copy
             self.cursor_line = 0
             self.cursor_pos = 0
         else:
-            self.hex_str = ""
-            self.working_hex_str = ""
+            self.original = b""
+            self.working = bytearray()
             self.cursor_line = 0
             self.cursor_pos = 0
+        self.dirty.clear()
+        self.highlight = None
+        self.hex_view.scroll_home(animate=False)
         self.update_content()
         self.refresh()
 
     def compose(self) -> ComposeResult:
-        with self.scroll_container:
-            yield self.content_widget
+        yield self.hex_view
+
+    def set_highlight(self, start, end):
+        """Highlight bytes start..end-1, e.g. a search hit, and move the cursor there."""
+        self.highlight = (start, end)
+        old_line = self.cursor_line
+        self.cursor_line, self.cursor_pos = divmod(start, 16)
+        self.cursor_pos *= 2
+        for line in range(start // 16, (max(start, end - 1)) // 16 + 1):
+            self.hex_view.refresh_line(line)
+        self.refresh_cursor_lines(old_line)
+        self.scroll_to_cursor()
+
+    def _style(self, offset, text, is_cursor):
+        if is_cursor:
+            return f"[reverse]{text}[/reverse]"
+        if self.highlight and self.highlight[0] <= offset < self.highlight[1]:
+            return f"[black on yellow]{text}[/black on yellow]"
+        return text
+
+    @property
+    def total_lines(self):
+        return (len(self.working) + 15) // 16  # Ceiling division
 
-    def render(self) -> str:
+    def format_line(self, line_idx) -> str:
+        """Markup for one 16-byte line; only called for lines in the viewport."""
         if self.packet is None:
             return "No packet selected."
 
-        # Use working hex string for display, fallback to original if empty
-        display_hex = self.working_hex_str if self.working_hex_str else self.hex_str
-        if not display_hex:
+        if not self.working:
             return "Empty packet."
 
-        # Convert hex string back to bytes for display
-        try:
-            raw_bytes = binascii.unhexlify(display_hex)
-        except Exception:
-            # If hex string is invalid, use original packet bytes
-            raw_bytes = bytes(self.packet)
-
-        lines = []
-        # Process 16 bytes per line
-        for line_idx, offset in enumerate(range(0, len(raw_bytes), 16)):
-            # Get 16 bytes for this line
-            line_bytes = raw_bytes[offset:offset + 16]
-
-            # Format offset (8 hex digits)
-            offset_str = f"{offset:08x}"
-
-            # Format hex bytes (16 bytes, 2 chars each, space separated)
-            hex_parts = []
-            for i, byte in enumerate(line_bytes):
-                # Check if this is the current cursor position
-                if line_idx == self.cursor_line and i == self.cursor_pos // 2:
-                    hex_parts.append(f"[reverse]{byte:02x}[/reverse]")
-                else:
-                    hex_parts.append(f"{byte:02x}")
-            # Pad with spaces if less than 16 bytes
-            while len(hex_parts) < 16:
-                hex_parts.append("  ")
-            hex_str = " ".join(hex_parts)
-
-            # Format ASCII representation
-            ascii_parts = []
-            for i, byte in enumerate(line_bytes):
-                # Check if this is the current cursor position (same byte as hex)
-                is_cursor_position = (line_idx == self.cursor_line and i == self.cursor_pos // 2)
-
-                if 32 <= byte <= 126:  # Printable ASCII
-                    char = chr(byte)
-                    # Escape markup characters that could confuse Textual
-                    if char in '[]':
-                        char = f"\\{char}"
-                    # Highlight if this is the cursor position
-                    if is_cursor_position:
-                        ascii_parts.append(f"[reverse]{char}[/reverse]")
-                    else:
-                        ascii_parts.append(char)
-                else:
-                    # Non-printable as dot
-                    if is_cursor_position:
-                        ascii_parts.append("[reverse].[/reverse]")
-                    else:
-                        ascii_parts.append(".")
-            ascii_str = "".join(ascii_parts)
-
-            # Combine: offset | hex | ascii
-            line = f"{offset_str}  {hex_str}  |{ascii_str}|"
-            lines.append(line)
-        return '\n'.join(lines)
+        offset = line_idx * 16
+        line_bytes = self.working[offset:offset + 16]
+
+        # Format offset (8 hex digits)
+        offset_str = f"{offset:08x}"
+
+        # Format hex bytes (16 bytes, 2 chars each, space separated)
+        hex_parts = []
+        for i, byte in enumerate(line_bytes):
+            # Check if this is the current cursor position
+            is_cursor_position = (line_idx == self.cursor_line and i == self.cursor_pos // 2)
+            hex_parts.append(self._style(offset + i, f"{byte:02x}", is_cursor_position))
+        # Pad with spaces if less than 16 bytes
+        while len(hex_parts) < 16:
+            hex_parts.append("  ")
+        hex_str = " ".join(hex_parts)
+
+        # Format ASCII representation
+        ascii_parts = []
+        for i, byte in enumerate(line_bytes):
+            # Check if this is the current cursor position (same byte as hex)
+            is_cursor_position = (line_idx == self.cursor_line and i == self.cursor_pos // 2)
+
+            if 32 <= byte <= 126:  # Printable ASCII
+                char = chr(byte)
+                # Escape markup characters that could confuse Textual
+                if char in '[]':
+                    char = f"\\{char}"
+                # Highlight if this is the cursor position or a search hit
+                ascii_parts.append(self._style(offset + i, char, is_cursor_position))
+            else:
+                # Non-printable as dot
+                ascii_parts.append(self._style(offset + i, ".", is_cursor_position))
+        ascii_str = "".join(ascii_parts)
+
+        # Combine: offset | hex | ascii
+        return f"{offset_str}  {hex_str}  |{ascii_str}|"
 
     def update_content(self):
-        self.content_widget.update(self.render())
+        """Redraw the whole view, e.g. after switching packets."""
+        self.hex_view.set_line_count(max(1, self.total_lines), LINE_WIDTH)
+
+    def refresh_cursor_lines(self, old_line):
+        """Redraw only the line the cursor left and the line it is on now."""
+        self.hex_view.refresh_line(old_line)
+        if self.cursor_line != old_line:
+            self.hex_view.refresh_line(self.cursor_line)
+
+    def write_nibble(self, offset, high, value):
+        """Write one hex digit of the byte at offset in the working copy."""
+        byte = self.working[offset]
+        if high:
+            self.working[offset] = (value << 4) | (byte & 0x0f)
+        else:
+            self.working[offset] = (byte & 0xf0) | value
+        self.dirty.add(offset)
+
+    def dirty_patches(self):
+        """Changed byte ranges as [(offset, new bytes)], coalesced and sorted."""
+        patches = []
+        start = end = None
+        for offset in sorted(self.dirty):
+            if self.working[offset] == self.original[offset]:
+                continue  # Written back to its original value
+            if start is not None and offset == end:
+                end += 1
+                continue
+            if start is not None:
+                patches.append((start, bytes(self.working[start:end])))
+            start, end = offset, offset + 1
+        if start is not None:
+            patches.append((start, bytes(self.working[start:end])))
+        return patches
+
+    def revert(self):
+        """Discard uncommitted edits, redrawing only the lines they touched."""
+        for offset in self.dirty:
+            self.working[offset] = self.original[offset]
+        for line in {offset // 16 for offset in self.dirty}:
+            self.hex_view.refresh_line(line)
+        self.dirty.clear()
 
     def scroll_to_cursor(self):
         """Scroll to ensure the cursor is visible."""
@@ -136,22 +185,13 @@ class HexEditorPanel(FocusablePanel):
             return
 
         # Calculate total lines in the data
-        raw_bytes = bytes(self.packet)
-        total_lines = (len(raw_bytes) + 15) // 16  # Ceiling division
+        total_lines = self.total_lines
 
-        # Estimate visible lines based on panel height
-        try:
-            panel_height = self.size.height
-            # Subtract some space for borders and padding
-            self.visible_lines = max(1, panel_height - 4)
-        except Exception:
-            self.visible_lines = 10  # Fallback
+        # Visible lines are whatever fits in the hex view
+        self.visible_lines = self.hex_view.page_size
 
         # Get current scroll position
-        try:
-            current_scroll_y = self.scroll_container.scroll_offset.y
-        except Exception:
-            current_scroll_y = 0
+        current_scroll_y = round(self.hex_view.scroll_y)
 
         # Check if cursor is outside the visible area
         cursor_visible_start = current_scroll_y
@@ -167,39 +207,38 @@ class HexEditorPanel(FocusablePanel):
             target_top_line = max(0, target_top_line)
 
             # Scroll to the target line
-            try:
-                self.scroll_container.scroll_to(0, target_top_line)
-            except Exception:
-                pass  # Ignore scroll errors
+            self.hex_view.scroll_to(y=target_top_line, animate=False)
 
+    @profiled("hex.key")
     def on_key(self, event: events.Key) -> None:
-        if not self.hex_str:
+        if not self.working:
             return
 
         # Calculate total bytes and lines
-        total_bytes = len(self.hex_str) // 2
+        total_bytes = len(self.working)
         total_lines = (total_bytes + 15) // 16  # Ceiling division
+        old_line = self.cursor_line
 
         if event.key == "left":
             if self.cursor_pos > 0:
                 self.cursor_pos -= 1
-                self.update_content()
+                self.refresh_cursor_lines(old_line)
             elif self.cursor_line > 0:
                 # Move to end of previous line
                 self.cursor_line -= 1
                 self.cursor_pos = 31  # Last position in line (15 bytes * 2 hex digits)
-                self.update_content()
+                self.refresh_cursor_lines(old_line)
                 self.scroll_to_cursor()
         elif event.key == "right":
             max_pos_in_line = min(31, (total_bytes - self.cursor_line * 16) * 2 - 1)
             if self.cursor_pos < max_pos_in_line:
                 self.cursor_pos += 1
-                self.update_content()
+                self.refresh_cursor_lines(old_line)
             elif self.cursor_line < total_lines - 1:
                 # Move to beginning of next line
                 self.cursor_line += 1
                 self.cursor_pos = 0
-                self.update_content()
+                self.refresh_cursor_lines(old_line)
                 self.scroll_to_cursor()
         elif event.key == "up":
             if self.cursor_line > 0:
@@ -207,7 +246,7 @@ class HexEditorPanel(FocusablePanel):
                 # Keep same position within line, but clamp to line bounds
                 max_pos_in_line = min(31, (total_bytes - self.cursor_line * 16) * 2 - 1)
                 self.cursor_pos = min(self.cursor_pos, max_pos_in_line)
-                self.update_content()
+                self.refresh_cursor_lines(old_line)
                 self.scroll_to_cursor()
         elif event.key == "down":
             if self.cursor_line < total_lines - 1:
@@ -215,58 +254,52 @@ class HexEditorPanel(FocusablePanel):
                 # Keep same position within line, but clamp to line bounds
                 max_pos_in_line = min(31, (total_bytes - self.cursor_line * 16) * 2 - 1)
                 self.cursor_pos = min(self.cursor_pos, max_pos_in_line)
-                self.update_content()
+                self.refresh_cursor_lines(old_line)
                 self.scroll_to_cursor()
         elif event.key in "0123456789abcdefABCDEF":
-            # Calculate absolute position in hex string
-            abs_pos = self.cursor_line * 32 + self.cursor_pos
-            if abs_pos < len(self.working_hex_str):
+            # Calculate absolute byte offset of the cursor
+            offset = self.cursor_line * 16 + self.cursor_pos // 2
+            if offset < total_bytes:
                 # Edit the current digit in working copy
-                new_hex = (
-                    self.working_hex_str[:abs_pos] + event.key.lower() + self.working_hex_str[abs_pos+1:]
-                )
-                self.working_hex_str = new_hex
+                self.write_nibble(offset, self.cursor_pos % 2 == 0, int(event.key, 16))
                 # Move cursor right
-                max_pos_in_line = min(31, (len(self.working_hex_str) // 2 - self.cursor_line * 16) * 2 - 1)
+                max_pos_in_line = min(31, (total_bytes - self.cursor_line * 16) * 2 - 1)
                 if self.cursor_pos < max_pos_in_line:
                     self.cursor_pos += 1
                 elif self.cursor_line < total_lines - 1:
                     # Move to beginning of next line
                     self.cursor_line += 1
                     self.cursor_pos = 0
-                self.update_content()
+                self.refresh_cursor_lines(old_line)
                 # Only scroll if we moved to a new line
                 if self.cursor_pos == 0 and self.cursor_line > 0:
                     self.scroll_to_cursor()
         elif event.key == "enter":
-            # Apply changes to the actual packet
-            if self.working_hex_str and self.working_hex_str != self.hex_str:
+            # Apply changes to the actual packet, handing over only what changed
+            patches = self.dirty_patches()
+            if patches:
                 try:
-                    new_bytes = binascii.unhexlify(self.working_hex_str)
                     # Update the packet in the main app
                     if self.on_edit_callback:
-                        self.on_edit_callback(new_bytes)
-                        self.log(f"Packet updated: {new_bytes}")
+                        self.on_edit_callback(patches)
+                        self.log(f"Packet updated: {patches}")
                 except Exception as e:
                     self.log(f"Error updating packet: {e}")
-                    # Revert working hex string on error
-                    self.working_hex_str = self.hex_str
-                    self.update_content()
+                    # Revert working copy on error
+                    self.revert()
         elif event.key == "escape":
             # Discard changes and revert to original
-            if self.working_hex_str != self.hex_str:
-                self.working_hex_str = self.hex_str
-                self.update_content()
-        elif event.key == "page_up":
+            self.revert()
+        elif event.key in ("pageup", "page_up"):
             # Page up - move cursor up by visible lines
             if self.cursor_line >= self.visible_lines:
                 self.cursor_line -= self.visible_lines
             else:
                 self.cursor_line = 0
-            self.update_content()
+            self.refresh_cursor_lines(old_line)
             self.scroll_to_cursor()
-        elif event.key == "page_down":
+        elif event.key in ("pagedown", "page_down"):
             # Page down - move cursor down by visible lines
             self.cursor_line = min(self.cursor_line + self.visible_lines, total_lines - 1)
-            self.update_content()
+            self.refresh_cursor_lines(old_line)
             self.scroll_to_cursor() 
\ No newline at end of file
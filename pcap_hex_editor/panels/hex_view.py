@@ -0,0 +1,46 @@
+from rich.text import Text
+from textual.geometry import Size
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from ..profiler import profiled
+
+
+class HexView(ScrollView, can_focus=True):
+    """Line API view that formats only the hex dump lines in the viewport.
+
+    Each visible line is produced by line_callback(line_index) as markup,
+    so the cost of a redraw depends on the viewport height and not on the
+    size of the packet.  Callers refresh single lines with refresh_line().
+    """
+
+    DEFAULT_CSS = """
+    HexView {
+        width: 1fr;
+        height: 1fr;
+        padding: 0 1;
+    }
+    """
+
+    def __init__(self, line_callback, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.line_callback = line_callback
+        self.line_count = 0
+
+    def set_line_count(self, line_count, width=0):
+        self.line_count = line_count
+        self.virtual_size = Size(width, line_count)
+        self.refresh()
+
+    @property
+    def page_size(self):
+        return max(1, self.scrollable_content_region.height)
+
+    @profiled("hex.render_line")
+    def render_line(self, y: int) -> Strip:
+        width = self.scrollable_content_region.width
+        line_index = round(self.scroll_y) + y
+        if line_index >= self.line_count:
+            return Strip.blank(width, self.rich_style)
+        text = Text.from_markup(self.line_callback(line_index), style=self.rich_style)
+        strip = Strip(text.render(self.app.console), text.cell_len)
+        return strip.crop_extend(round(self.scroll_x), round(self.scroll_x) + width, self.rich_style)
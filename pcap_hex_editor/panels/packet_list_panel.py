@@ -1,25 +1,73 @@
 from textual.app import ComposeResult
-from textual.widgets import ListView, ListItem, Static
 from textual.reactive import reactive
-from textual import events
+from textual import events, work
+from textual.worker import get_current_worker
 import datetime
+from array import array
+from bisect import bisect_left, bisect_right
 from .focusable_panel import FocusablePanel
-from scapy.all import Ether, IP, UDP, Raw
-from ..ui import TimestampInputModal
+from .packet_list_view import PacketListView
+from ..profiler import profiler
+from ..ui import TimestampInputModal, TimestampBulkModal, SearchModal, FilterModal, TransformModal
+from ..capture import (
+    LRUCache, SummaryLoader, PacketSearch, compile_pattern, DisplayFilter, FilterScan,
+    PacketTransform, header_summary, scapy_loaded,
+)
+
+# Transform errors kept for the status line and the log
+MAX_TRANSFORM_ERRORS = 10
 
 class PacketListPanel(FocusablePanel):
     """Panel to display and select packets."""
+    # Captures smaller than this are summarized on demand only
+    PARALLEL_SUMMARY_THRESHOLD = 4096
+    # Captures smaller than this are searched and filtered without worker processes
+    PARALLEL_SEARCH_THRESHOLD = 65536
+    # Transforms dissect every packet, so worker processes pay off sooner
+    PARALLEL_TRANSFORM_THRESHOLD = 4096
+    SUMMARY_PLACEHOLDER = "…"
     packets = reactive([])
     selected_index = reactive(0)
 
-    def __init__(self, title, on_select_callback=None, on_packet_add_callback=None, on_timestamp_edit_callback=None, *args, **kwargs):
+    def __init__(self, title, on_select_callback=None, on_packet_add_callback=None, on_timestamp_edit_callback=None, on_packet_move_callback=None, on_timestamp_bulk_callback=None, on_fixup_callback=None, on_transform_callback=None, *args, cache_size=65536, **kwargs):
         kwargs.setdefault('id', 'panel-list')
         super().__init__(*args, **kwargs)
-        self.list_view = ListView()
+        self.list_view = PacketListView(self.row_text, row_number_callback=self.store_row)
         self.packets = []
+        # Store rows shown by the list while a display filter is applied, in
+        # ascending order; list rows are positions in it, selected_index
+        # and all callbacks use store rows
+        self.view_rows = None
+        self.filter_text = ""
+        # Filter text being scanned for, if any, and the number of the latest
+        # scan; results of older scans are stale once rows have shifted
+        self._filter_running = None
+        self._filter_scan = 0
+        # Keyed by PacketStore.key(), so edited packets miss and get recomputed
+        self.summary_cache = LRUCache(cache_size)
+        profiler.watch_cache("summaries", self.summary_cache)
+        # Keyed by the timestamp itself, which bulk operations change in place
+        self.timestamp_cache = LRUCache(cache_size)
+        profiler.watch_cache("timestamps", self.timestamp_cache)
+        # Record ids [next, stop) whose summaries are still being computed
+        self._summary_next = 0
+        self._summary_stop = 0
+        # Search hits: rows in ascending order and row -> (start, end) in its bytes
+        self.match_rows = []
+        self.matches = {}
+        self._search_jump_pending = False
+        self.search_pattern = ""
+        self.search_mode = "ascii"
         self.on_select_callback = on_select_callback
         self.on_packet_add_callback = on_packet_add_callback
         self.on_timestamp_edit_callback = on_timestamp_edit_callback
+        self.on_packet_move_callback = on_packet_move_callback
+        self.on_timestamp_bulk_callback = on_timestamp_bulk_callback
+        self.on_fixup_callback = on_fixup_callback
+        self.on_transform_callback = on_transform_callback
+        self.transform_text = ""
+        # Whether a transform is running, and its progress for the title
+        self.transform_progress = None
         self.original_title = title
         self.border_title = title
 
@@ -27,38 +75,420 @@ class PacketListPanel(FocusablePanel):
         super().on_focus(event)
         self.list_view.focus()
         # Update border title to show helpful keystrokes
-        self.border_title = f"{self.original_title} (↑↓: move, pgup/pgdn: move page, a: add packet, t: edit timestamp)"
+        self.border_title = f"{self.filtered_title()} (↑↓: move, pgup/pgdn: move page, shift+↑↓: reorder, a: add packet, t: edit timestamp, T: bulk timestamps, k: fix lengths/checksums, x: transform, g: go to time, o: next out-of-order, /: search, n/N: next/prev match, f: filter)"
         self.refresh()
 
     def on_blur(self, event: events.Blur) -> None:
         super().on_blur(event)
         # Restore original border title
-        self.border_title = self.original_title
+        self.border_title = self.filtered_title()
         self.refresh()
 
+    def filtered_title(self):
+        title = self.original_title
+        if self.view_rows is not None:
+            title = f"{title} | {self.filter_text}: {len(self.view_rows)}/{len(self.packets)}"
+        if self.transform_progress is not None:
+            done, total = self.transform_progress
+            title = f"{title} | transforming {done}/{total} (Esc: cancel)"
+        return title
+
     def set_packets(self, packets):
+        if hasattr(self.packets, "remove_listener"):
+            self.packets.remove_listener(self)
+        if packets is not self.packets:
+            # Record ids are only meaningful within one store
+            self.summary_cache.clear()
+            self.timestamp_cache.clear()
+        self.cancel_transform()
         self.packets = packets
-        self.list_view.clear()
-        for i, pkt in enumerate(packets):
-            summary = pkt.summary()
-            # Get timestamp for this packet
-            ts = getattr(pkt, 'time', None)
-            if ts is not None:
-                try:
-                    ts_str = datetime.datetime.fromtimestamp(ts).strftime("%H:%M:%S.%f")[:-3]  # HH:MM:SS.mmm
-                except Exception:
-                    ts_str = str(ts)
-            else:
-                ts_str = "N/A"
-            self.list_view.append(ListItem(Static(f"{i}: [{ts_str}] {summary}")))
+        self.view_rows = None
+        self.filter_text = ""
+        self._filter_running = None
+        if hasattr(packets, "add_listener"):
+            # Later edits patch single rows through the rows_* callbacks
+            packets.add_listener(self)
+        self.list_view.set_row_count(len(packets))
         self.refresh()
         self.select(self.selected_index if self.packets else 0)
 
+    def store_row(self, position):
+        """Store row shown at a position of the list."""
+        return position if self.view_rows is None else self.view_rows[position]
+
+    def view_position(self, row):
+        """Position of the list showing store row, or of the nearest row shown."""
+        if self.view_rows is None:
+            return row
+        position = bisect_left(self.view_rows, row)
+        if position == len(self.view_rows) or (position and self.view_rows[position] != row):
+            position -= 1
+        return position
+
+    def is_shown(self, row):
+        if self.view_rows is None:
+            return True
+        position = bisect_left(self.view_rows, row)
+        return position < len(self.view_rows) and self.view_rows[position] == row
+
+    def rows_changed(self, first, last):
+        if self.view_rows is not None:
+            # Edited packets stay shown until the filter is applied again
+            first, last = bisect_left(self.view_rows, first), bisect_right(self.view_rows, last) - 1
+            if first > last:
+                return
+        self.list_view.invalidate_rows(first, last)
+
+    def _shift_view_rows(self, position, delta):
+        self.view_rows[position:] = array("q", [r + delta for r in self.view_rows[position:]])
+
+    def rows_inserted(self, row, count):
+        if self.view_rows is not None:
+            # New packets are shown even if they would not pass the filter
+            position = bisect_left(self.view_rows, row)
+            self._shift_view_rows(position, count)
+            self.view_rows[position:position] = array("q", range(row, row + count))
+            row = position
+        self.list_view.insert_rows(row, count)
+        self.clear_matches()
+        self._restart_filter()
+
+    def rows_removed(self, row, count):
+        if self.view_rows is not None:
+            first, last = bisect_left(self.view_rows, row), bisect_left(self.view_rows, row + count)
+            del self.view_rows[first:last]
+            self._shift_view_rows(first, -count)
+            row, count = first, last - first
+        if count:
+            self.list_view.remove_rows(row, count)
+        self.clear_matches()
+        self._restart_filter()
+
+    def rows_moved(self, row, new_row):
+        if self.view_rows is not None:
+            # Rows between the two positions shift by one towards the old one
+            low, high, delta = (row, new_row, -1) if row < new_row else (new_row, row, 1)
+            shown = [r + delta if low <= r <= high else r for r in self.view_rows if r != row]
+            if self.is_shown(row):
+                shown.insert(bisect_left(shown, new_row), new_row)
+            self.view_rows = array("q", shown)
+            self.list_view.invalidate()
+        else:
+            self.list_view.move_row(row, new_row)
+        self.clear_matches()
+        self._restart_filter()
+
+    def row_text(self, position):
+        """Text of a list row without its row number; only called for rows the list view is showing."""
+        i = self.store_row(position)
+        key = self.packets.key(i)
+        summary = self.summary_cache.get(key)
+        if summary is None:
+            record, generation = key
+            if generation == 0 and self._summary_next <= record < self._summary_stop:
+                # The background loader will fill this row in shortly
+                summary = self.SUMMARY_PLACEHOLDER
+            elif not scapy_loaded():
+                # Paint from the raw headers until scapy is imported; not cached,
+                # so the rows are summarized again once it is
+                summary = header_summary(self.packets.raw(i), self.packets.linktype_at(i))
+            else:
+                with profiler.timed("summary"):
+                    summary = self.packets[i].summary()
+                self.summary_cache.put(key, summary)
+        # Get timestamp for this packet
+        ts = self.packets.timestamp(i)
+        ts_str = self.timestamp_cache.get(ts)
+        if ts_str is None:
+            try:
+                ts_str = datetime.datetime.fromtimestamp(ts).strftime("%H:%M:%S.%f")[:-3]  # HH:MM:SS.mmm
+            except Exception:
+                ts_str = str(ts)
+            self.timestamp_cache.put(ts, ts_str)
+        return f"[{ts_str}] {summary}"
+
+    def load_summaries(self):
+        """Precompute summaries in a process pool, filling rows in as they arrive."""
+        # A capture that failed to load is an empty list, with no index
+        index = getattr(self.packets, "index", None) if self.packets else None
+        if index is None or len(index) < self.PARALLEL_SUMMARY_THRESHOLD:
+            return
+        # Summaries past the cache size would only be evicted again
+        self._summary_next = 0
+        self._summary_stop = min(len(index), self.summary_cache.maxsize)
+        self._load_summaries(self.packets, SummaryLoader(self.packets, stop=self._summary_stop))
+
+    @work(thread=True, exclusive=True, group="summaries", exit_on_error=False)
+    def _load_summaries(self, packets, loader):
+        worker = get_current_worker()
+        try:
+            for first, summaries in loader:
+                if worker.is_cancelled:
+                    return
+                self.app.call_from_thread(self._summaries_ready, packets, first, summaries)
+        except Exception as e:
+            self.log(f"Background summaries failed: {e}")
+            # Fall back to summarizing rows on demand
+            self.app.call_from_thread(self._summaries_ready, packets, self._summary_stop, [])
+        finally:
+            loader.close()
+
+    def _summaries_ready(self, packets, first, summaries):
+        if packets is not self.packets:
+            return
+        for record, summary in enumerate(summaries, first):
+            # Loaded records are unedited; edited ones have a newer key anyway
+            self.summary_cache.put((record, 0), summary)
+        self._summary_next = first + len(summaries)
+        if self._summary_next >= self._summary_stop:
+            self._summary_next = self._summary_stop = 0
+        self.list_view.invalidate()
+
+    def open_filter(self):
+        """Ask for a display filter and apply it."""
+        modal = FilterModal(filter_text=self.filter_text, on_accept_callback=self.apply_filter)
+        self.app.push_screen(modal)
+
+    def apply_filter(self, text):
+        """Show only the packets that pass the display filter text; empty text shows all."""
+        text = text.strip()
+        self.workers.cancel_group(self, "filter")
+        self._filter_scan += 1
+        self._filter_running = None
+        if not text:
+            self._filter_ready(self.packets, "", None, self._filter_scan)
+            return
+        if not hasattr(self.packets, "index"):
+            return
+        try:
+            display_filter = DisplayFilter(text, self.packets.linktype)
+        except ValueError as e:
+            self.app.status_message = f"Invalid filter: {e}"
+            return
+        workers = None if len(self.packets) >= self.PARALLEL_SEARCH_THRESHOLD else 0
+        self._filter_running = text
+        self._filter(self.packets, FilterScan(self.packets, display_filter, max_workers=workers), self._filter_scan)
+
+    def _restart_filter(self):
+        """Scan again for a filter whose scan was overtaken by rows shifting."""
+        if self._filter_running is not None:
+            self.apply_filter(self._filter_running)
+
+    @work(thread=True, exclusive=True, group="filter", exit_on_error=False)
+    def _filter(self, packets, scan, scan_number):
+        worker = get_current_worker()
+        rows = array("q")
+        try:
+            for chunk in scan:
+                if worker.is_cancelled:
+                    return
+                rows.extend(chunk)
+        except Exception as e:
+            self.log(f"Filter failed: {e}")
+            return
+        finally:
+            scan.close()
+        if not worker.is_cancelled:
+            self.app.call_from_thread(self._filter_ready, packets, scan.display_filter.text, rows, scan_number)
+
+    def _filter_ready(self, packets, text, rows, scan_number):
+        if packets is not self.packets or scan_number != self._filter_scan:
+            return
+        self._filter_running = None
+        self.filter_text = text
+        self.view_rows = rows
+        self.list_view.set_row_count(len(rows) if rows is not None else len(self.packets))
+        self.border_title = self.filtered_title()
+        # Keep the selection, or move to the nearest packet still shown
+        self.select(self.selected_index)
+
+    def open_search(self):
+        """Ask for a pattern and search all packets for it."""
+        modal = SearchModal(
+            pattern=self.search_pattern,
+            mode=self.search_mode,
+            on_accept_callback=self.search,
+        )
+        self.app.push_screen(modal)
+
+    def search(self, text, mode="ascii"):
+        """Search the raw bytes of all packets, streaming hits into the match list."""
+        self.search_pattern, self.search_mode = text, mode
+        self.clear_matches()
+        if not text or not hasattr(self.packets, "index"):
+            return
+        try:
+            pattern = compile_pattern(text, mode)
+        except ValueError as e:
+            self.app.status_message = f"Invalid search pattern: {e}"
+            return
+        workers = None if len(self.packets) >= self.PARALLEL_SEARCH_THRESHOLD else 0
+        self._search_jump_pending = True
+        self._search(self.packets, PacketSearch(self.packets, pattern, max_workers=workers))
+
+    @work(thread=True, exclusive=True, group="search", exit_on_error=False)
+    def _search(self, packets, searcher):
+        worker = get_current_worker()
+        try:
+            for matches in searcher:
+                if worker.is_cancelled:
+                    return
+                if matches:
+                    self.app.call_from_thread(self._matches_ready, packets, matches)
+            self.app.call_from_thread(self._search_done, packets)
+        except Exception as e:
+            self.log(f"Search failed: {e}")
+        finally:
+            searcher.close()
+
+    def _matches_ready(self, packets, matches):
+        if packets is not self.packets:
+            return
+        for row, start, end in matches:
+            self.match_rows.append(row)
+            self.matches[row] = (start, end)
+            if self._search_jump_pending and row >= self.selected_index and self.is_shown(row):
+                # Jump to the first hit shown at or after the selection as soon as it is in
+                self._search_jump_pending = False
+                self.select(row)
+
+    def _search_done(self, packets):
+        if packets is not self.packets:
+            return
+        if self._search_jump_pending and self.match_rows:
+            # All hits shown are before the selection; wrap around to the first
+            row = self.shown_match(0, 1)
+            if row is not None:
+                self.select(row)
+        self._search_jump_pending = False
+        self.log(f"Search found {len(self.match_rows)} matching packets")
+
+    def open_transform(self):
+        """Ask for a scapy transform and the range of packets to apply it to."""
+        modal = TransformModal(
+            packet_range=f"0-{len(self.packets) - 1}",
+            transform=self.transform_text,
+            scope=", those shown" if self.view_rows is not None else "",
+            on_accept_callback=self.transform,
+        )
+        self.app.push_screen(modal)
+
+    def transform_rows(self, packet_range=""):
+        """Store rows shown in packet_range, "first-last"; empty means all."""
+        first, _, last = packet_range.partition("-")
+        first = max(int(first), 0) if first.strip() else 0
+        last = min(int(last), len(self.packets) - 1) if last.strip() else len(self.packets) - 1
+        if self.view_rows is None:
+            return range(first, last + 1)
+        return self.view_rows[bisect_left(self.view_rows, first):bisect_right(self.view_rows, last)]
+
+    def transform(self, text, packet_range=""):
+        """Apply a scapy transform, see PacketTransform, to the packets shown in
+        packet_range, in the background; the changes are handed to
+        on_transform_callback as one batch once all packets are done."""
+        self.transform_text = text
+        if not hasattr(self.packets, "index"):
+            return
+        try:
+            rows = self.transform_rows(packet_range)
+            workers = None if len(rows) >= self.PARALLEL_TRANSFORM_THRESHOLD else 0
+            transform = PacketTransform(self.packets, text, rows, max_workers=workers)
+        except ValueError as e:
+            self.log(f"Invalid transform: {e}")
+            if self.on_transform_callback:
+                self.on_transform_callback([], [], 1, [(None, str(e))])
+            return
+        self._transform_progress(self.packets, 0, len(rows))
+        self._transform(self.packets, transform)
+
+    @work(thread=True, exclusive=True, group="transform", exit_on_error=False)
+    def _transform(self, packets, transform):
+        worker = get_current_worker()
+        changes = []
+        errors = []
+        done = failed = 0
+        try:
+            for count, changed, chunk_failed, chunk_errors in transform:
+                if worker.is_cancelled:
+                    return
+                changes += changed
+                failed += chunk_failed
+                errors += chunk_errors[:MAX_TRANSFORM_ERRORS - len(errors)]
+                done += count
+                self.app.call_from_thread(self._transform_progress, packets, done, len(transform))
+        except Exception as e:
+            self.log(f"Transform failed: {e}")
+            changes, failed, errors = [], 1, [(None, str(e))]
+        finally:
+            transform.close()
+        if not worker.is_cancelled:
+            self.app.call_from_thread(self._transform_done, packets, changes, failed, errors)
+
+    def _transform_progress(self, packets, done, total):
+        if packets is not self.packets:
+            return
+        self.transform_progress = (done, total)
+        self.border_title = self.filtered_title()
+
+    def _transform_done(self, packets, changes, failed, errors):
+        if packets is not self.packets:
+            return
+        self.transform_progress = None
+        self.border_title = self.filtered_title()
+        # Packets edited while the transform ran keep their edits
+        current = [(row, data) for row, key, data in changes
+                   if row < len(packets) and packets.key(row) == key]
+        if self.on_transform_callback:
+            self.on_transform_callback([row for row, _ in current], [data for _, data in current], failed, errors,
+                                       skipped=len(changes) - len(current))
+
+    def cancel_transform(self):
+        """Stop a running transform; none of its changes are applied."""
+        self.workers.cancel_group(self, "transform")
+        if self.transform_progress is not None:
+            self.transform_progress = None
+            self.border_title = self.filtered_title()
+
+    def clear_matches(self):
+        """Forget the search hits, e.g. because rows have shifted."""
+        self.workers.cancel_group(self, "search")
+        self.match_rows = []
+        self.matches = {}
+
+    def match_at(self, row):
+        """(start, end) of the search hit in the packet at row, or None."""
+        return self.matches.get(row)
+
+    def shown_match(self, i, direction):
+        """Row of the first search hit from match_rows[i] on, going in direction
+        and wrapping around, that the display filter shows; None if none is."""
+        rows = self.match_rows
+        for step in range(len(rows)):
+            row = rows[(i + step * direction) % len(rows)]
+            if self.is_shown(row):
+                return row
+        return None
+
+    def next_match(self, direction):
+        """Select the next (direction 1) or previous (-1) shown packet with a search hit, wrapping around."""
+        rows = self.match_rows
+        if not rows:
+            return
+        if direction > 0:
+            i = bisect_right(rows, self.selected_index)
+        else:
+            i = bisect_left(rows, self.selected_index) - 1
+        row = self.shown_match(i, direction)
+        if row is not None:
+            self.select(row)
+
     def select(self, index):
-        if not self.packets:
+        """Select store row index, or the nearest row the filter shows."""
+        if not self.packets or self.view_rows is not None and not self.view_rows:
             return
-        self.selected_index = max(0, min(index, len(self.packets) - 1))
-        self.list_view.index = self.selected_index
+        position = self.view_position(max(0, min(index, len(self.packets) - 1)))
+        self.selected_index = self.store_row(position)
+        self.list_view.move_cursor(position, notify=False)
         if self.on_select_callback:
             self.on_select_callback(self.selected_index)
 
@@ -71,10 +501,8 @@ class PacketListPanel(FocusablePanel):
     def compose(self) -> ComposeResult:
         yield self.list_view
 
-    def on_list_view_highlighted(self, event: ListView.Highlighted) -> None:
-        # Get the index from the list view's current index
-        index = self.list_view.index
-        self.select(index)
+    def on_packet_list_view_highlighted(self, event: PacketListView.Highlighted) -> None:
+        self.select(self.store_row(event.index))
 
     def on_key(self, event: events.Key) -> None:
         if not self.packets:
@@ -88,6 +516,49 @@ class PacketListPanel(FocusablePanel):
             # Edit timestamp
             self.edit_timestamp()
             event.prevent_default()
+        elif event.key in ("T", "shift+t"):
+            # Shift, scale or re-space the timestamps of a range
+            self.edit_timestamps_bulk()
+            event.prevent_default()
+        elif event.key == "k":
+            # Fix up the lengths and checksums of the packets shown
+            if self.on_fixup_callback:
+                self.on_fixup_callback(self.view_rows)
+            event.prevent_default()
+        elif event.key == "x":
+            # Apply a scapy transform to a range of the packets shown
+            self.open_transform()
+            event.prevent_default()
+        elif event.key == "escape" and self.transform_progress is not None:
+            self.cancel_transform()
+            self.log("Transform cancelled")
+            event.prevent_default()
+        elif event.key == "g":
+            # Jump to the first packet at or after a time
+            self.go_to_time()
+            event.prevent_default()
+        elif event.key == "o":
+            # Jump to the next packet that is out of time order
+            self.next_out_of_order()
+            event.prevent_default()
+        elif event.key == "slash":
+            # Search the raw bytes of all packets
+            self.open_search()
+            event.prevent_default()
+        elif event.key == "f":
+            # Show only the packets that pass a display filter
+            self.open_filter()
+            event.prevent_default()
+        elif event.key == "n":
+            self.next_match(1)
+            event.prevent_default()
+        elif event.key in ("N", "shift+n"):
+            self.next_match(-1)
+            event.prevent_default()
+        elif event.key in ("shift+up", "shift+down"):
+            # Move the selected packet one row up or down
+            self.move_packet(-1 if event.key == "shift+up" else 1)
+            event.prevent_default()
 
     def add_new_packet(self):
         """Add a new packet with Ethernet, IPv4, and UDP layers after the currently selected packet."""
@@ -95,14 +566,15 @@ class PacketListPanel(FocusablePanel):
             return
         self.log(f"Adding new packet at index {self.selected_index}")
         # Generate new packet with default layers
+        from scapy.all import Ether, IP, UDP, Raw
         new_packet = Ether() / IP() / UDP() / Raw(load=b"New packet data")
         
         # Calculate timestamp as middle value between current and next packet
-        current_ts = getattr(self.packets[self.selected_index], 'time', 0)
+        current_ts = self.packets.timestamp(self.selected_index)
         
         if self.selected_index < len(self.packets) - 1:
             # There's a next packet, calculate middle timestamp
-            next_ts = getattr(self.packets[self.selected_index + 1], 'time', current_ts + 1)
+            next_ts = self.packets.timestamp(self.selected_index + 1)
             new_ts = (current_ts + next_ts) / 2
         else:
             # This is the last packet, add 1 second to current timestamp
@@ -111,18 +583,27 @@ class PacketListPanel(FocusablePanel):
         # Set the timestamp on the new packet
         new_packet.time = new_ts
         
-        # Insert the new packet after the currently selected packet
-        insert_index = self.selected_index + 1
-        self.packets.insert(insert_index, new_packet)
+        # Insert the new packet where its timestamp belongs, normally right
+        # after the currently selected packet
+        insert_index = self.packets.insert_chronological(new_packet, near=self.selected_index + 1)
         
         # Call the callback to notify the main app about the new packet
         if self.on_packet_add_callback:
             self.on_packet_add_callback(insert_index, new_packet)
         
-        # Update the display and select the new packet
-        self.set_packets(self.packets)
+        # The store already told the list view about the new row
         self.select(insert_index)
 
+    def move_packet(self, delta):
+        """Move the selected packet delta rows, keeping it selected."""
+        new_index = self.selected_index + delta
+        if not 0 <= new_index < len(self.packets):
+            return
+        self.packets.move(self.selected_index, new_index)
+        if self.on_packet_move_callback:
+            self.on_packet_move_callback(self.selected_index, new_index)
+        self.select(new_index)
+
     def edit_timestamp(self):
         """Edit the timestamp of the currently selected packet using a modal dialog."""
         if not self.packets or self.selected_index >= len(self.packets):
@@ -130,8 +611,7 @@ class PacketListPanel(FocusablePanel):
         
         self.log(f"Editing timestamp for packet at index {self.selected_index}")
 
-        current_packet = self.packets[self.selected_index]
-        current_ts = getattr(current_packet, 'time', 0)
+        current_ts = self.packets.timestamp(self.selected_index)
         
         # Format current timestamp for display
         try:
@@ -147,6 +627,55 @@ class PacketListPanel(FocusablePanel):
         )
         self.app.push_screen(modal)
 
+    def edit_timestamps_bulk(self):
+        """Open a dialog for a timestamp operation on a range of packets, by default all of them."""
+        if not self.packets:
+            return
+        modal = TimestampBulkModal(
+            packet_range=f"0-{len(self.packets) - 1}",
+            on_accept_callback=self._on_timestamp_bulk_accept,
+        )
+        self.app.push_screen(modal)
+
+    def _on_timestamp_bulk_accept(self, operation, packet_range):
+        """Handle a bulk timestamp operation from the modal."""
+        if self.on_timestamp_bulk_callback:
+            self.on_timestamp_bulk_callback(operation, packet_range)
+
+    def go_to_time(self):
+        """Ask for a time and select the first packet at or after it."""
+        if not self.packets:
+            return
+        current_ts = f"{self.packets.timestamp(self.selected_index):.6f}"
+        modal = TimestampInputModal(
+            current_timestamp=current_ts,
+            on_accept_callback=self._on_go_to_time_accept,
+            title="Go to Time",
+            label="Enter a time (epoch seconds or ISO date and time):",
+        )
+        self.app.push_screen(modal)
+
+    def _on_go_to_time_accept(self, text):
+        text = text.strip()
+        try:
+            timestamp = float(text)
+        except ValueError:
+            try:
+                timestamp = datetime.datetime.fromisoformat(text).timestamp()
+            except ValueError:
+                self.log(f"Invalid time: {text}")
+                return
+        self.select(min(self.packets.find_time(timestamp), len(self.packets) - 1))
+
+    def next_out_of_order(self):
+        """Select the start of the next out-of-order region, wrapping around."""
+        regions = self.packets.out_of_order_regions()
+        if not regions:
+            self.log("All packets are in time order")
+            return
+        following = [first for first, _ in regions if first > self.selected_index]
+        self.select(following[0] if following else regions[0][0])
+
     def _on_timestamp_accept(self, new_timestamp):
         """Handle timestamp acceptance from modal."""
         if self.on_timestamp_edit_callback:
@@ -0,0 +1,191 @@
+from rich.segment import Segment
+from textual.binding import Binding
+from textual.geometry import Size
+from textual.message import Message
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
+from textual import events
+
+
+class PacketListView(ScrollView, can_focus=True):
+    """Virtual list that only renders the rows in the viewport.
+
+    Row text is requested from row_text_callback when a row scrolls into
+    view, and cached for the viewport plus a small overscan, so mount time
+    and memory do not depend on the number of rows.  The row number is
+    prefixed at render time, so inserting or removing rows only shifts the
+    cached text instead of invalidating it.  row_number_callback maps a
+    row of the view to the number shown for it, e.g. when the view is a
+    filtered subset of the packets.
+    """
+
+    OVERSCAN = 16
+
+    COMPONENT_CLASSES = {"packet-list-view--cursor"}
+
+    DEFAULT_CSS = """
+    PacketListView {
+        width: 1fr;
+        height: 1fr;
+        overflow-x: hidden;
+    }
+    PacketListView > .packet-list-view--cursor {
+        background: $accent;
+        color: $text;
+        text-style: bold;
+    }
+    """
+
+    BINDINGS = [
+        Binding("up", "cursor_up", "Up", show=False),
+        Binding("down", "cursor_down", "Down", show=False),
+        Binding("pageup", "page_up", "Page up", show=False),
+        Binding("pagedown", "page_down", "Page down", show=False),
+        Binding("home", "first", "First", show=False),
+        Binding("end", "last", "Last", show=False),
+    ]
+
+    class Highlighted(Message):
+        """Posted when the user moves the cursor to another row."""
+
+        def __init__(self, index):
+            super().__init__()
+            self.index = index
+
+    def __init__(self, row_text_callback, *args, row_number_callback=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.row_text_callback = row_text_callback
+        self.row_number_callback = row_number_callback
+        self.row_count = 0
+        self.index = 0
+        self._row_cache = {}
+
+    def set_row_count(self, row_count):
+        self.row_count = row_count
+        self.index = max(0, min(self.index, row_count - 1))
+        self._row_cache.clear()
+        self.virtual_size = Size(0, row_count)
+        self.refresh()
+
+    def invalidate(self):
+        """Drop cached row text and redraw."""
+        self._row_cache.clear()
+        self.refresh()
+
+    def invalidate_rows(self, first, last):
+        """Drop cached text of rows first..last and redraw only those."""
+        if last - first < len(self._row_cache):
+            for row in range(first, last + 1):
+                self._row_cache.pop(row, None)
+        else:
+            # Bulk changes can span millions of rows; only a page is cached
+            self._row_cache = {r: t for r, t in self._row_cache.items() if not first <= r <= last}
+        top = round(self.scroll_y)
+        first, last = max(first, top), min(last, top + self.page_size)
+        if first <= last:
+            self.refresh_lines(first, last - first + 1)
+
+    def _shift_cache(self, row, delta):
+        self._row_cache = {
+            (r + delta if r >= row else r): t for r, t in self._row_cache.items()
+        }
+
+    def insert_rows(self, row, count):
+        """Account for count rows inserted before row."""
+        self._shift_cache(row, count)
+        if self.index >= row and self.row_count:
+            self.index += count
+        self.row_count += count
+        self.virtual_size = Size(0, self.row_count)
+        self.refresh()
+
+    def remove_rows(self, row, count):
+        """Account for count rows removed at row."""
+        for r in range(row, row + count):
+            self._row_cache.pop(r, None)
+        self._shift_cache(row + count, -count)
+        self.row_count -= count
+        if self.index >= row + count:
+            self.index -= count
+        self.index = max(0, min(self.index, self.row_count - 1))
+        self.virtual_size = Size(0, self.row_count)
+        self.refresh()
+
+    def move_row(self, row, new_row):
+        """Account for the row at row having moved to new_row."""
+        text = self._row_cache.pop(row, None)
+        self._shift_cache(row + 1, -1)
+        self._shift_cache(new_row, 1)
+        if text is not None:
+            self._row_cache[new_row] = text
+        self.refresh_lines(min(row, new_row), abs(row - new_row) + 1)
+
+    @property
+    def page_size(self):
+        return max(1, self.scrollable_content_region.height)
+
+    def move_cursor(self, index, notify=True):
+        """Move the cursor to index, scrolling it into view."""
+        if not self.row_count:
+            return
+        index = max(0, min(index, self.row_count - 1))
+        if index != self.index:
+            self.refresh_line(self.index)
+            self.index = index
+            self.refresh_line(index)
+        self.scroll_to_index(index)
+        if notify:
+            self.post_message(self.Highlighted(index))
+
+    def scroll_to_index(self, index):
+        top = round(self.scroll_y)
+        if index < top:
+            self.scroll_to(y=index, animate=False)
+        elif index >= top + self.page_size:
+            self.scroll_to(y=index - self.page_size + 1, animate=False)
+
+    def action_cursor_up(self):
+        self.move_cursor(self.index - 1)
+
+    def action_cursor_down(self):
+        self.move_cursor(self.index + 1)
+
+    def action_page_up(self):
+        self.move_cursor(self.index - self.page_size)
+
+    def action_page_down(self):
+        self.move_cursor(self.index + self.page_size)
+
+    def action_first(self):
+        self.move_cursor(0)
+
+    def action_last(self):
+        self.move_cursor(self.row_count - 1)
+
+    def on_click(self, event: events.Click) -> None:
+        self.move_cursor(round(self.scroll_y) + event.y)
+
+    def _row_text(self, row):
+        text = self._row_cache.get(row)
+        if text is None:
+            top = round(self.scroll_y)
+            if len(self._row_cache) > 2 * (self.page_size + 2 * self.OVERSCAN):
+                # Forget rows that are well outside the viewport
+                low, high = top - self.OVERSCAN, top + self.page_size + self.OVERSCAN
+                self._row_cache = {r: t for r, t in self._row_cache.items() if low <= r < high}
+            text = self.row_text_callback(row)
+            self._row_cache[row] = text
+        return text
+
+    def render_line(self, y: int) -> Strip:
+        width = self.scrollable_content_region.width
+        row = round(self.scroll_y) + y
+        if row >= self.row_count:
+            return Strip.blank(width, self.rich_style)
+        if row == self.index:
+            style = self.get_component_rich_style("packet-list-view--cursor")
+        else:
+            style = self.rich_style
+        number = self.row_number_callback(row) if self.row_number_callback else row
+        text = f"{number}: {self._row_text(row)}"[:width].ljust(width)
+        return Strip([Segment(text, style)], width)
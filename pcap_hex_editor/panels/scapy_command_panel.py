@@ -1,4 +1,5 @@
 from .focusable_panel import FocusablePanel
+from ..profiler import profiler
 from textual import events
 from textual import events
 from textual.app import App, ComposeResult
@@ -16,15 +17,20 @@ class TextAreaEnter(TextArea):
             event.prevent_default()
 
 class ScapyCommandPanel(FocusablePanel):
-    """Panel to display and edit the Scapy command for the current packet."""
+    """Panel to display and edit the Scapy command for the current packet.
+
+    Generated commands are kept in the optional shared cache under
+    ("command", key), where key is the PacketStore.key() of the packet.
+    """
     packet = reactive(None)
     command_text = reactive("")
     on_edit_callback = None
 
-    def __init__(self, title, *args, on_edit_callback=None, **kwargs):
+    def __init__(self, title, *args, on_edit_callback=None, cache=None, **kwargs):
         kwargs.setdefault('id', 'panel-command')
         super().__init__(*args, **kwargs)
         self.on_edit_callback = on_edit_callback
+        self.cache = cache
         self.original_title = title
         self.border_title = title
         self.text_area = TextAreaEnter(id="text-area", on_edit_callback=on_edit_callback)
@@ -43,13 +49,21 @@ class ScapyCommandPanel(FocusablePanel):
         self.border_title = self.original_title
         self.refresh()
 
-    def set_packet(self, packet):
+    def set_packet(self, packet, key=None):
+        """Show a packet; key is its PacketStore.key(), if it may be cached."""
         self.packet = packet
+        cacheable = key is not None and self.cache is not None
         if packet is not None:
-            try:
-                self.command_text = packet.command()
-            except Exception:
-                self.command_text = "Error generating command"
+            command = self.cache.get(("command", key)) if cacheable else None
+            if command is None:
+                try:
+                    with profiler.timed("command"):
+                        command = packet.command()
+                    if cacheable:
+                        self.cache.put(("command", key), command)
+                except Exception:
+                    command = "Error generating command"
+            self.command_text = command
         else:
             self.command_text = "No packet selected"
         self.text_area.text = self.command_text
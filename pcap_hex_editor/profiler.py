@@ -0,0 +1,173 @@
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+
+MAX_SAMPLES = 2048      # Latest durations kept per operation, for percentiles
+MAX_EVENTS = 100000     # Latest trace events kept for export
+
+
+def _percentile(samples, fraction):
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+class _Timer:
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.profiler.record(self.name, self.start, time.perf_counter() - self.start)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Profiler:
+    """Timings of the editor's hot paths, shown by the profiling overlay.
+
+    Code under measurement is wrapped in `with profiler.timed("name"):` or
+    decorated with @profiled("name").  Each operation keeps a count, a
+    total and its latest durations, from which the overlay shows p50 and
+    p99 latency; each timing is also kept as a trace event for export().
+    Timings may be recorded from worker threads.  LRUCaches registered
+    with watch_cache() report their hit rates alongside, and memory use is
+    reported while tracemalloc is tracing, see trace_memory().
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._caches = {}
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._counts = {}
+            self._totals = {}
+            self._samples = {}
+            self._events = deque(maxlen=MAX_EVENTS)
+            self._origin = time.perf_counter()
+
+    def timed(self, name):
+        """Context manager recording the time spent in its body under name."""
+        return _Timer(self, name) if self.enabled else _NULL_TIMER
+
+    def record(self, name, start, duration):
+        with self._lock:
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=MAX_SAMPLES)
+                self._counts[name] = 0
+                self._totals[name] = 0.0
+            samples.append(duration)
+            self._counts[name] += 1
+            self._totals[name] += duration
+            self._events.append((name, start, duration, threading.get_ident()))
+
+    def watch_cache(self, name, cache):
+        """Report the hit rate of an LRUCache under name."""
+        self._caches[name] = cache
+
+    @property
+    def memory_traced(self):
+        return tracemalloc.is_tracing()
+
+    def trace_memory(self, enable=True):
+        """Start or stop tracemalloc; tracing slows allocations down noticeably."""
+        if enable and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not enable and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def stats(self):
+        """Per-operation timings in milliseconds, cache statistics and memory use."""
+        with self._lock:
+            snapshot = [(name, self._counts[name], self._totals[name], sorted(samples))
+                        for name, samples in self._samples.items()]
+        operations = {}
+        for name, count, total, samples in sorted(snapshot):
+            operations[name] = {
+                "count": count,
+                "total_ms": total * 1000,
+                "p50_ms": _percentile(samples, 0.5) * 1000,
+                "p99_ms": _percentile(samples, 0.99) * 1000,
+                "max_ms": samples[-1] * 1000,
+            }
+        memory = None
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            top = tracemalloc.take_snapshot().statistics("lineno")[:10]
+            memory = {
+                "current_bytes": current,
+                "peak_bytes": peak,
+                "top": [{"where": str(stat.traceback), "bytes": stat.size, "count": stat.count} for stat in top],
+            }
+        return {
+            "operations": operations,
+            "caches": {name: cache.stats() for name, cache in self._caches.items()},
+            "memory": memory,
+        }
+
+    def trace_events(self):
+        """Recorded timings in the Chrome trace event format, in microseconds."""
+        with self._lock:
+            events = list(self._events)
+            origin = self._origin
+        pid = os.getpid()
+        return [{"name": name, "ph": "X", "ts": (start - origin) * 1e6, "dur": duration * 1e6,
+                 "pid": pid, "tid": tid} for name, start, duration, tid in events]
+
+    def export(self, filename):
+        """Write stats() and the trace events as JSON.
+
+        The file loads in chrome://tracing and Perfetto, which read the
+        traceEvents list and ignore the statistics next to it.
+        """
+        data = self.stats()
+        data["traceEvents"] = self.trace_events()
+        data["displayTimeUnit"] = "ms"
+        with open(filename, "w") as f:
+            json.dump(data, f)
+        return filename
+
+
+# Off, at the cost of one attribute check per hook, until the F4 overlay
+# is first opened, or from start-up with PCAP_HEX_EDITOR_PROFILE=1
+profiler = Profiler(enabled=bool(os.environ.get("PCAP_HEX_EDITOR_PROFILE")))
+
+
+def profiled(name):
+    """Decorator recording the time spent in each call under name."""
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not profiler.enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profiler.record(name, start, time.perf_counter() - start)
+        return wrapper
+    return decorate
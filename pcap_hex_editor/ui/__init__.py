@@ -5,6 +5,11 @@ This package contains UI-specific components like overlays and dialogs.
 """
 
 from .help_overlay import HelpOverlay
+from .profile_overlay import ProfileOverlay
 from .timestamp_input_modal import TimestampInputModal
+from .timestamp_bulk_modal import TimestampBulkModal
+from .search_modal import SearchModal
+from .filter_modal import FilterModal
+from .transform_modal import TransformModal
 
-__all__ = ["HelpOverlay", "TimestampInputModal"] 
\ No newline at end of file
+__all__ = ["HelpOverlay", "ProfileOverlay", "TimestampInputModal", "TimestampBulkModal", "SearchModal", "FilterModal", "TransformModal"] 
\ No newline at end of file
@@ -0,0 +1,60 @@
+from textual.app import ComposeResult
+from textual.containers import Vertical, Horizontal
+from textual.widgets import Static, Button, Input
+from textual.binding import Binding
+from textual.screen import ModalScreen
+
+class FilterModal(ModalScreen):
+    """Modal input dialog for the display filter of the packet list."""
+
+    BINDINGS = [
+        Binding(key="escape", action="cancel", description="Cancel"),
+    ]
+
+    def __init__(self, filter_text="", on_accept_callback=None, on_cancel_callback=None):
+        super().__init__()
+        self.filter_text = filter_text
+        self.on_accept_callback = on_accept_callback
+        self.on_cancel_callback = on_cancel_callback
+        self.filter_input = None
+
+    def compose(self) -> ComposeResult:
+        with Vertical(id="timestamp-modal-overlay"):
+            with Vertical(id="timestamp-modal"):
+                yield Static("Display Filter", id="modal-title")
+                yield Static("Filter, e.g. ip.addr == 10.0.0.0/8 && tcp.port in {80 443} (empty shows all):",
+                             id="input-label")
+                self.filter_input = Input(value=self.filter_text, id="filter-input")
+                yield self.filter_input
+                with Horizontal(id="modal-buttons"):
+                    yield Button("Cancel (Esc)", id="cancel-button")
+                    yield Button("Apply (Enter)", id="accept-button")
+
+    def on_mount(self):
+        """Focus the filter input when the modal is mounted."""
+        if self.filter_input:
+            self.filter_input.focus()
+            self.filter_input.selection = (0, len(self.filter_text))
+
+    def action_cancel(self) -> None:
+        """Keep the current filter."""
+        if self.on_cancel_callback:
+            self.on_cancel_callback()
+        self.dismiss()
+
+    def action_accept(self) -> None:
+        """Apply the filter."""
+        if self.filter_input and self.on_accept_callback:
+            self.on_accept_callback(self.filter_input.value)
+        self.dismiss()
+
+    def on_button_pressed(self, event: Button.Pressed) -> None:
+        """Handle button presses."""
+        if event.button.id == "cancel-button":
+            self.action_cancel()
+        elif event.button.id == "accept-button":
+            self.action_accept()
+
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        """Handle input submission (Enter key)."""
+        self.action_accept()
@@ -12,9 +12,19 @@ PCAP Hex Editor - Help
 Navigation:
   Up/Down         - Select packet
   Shift+Up/Down   - Move packet up/down
+  t               - Edit packet timestamp
+  T               - Shift/scale/re-space timestamps of a range
+  k               - Fix lengths and checksums of the edited packets shown
+  x               - Apply a scapy transform to a range of the packets shown (Esc cancels)
+  g               - Go to the first packet at or after a time
+  o               - Go to the next out-of-order packet
+  /               - Search packet bytes (ASCII, hex or regex)
+  n / N           - Go to the next/previous search match
+  f               - Apply a display filter (e.g. ip.addr == 10.0.0.0/8 && tcp.port in {80 443})
   Tab             - Cycle focus between panels
   F1              - Show this help
   F2              - Quit
+  F4              - Show timings of the hot paths (profiling overlay)
 
 Hex Editor:
   Left/Right/Up/Down - Move cursor
@@ -31,6 +41,9 @@ Scapy Command Panel:
 
 General:
   s               - Save to edited_sample.pcap
+  Ctrl+Z          - Undo the last edit
+  Ctrl+Y          - Redo the last undone edit
+  Ctrl+K          - Toggle fixing checksums on hex edits
   Esc             - Close help
 '''
 
@@ -0,0 +1,94 @@
+import time
+from textual.app import ComposeResult, Screen
+from textual.containers import Vertical
+from textual.widgets import Static, Button
+from textual.binding import Binding
+from ..profiler import profiler
+
+
+def format_stats(stats):
+    """Text of the overlay for Profiler.stats()."""
+    lines = [f"{'Operation':<18} {'Count':>8} {'p50 ms':>9} {'p99 ms':>9} {'Max ms':>9} {'Total ms':>10}"]
+    for name, op in stats["operations"].items():
+        lines.append(f"{name:<18} {op['count']:>8} {op['p50_ms']:>9.3f} {op['p99_ms']:>9.3f} "
+                     f"{op['max_ms']:>9.3f} {op['total_ms']:>10.1f}")
+    if not stats["operations"]:
+        lines.append("No timings recorded yet.")
+    lines.append("")
+    lines.append(f"{'Cache':<18} {'Size':>15} {'Hits':>9} {'Misses':>9} {'Hit rate':>10}")
+    for name, cache in stats["caches"].items():
+        size = f"{cache['size']}/{cache['maxsize']}"
+        lines.append(f"{name:<18} {size:>15} {cache['hits']:>9} {cache['misses']:>9} {cache['hit_rate']:>10.1%}")
+    lines.append("")
+    memory = stats["memory"]
+    if memory is None:
+        lines.append("Memory: not traced (m to start tracemalloc)")
+    else:
+        lines.append(f"Memory: {memory['current_bytes'] / 1048576:.1f} MiB traced, "
+                     f"{memory['peak_bytes'] / 1048576:.1f} MiB peak")
+        for stat in memory["top"][:5]:
+            lines.append(f"  {stat['bytes'] / 1024:>10.1f} KiB  {stat['where']}")
+    return "\n".join(lines)
+
+
+class ProfileOverlay(Screen):
+    """Overlay with the timings of the hot paths, cache hit rates and memory use."""
+
+    REFRESH_INTERVAL = 1.0
+
+    BINDINGS = [
+        Binding(key="escape", action="close_profile", description="Close"),
+        Binding(key="f4", action="close_profile", description="Close"),
+        Binding(key="r", action="reset", description="Reset"),
+        Binding(key="m", action="toggle_memory", description="Trace memory"),
+        Binding(key="e", action="export", description="Export"),
+    ]
+
+    def __init__(self, on_close_callback=None):
+        super().__init__()
+        self.on_close_callback = on_close_callback
+        self.message = ""
+
+    def compose(self) -> ComposeResult:
+        with Vertical(id="help-overlay"):
+            with Vertical(id="help-modal"):
+                yield Static("", id="profile-content")
+                yield Button("Close (Esc)", id="help-close-button")
+
+    def on_mount(self):
+        self.update_stats()
+        self.set_interval(self.REFRESH_INTERVAL, self.update_stats)
+        self.query_one("#help-close-button").focus()
+
+    def update_stats(self):
+        text = "Profile - r: reset, m: trace memory, e: export to JSON\n\n" + format_stats(profiler.stats())
+        if self.message:
+            text += "\n\n" + self.message
+        self.query_one("#profile-content", Static).update(text)
+
+    def on_button_pressed(self, event: Button.Pressed) -> None:
+        self.action_close_profile()
+
+    def action_reset(self) -> None:
+        profiler.reset()
+        self.message = "Timings reset"
+        self.update_stats()
+
+    def action_toggle_memory(self) -> None:
+        tracing = profiler.memory_traced
+        profiler.trace_memory(not tracing)
+        self.message = "Stopped tracing memory" if tracing else "Tracing memory"
+        self.update_stats()
+
+    def action_export(self) -> None:
+        filename = time.strftime("profile_%Y%m%d_%H%M%S.json")
+        try:
+            profiler.export(filename)
+            self.message = f"Exported to {filename}"
+        except OSError as e:
+            self.message = f"Export failed: {e}"
+        self.update_stats()
+
+    def action_close_profile(self) -> None:
+        """Close the profile overlay."""
+        self.on_close_callback()
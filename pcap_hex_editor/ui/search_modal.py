@@ -0,0 +1,65 @@
+from textual.app import ComposeResult
+from textual.containers import Vertical, Horizontal
+from textual.widgets import Static, Button, Input, Select
+from textual.binding import Binding
+from textual.screen import ModalScreen
+
+class SearchModal(ModalScreen):
+    """Modal input dialog for searching the raw bytes of all packets."""
+
+    BINDINGS = [
+        Binding(key="escape", action="cancel", description="Cancel"),
+    ]
+
+    MODES = [("ASCII text", "ascii"), ("Hex bytes", "hex"), ("Regular expression", "regex")]
+
+    def __init__(self, pattern="", mode="ascii", on_accept_callback=None, on_cancel_callback=None):
+        super().__init__()
+        self.pattern = pattern
+        self.mode = mode
+        self.on_accept_callback = on_accept_callback
+        self.on_cancel_callback = on_cancel_callback
+        self.pattern_input = None
+        self.mode_select = None
+
+    def compose(self) -> ComposeResult:
+        with Vertical(id="timestamp-modal-overlay"):
+            with Vertical(id="timestamp-modal"):
+                yield Static("Search Packets", id="modal-title")
+                yield Static("Search for:", id="input-label")
+                self.pattern_input = Input(value=self.pattern, id="search-input")
+                yield self.pattern_input
+                self.mode_select = Select(self.MODES, value=self.mode, allow_blank=False, id="search-mode")
+                yield self.mode_select
+                with Horizontal(id="modal-buttons"):
+                    yield Button("Cancel (Esc)", id="cancel-button")
+                    yield Button("Search (Enter)", id="accept-button")
+
+    def on_mount(self):
+        """Focus the pattern input when the modal is mounted."""
+        if self.pattern_input:
+            self.pattern_input.focus()
+            self.pattern_input.selection = (0, len(self.pattern))
+
+    def action_cancel(self) -> None:
+        """Cancel the search."""
+        if self.on_cancel_callback:
+            self.on_cancel_callback()
+        self.dismiss()
+
+    def action_accept(self) -> None:
+        """Start the search."""
+        if self.pattern_input and self.on_accept_callback:
+            self.on_accept_callback(self.pattern_input.value, self.mode_select.value)
+        self.dismiss()
+
+    def on_button_pressed(self, event: Button.Pressed) -> None:
+        """Handle button presses."""
+        if event.button.id == "cancel-button":
+            self.action_cancel()
+        elif event.button.id == "accept-button":
+            self.action_accept()
+
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        """Handle input submission (Enter key)."""
+        self.action_accept()
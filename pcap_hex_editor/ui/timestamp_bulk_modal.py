@@ -0,0 +1,68 @@
+from textual.app import ComposeResult
+from textual.containers import Vertical, Horizontal
+from textual.widgets import Static, Button, Input
+from textual.binding import Binding
+from textual.screen import ModalScreen
+
+class TimestampBulkModal(ModalScreen):
+    """Modal input dialog for timestamp operations on a range of packets."""
+
+    BINDINGS = [
+        Binding(key="escape", action="cancel", description="Cancel"),
+    ]
+
+    OPERATIONS_HELP = (
+        "+S / -S: shift by S seconds   =T: move the first packet to epoch T\n"
+        "*F: scale the gaps by F       @I: re-space I seconds apart"
+    )
+
+    def __init__(self, packet_range, on_accept_callback=None, on_cancel_callback=None):
+        super().__init__()
+        self.packet_range = packet_range
+        self.on_accept_callback = on_accept_callback
+        self.on_cancel_callback = on_cancel_callback
+        self.operation_input = None
+        self.range_input = None
+
+    def compose(self) -> ComposeResult:
+        with Vertical(id="timestamp-modal-overlay"):
+            with Vertical(id="timestamp-modal"):
+                yield Static("Bulk Timestamp Operation", id="modal-title")
+                yield Static(self.OPERATIONS_HELP, id="current-timestamp")
+                yield Static("Operation:", id="input-label")
+                self.operation_input = Input(placeholder="+3600", id="timestamp-input")
+                yield self.operation_input
+                yield Static("Packets (first-last):", id="range-label")
+                self.range_input = Input(value=self.packet_range, id="range-input")
+                yield self.range_input
+                with Horizontal(id="modal-buttons"):
+                    yield Button("Cancel (Esc)", id="cancel-button")
+                    yield Button("Apply (Enter)", id="accept-button")
+
+    def on_mount(self):
+        """Focus the operation input when the modal is mounted."""
+        if self.operation_input:
+            self.operation_input.focus()
+
+    def action_cancel(self) -> None:
+        """Cancel the operation."""
+        if self.on_cancel_callback:
+            self.on_cancel_callback()
+        self.dismiss()
+
+    def action_accept(self) -> None:
+        """Apply the operation to the range."""
+        if self.operation_input and self.on_accept_callback:
+            self.on_accept_callback(self.operation_input.value, self.range_input.value)
+        self.dismiss()
+
+    def on_button_pressed(self, event: Button.Pressed) -> None:
+        """Handle button presses."""
+        if event.button.id == "cancel-button":
+            self.action_cancel()
+        elif event.button.id == "accept-button":
+            self.action_accept()
+
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        """Handle input submission (Enter key) in either field."""
+        self.action_accept()
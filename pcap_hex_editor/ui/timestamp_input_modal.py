@@ -13,9 +13,12 @@ class TimestampInputModal(ModalScreen):
         Binding(key="enter", action="accept", description="Accept"),
     ]
 
-    def __init__(self, current_timestamp, on_accept_callback=None, on_cancel_callback=None):
+    def __init__(self, current_timestamp, on_accept_callback=None, on_cancel_callback=None,
+                 title="Edit Packet Timestamp", label="Enter new timestamp (epoch seconds.milliseconds):"):
         super().__init__()
         self.current_timestamp = current_timestamp
+        self.modal_title = title
+        self.input_label = label
         self.on_accept_callback = on_accept_callback
         self.on_cancel_callback = on_cancel_callback
         self.input_widget = None
@@ -23,9 +26,9 @@ class TimestampInputModal(ModalScreen):
     def compose(self) -> ComposeResult:
         with Vertical(id="timestamp-modal-overlay"):
             with Vertical(id="timestamp-modal"):
-                yield Static("Edit Packet Timestamp", id="modal-title")
+                yield Static(self.modal_title, id="modal-title")
                 yield Static(f"Current: {self.current_timestamp}", id="current-timestamp")
-                yield Static("Enter new timestamp (epoch seconds.milliseconds):", id="input-label")
+                yield Static(self.input_label, id="input-label")
                 self.input_widget = Input(value=self.current_timestamp, id="timestamp-input")
                 yield self.input_widget
                 with Horizontal(id="modal-buttons"):
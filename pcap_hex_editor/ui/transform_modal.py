@@ -0,0 +1,73 @@
+from textual.app import ComposeResult
+from textual.containers import Vertical, Horizontal
+from textual.widgets import Static, Button, Input
+from textual.binding import Binding
+from textual.screen import ModalScreen
+
+class TransformModal(ModalScreen):
+    """Modal input dialog for a scapy transform of a range of packets."""
+
+    BINDINGS = [
+        Binding(key="escape", action="cancel", description="Cancel"),
+    ]
+
+    TRANSFORM_HELP = (
+        "An expression over pkt giving the new packet, a lambda, or statements on pkt:\n"
+        "  Ether(dst=\"aa:bb:cc:dd:ee:ff\") / pkt.payload\n"
+        "  if IP in pkt and UDP in pkt: pkt[IP].ttl = 64\n"
+        "Checksums are fixed up; packets the transform fails on are left as they are."
+    )
+
+    def __init__(self, packet_range, transform="", scope="", on_accept_callback=None, on_cancel_callback=None):
+        super().__init__()
+        self.packet_range = packet_range
+        self.transform = transform
+        self.scope = scope
+        self.on_accept_callback = on_accept_callback
+        self.on_cancel_callback = on_cancel_callback
+        self.transform_input = None
+        self.range_input = None
+
+    def compose(self) -> ComposeResult:
+        with Vertical(id="timestamp-modal-overlay"):
+            with Vertical(id="timestamp-modal"):
+                yield Static("Transform Packets", id="modal-title")
+                yield Static(self.TRANSFORM_HELP, id="current-timestamp")
+                yield Static("Transform:", id="input-label")
+                self.transform_input = Input(value=self.transform, placeholder="setattr(pkt[IP], 'ttl', 64)",
+                                             id="timestamp-input")
+                yield self.transform_input
+                yield Static(f"Packets (first-last){self.scope}:", id="range-label")
+                self.range_input = Input(value=self.packet_range, id="range-input")
+                yield self.range_input
+                with Horizontal(id="modal-buttons"):
+                    yield Button("Cancel (Esc)", id="cancel-button")
+                    yield Button("Apply (Enter)", id="accept-button")
+
+    def on_mount(self):
+        """Focus the transform input when the modal is mounted."""
+        if self.transform_input:
+            self.transform_input.focus()
+
+    def action_cancel(self) -> None:
+        """Cancel the transform."""
+        if self.on_cancel_callback:
+            self.on_cancel_callback()
+        self.dismiss()
+
+    def action_accept(self) -> None:
+        """Apply the transform to the range."""
+        if self.transform_input and self.on_accept_callback:
+            self.on_accept_callback(self.transform_input.value, self.range_input.value)
+        self.dismiss()
+
+    def on_button_pressed(self, event: Button.Pressed) -> None:
+        """Handle button presses."""
+        if event.button.id == "cancel-button":
+            self.action_cancel()
+        elif event.button.id == "accept-button":
+            self.action_accept()
+
+    def on_input_submitted(self, event: Input.Submitted) -> None:
+        """Handle input submission (Enter key) in either field."""
+        self.action_accept()
@@ -29,7 +29,7 @@ setup(
     long_description=read_readme(),
     long_description_content_type="text/markdown",
     url="",
-    packages=find_packages(),
+    packages=find_packages(exclude=["benchmarks"]),
     classifiers=[
         "Development Status :: 4 - Beta",
         "Intended Audience :: Developers",
@@ -2,8 +2,15 @@
 Basic tests for PCAP Hex Editor package
 """
 
+import asyncio
+import json
+import subprocess
+import sys
 import pytest
 from pcap_hex_editor import PcapHexEditorApp
+from pcap_hex_editor.capture import LRUCache, scapy_loaded
+from pcap_hex_editor.profiler import Profiler, profiler
+from pcap_hex_editor.ui import ProfileOverlay
 
 
 def test_import():
@@ -18,5 +25,99 @@ def test_app_creation():
     assert app.pcap_filename == "data/sample.pcap"
 
 
+def test_capture_import_skips_the_ui():
+    """Worker processes import the capture package without loading Textual."""
+    code = (
+        "import sys\n"
+        "import pcap_hex_editor.capture, pcap_hex_editor.capture.transform\n"
+        "print(sorted(m for m in sys.modules if m.split('.')[0] == 'textual'))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
+
+
+def test_import_defers_scapy():
+    """Importing the app does not import scapy, and costs less than scapy alone."""
+    code = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        "import pcap_hex_editor.main\n"
+        "app = time.perf_counter() - start\n"
+        "loaded = sorted(m for m in sys.modules if m.split('.')[0] == 'scapy')\n"
+        "start = time.perf_counter()\n"
+        "import scapy.all\n"
+        "print(app, time.perf_counter() - start, loaded)\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    app_time, scapy_time, loaded = output.split(" ", 2)
+    assert loaded.strip() == "[]"
+    assert float(app_time) < float(scapy_time)
+
+
+def test_profiler_reports_and_exports(tmp_path):
+    """Timings give counts and percentiles and export as a Chrome trace."""
+    timings = Profiler()
+    for ms in range(1, 101):
+        timings.record("op", 0.0, ms / 1000)
+    with timings.timed("block"):
+        pass
+    cache = LRUCache(4)
+    cache.put("a", 1)
+    cache.get("a")
+    cache.get("b")
+    timings.watch_cache("cache", cache)
+    stats = timings.stats()
+    assert stats["operations"]["op"]["count"] == 100
+    assert stats["operations"]["op"]["p50_ms"] == pytest.approx(51)
+    assert stats["operations"]["op"]["p99_ms"] == pytest.approx(100)
+    assert stats["operations"]["block"]["count"] == 1
+    assert stats["caches"]["cache"]["hit_rate"] == 0.5
+    assert stats["memory"] is None
+
+    data = json.loads(open(timings.export(str(tmp_path / "profile.json"))).read())
+    assert len(data["traceEvents"]) == 101
+    assert data["traceEvents"][0]["ph"] == "X"
+    assert data["operations"]["op"]["count"] == 100
+
+
+def test_profile_overlay_shows_hot_paths(monkeypatch):
+    """Timing starts when the F4 overlay is first shown, which then shows
+    selecting and rendering packets."""
+    monkeypatch.setattr(profiler, "enabled", False)
+
+    async def run():
+        app = PcapHexEditorApp("data/test.pcap")
+        async with app.run_test() as pilot:
+            while not scapy_loaded():
+                await pilot.pause(0.05)
+            profiler.reset()
+            app.packet_list_panel.select(2)
+            await pilot.pause(0.1)
+            assert profiler.stats()["operations"] == {}
+            await pilot.press("f4")
+            await pilot.press("escape")
+            await pilot.pause()
+            assert profiler.enabled
+            profiler.reset()
+            app.packet_list_panel.select(1)
+            for _ in range(100):
+                await pilot.pause(0.02)
+                if "hex.render_line" in profiler.stats()["operations"]:
+                    break
+            await pilot.press("f4")
+            await pilot.pause()
+            assert isinstance(app.screen, ProfileOverlay)
+            text = str(app.screen.query_one("#profile-content").render())
+            await pilot.press("escape")
+            await pilot.pause()
+            assert not isinstance(app.screen, ProfileOverlay)
+        return text
+
+    text = asyncio.run(run())
+    assert "select" in text
+    assert "hex.render_line" in text
+    assert "summaries" in text
+
+
 if __name__ == "__main__":
     pytest.main([__file__]) 
\ No newline at end of file
@@ -0,0 +1,130 @@
+"""
+Tests for headless batch editing
+"""
+
+import os
+import struct
+import subprocess
+import sys
+import pytest
+from scapy.all import rdpcap, Ether, IP, UDP
+from pcap_hex_editor.batch import parse_script, run, split_records
+from pcap_hex_editor.capture import PcapIndex
+
+TEST_PCAP = os.path.join(os.path.dirname(__file__), "..", "data", "test.pcap")
+
+SCRIPT = """
+# Comments and blank lines are ignored
+timestamp 2 1234567890.25
+patch 3 0 ffffffffffff
+command 4 pkt / b"tail"
+insert 5 1.5 Ether()/IP()/UDP(dport=53)
+insert 30 2.5 Ether()/IP()/UDP(dport=54)
+"""
+
+
+def check_output(path):
+    original = rdpcap(TEST_PCAP)
+    edited = rdpcap(str(path))
+    assert len(edited) == len(original) + 2
+    assert float(edited[2].time) == pytest.approx(1234567890.25)
+    assert bytes(edited[3])[:6] == b"\xff" * 6
+    assert bytes(edited[3])[6:] == bytes(original[3])[6:]
+    assert bytes(edited[4]) == bytes(original[4]) + b"tail"
+    assert edited[5][UDP].dport == 53
+    assert bytes(edited[6]) == bytes(original[5])
+    assert edited[-1][UDP].dport == 54
+    assert bytes(edited[-2]) == bytes(original[-1])
+
+
+def test_parse_script_groups_edits_by_row():
+    """Edits are grouped per row and malformed lines name their line."""
+    edits = parse_script(["patch 1 0x10 abcd", "timestamp 1 5"])
+    assert edits == {1: [("patch", 16, b"\xab\xcd"), ("timestamp", 5.0)]}
+    with pytest.raises(ValueError, match="line 1"):
+        parse_script(["patch 1 nothex"])
+
+
+def test_run_applies_script(tmp_path):
+    """A streamed batch run applies every kind of edit."""
+    out = tmp_path / "edited.pcap"
+    assert run(TEST_PCAP, SCRIPT.splitlines(), str(out)) == 30
+    check_output(out)
+
+
+@pytest.mark.parametrize("jobs", [1, 2, 3, 7, 64])
+def test_split_records_covers_the_capture(jobs):
+    """Worker ranges start at record headers and cover every record once."""
+    index = PcapIndex(TEST_PCAP)
+    total, ranges = split_records(TEST_PCAP, index.endian, jobs)
+    assert total == len(index) and len(ranges) == min(jobs, total)
+    assert [first for first, _, _ in ranges] == sorted({first for first, _, _ in ranges})
+    assert sum(count for _, count, _ in ranges) == total and all(count for _, count, _ in ranges)
+    for first, count, offset in ranges:
+        assert offset == index.offsets[first] - 16
+
+
+def test_run_in_worker_processes_matches(tmp_path):
+    """Splitting the capture across workers gives the same file."""
+    serial, parallel = tmp_path / "serial.pcap", tmp_path / "parallel.pcap"
+    run(TEST_PCAP, SCRIPT.splitlines(), str(serial))
+    run(TEST_PCAP, SCRIPT.splitlines(), str(parallel), jobs=3)
+    assert parallel.read_bytes() == serial.read_bytes()
+    assert sorted(os.listdir(tmp_path)) == ["parallel.pcap", "serial.pcap"]
+
+
+def test_run_fixes_up_edited_records(tmp_path):
+    """With fixup, edited records get valid lengths and checksums; others are untouched."""
+    out = tmp_path / "fixed.pcap"
+    script = ["patch 0 26 0a000001", "patch 3 30 0a000002", 'command 5 pkt / b"tail"']
+    run(TEST_PCAP, script, str(out), fixup=True)
+    original = rdpcap(TEST_PCAP)
+    edited = rdpcap(str(out))
+    assert edited[0][IP].src == "10.0.0.1"
+    assert edited[3][IP].dst == "10.0.0.2"
+    assert edited[5][IP].len == len(original[5][IP]) + 4
+    for row in (0, 3, 5):
+        rebuilt = edited[row].copy()
+        del rebuilt[IP].len
+        del rebuilt[IP].chksum
+        del rebuilt[IP].payload.chksum
+        if UDP in rebuilt:
+            del rebuilt[UDP].len
+        assert bytes(edited[row]) == bytes(Ether(bytes(rebuilt)))
+    assert [bytes(p) for p in edited[6:]] == [bytes(p) for p in original[6:]]
+
+
+def test_run_keeps_nanosecond_timestamps(tmp_path):
+    """Edited records keep their header timestamp; timestamp edits are exact."""
+    header = struct.pack("<IHHiIII", 0xa1b23c4d, 2, 4, 0, 0, 65535, 1)
+    data = bytes(Ether() / IP() / UDP())
+    records = b"".join(struct.pack("<IIII", 1700000000 + i, 123456789, len(data), len(data)) + data
+                       for i in range(2))
+    source = tmp_path / "nsec.pcap"
+    source.write_bytes(header + records)
+    run(str(source), ["patch 0 0 01", "timestamp 1 1700000001.987654321"], str(tmp_path / "out.pcap"))
+    saved = PcapIndex(str(tmp_path / "out.pcap"))
+    assert list(zip(saved.secs, saved.fracs)) == [(1700000000, 123456789), (1700000001, 987654321)]
+
+
+def test_run_rejects_rows_past_the_end(tmp_path):
+    """Edits past the end of the capture fail without leaving output behind."""
+    with pytest.raises(ValueError):
+        run(TEST_PCAP, ["timestamp 99 1.0"], str(tmp_path / "out.pcap"))
+    assert os.listdir(tmp_path) == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
+
+
+def test_run_without_expressions_skips_scapy(tmp_path):
+    """Scripts with only patch and timestamp edits never import scapy."""
+    code = (
+        "import sys\n"
+        "from pcap_hex_editor.batch import run\n"
+        f"run({TEST_PCAP!r}, ['patch 1 0 ff', 'timestamp 2 5'], {str(tmp_path / 'out.pcap')!r})\n"
+        "print('scapy' in sys.modules)\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "False"
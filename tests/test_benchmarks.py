@@ -0,0 +1,40 @@
+"""
+Tests for the benchmark capture generator and result comparison
+"""
+
+from collections import Counter
+from scapy.all import rdpcap, ARP, IPv6, TCP, UDP, ICMP, Dot1Q
+from pcap_hex_editor.capture import PcapIndex
+from benchmarks.generate import generate_capture, JUMBO_SIZE
+from benchmarks.run import parse_size, compare
+
+
+def test_generated_capture_is_reproducible_and_mixed(tmp_path):
+    """The same seed gives the same file, with every protocol of the mix."""
+    first = generate_capture(str(tmp_path / "a.pcap"), 1000, seed=3, jumbo_ratio=0.05)
+    second = generate_capture(str(tmp_path / "b.pcap"), 1000, seed=3, jumbo_ratio=0.05)
+    with open(first, "rb") as f, open(second, "rb") as g:
+        assert f.read() == g.read()
+
+    index = PcapIndex(first)
+    assert len(index) == 1000
+    assert list(index.timestamps) == sorted(index.timestamps)
+    assert max(index.caplens) > 1514
+    assert max(index.caplens) < JUMBO_SIZE
+
+    packets = rdpcap(first)
+    seen = Counter(layer for pkt in packets for layer in (ARP, IPv6, TCP, UDP, ICMP, Dot1Q) if layer in pkt)
+    assert all(seen[layer] for layer in (ARP, IPv6, TCP, UDP, ICMP, Dot1Q))
+
+
+def test_compare_reports_regressions():
+    """Sizes parse with suffixes and only changes past the tolerance count."""
+    assert parse_size("10M") == 10000000
+    assert parse_size("1k") == 1000
+    assert parse_size("500") == 500
+    baseline = {"sizes": {"1000": {"load_s": 1.0, "save_mb_s": 100.0, "select_p50_ms": 10.0}}}
+    results = {"sizes": {"1000": {"load_s": 1.1, "save_mb_s": 70.0, "select_p50_ms": 13.0}}}
+    regressions = compare(results, baseline, 0.2)
+    assert len(regressions) == 2
+    assert any("save_mb_s" in r for r in regressions)
+    assert any("select_p50_ms" in r for r in regressions)
@@ -0,0 +1,663 @@
+"""
+Tests for the indexed capture model
+"""
+
+import os
+import struct
+import pytest
+from scapy.all import rdpcap, wrpcap, Ether, IP, IPv6, UDP, TCP, ICMP, ICMPv6EchoRequest, Dot1Q
+from pcap_hex_editor.capture import (
+    PcapIndex, PacketStore, LRUCache, SummaryLoader, PacketSearch, compile_pattern,
+    DisplayFilter, FilterScan, header_summary, fix_packet, PacketTransform, compile_transform,
+)
+from pcap_hex_editor.capture.merged_index import MergedIndex
+
+TEST_PCAP = os.path.join(os.path.dirname(__file__), "..", "data", "test.pcap")
+
+
+def test_index_matches_rdpcap():
+    """The header-only index agrees with a full scapy read."""
+    index = PcapIndex(TEST_PCAP)
+    packets = rdpcap(TEST_PCAP)
+    assert len(index) == len(packets)
+    assert index.linktype == 1
+    for i, pkt in enumerate(packets):
+        assert index.caplens[i] == len(pkt)
+        assert index.timestamps[i] == pytest.approx(float(pkt.time))
+
+
+def test_index_rejects_non_pcap(tmp_path):
+    """Files without a pcap magic number are refused."""
+    path = tmp_path / "bogus.pcap"
+    path.write_bytes(b"\x00" * 64)
+    with pytest.raises(ValueError):
+        PcapIndex(str(path))
+
+
+def test_store_dissects_on_demand():
+    """Packets come back dissected and edits keep the row timestamp."""
+    store = PacketStore(TEST_PCAP)
+    packets = rdpcap(TEST_PCAP)
+    assert len(store) == len(packets)
+    assert bytes(store[3]) == bytes(packets[3])
+    ts = store.timestamp(3)
+    store[3] = packets[4]
+    assert store.timestamp(3) == ts
+    store.insert(0, packets[1])
+    assert len(store) == len(packets) + 1
+    assert bytes(store[4]) == bytes(packets[4])
+    store.close()
+
+
+def test_store_serves_raw_slices_and_saves(tmp_path):
+    """Unedited packets are memoryviews and saving reproduces the file."""
+    store = PacketStore(TEST_PCAP)
+    assert isinstance(store.raw(0), memoryview)
+    out = tmp_path / "copy.pcap"
+    store.save(str(out))
+    with open(TEST_PCAP, "rb") as f:
+        assert out.read_bytes() == f.read()
+
+    store.replace(2, b"\x00" * 20)
+    store.set_timestamp(5, 1234567890.5)
+    store.save(str(out))
+    saved = rdpcap(str(out))
+    assert bytes(saved[2]) == b"\x00" * 20
+    assert float(saved[5].time) == pytest.approx(1234567890.5)
+    store.close()
+
+
+def test_store_save_copies_runs_and_replaces_atomically(tmp_path):
+    """Moved records are written in their new order and no temp files remain."""
+    store = PacketStore(TEST_PCAP)
+    expected = [bytes(store.raw(i)) for i in range(len(store))]
+    store.move(10, 3)
+    expected.insert(3, expected.pop(10))
+    out = tmp_path / "moved.pcap"
+    out.write_bytes(b"stale")
+    store.save(str(out))
+    assert [bytes(p) for p in rdpcap(str(out))] == expected
+    assert os.listdir(tmp_path) == ["moved.pcap"]
+    store.close()
+
+
+def test_store_patch_overwrites_ranges():
+    """Patching rewrites only the given byte ranges of a packet."""
+    store = PacketStore(TEST_PCAP)
+    original = bytes(store.raw(1))
+    store.patch(1, [(0, b"\xff\xff"), (6, b"\x00")])
+    data = bytes(store.raw(1))
+    assert data[:2] == b"\xff\xff" and data[6:7] == b"\x00"
+    assert data[2:6] == original[2:6] and data[7:] == original[7:]
+    assert store.generation(1) == 1
+    store.close()
+
+
+def test_store_patch_redissects_from_edited_layer():
+    """Patching with the old dissection rebuilds only the layers at and
+    inside the edit, and agrees with dissecting from scratch."""
+    store = PacketStore(TEST_PCAP)
+    for row in range(len(store)):
+        packet = store[row]
+        size = len(store.raw(row))
+        store.patch(row, [(size - 1, b"\x5a")], packet)
+        edited = store[row]
+        assert edited is not packet and edited.original == store.raw(row)
+        assert edited.show(dump=True) == store._dissect(store.raw(row)).show(dump=True)
+        # The untouched link layer is copied, not dissected again
+        assert edited.src == packet.src and edited.payload is not packet.payload
+    store.close()
+
+
+def _pcapng_block(endian, block_type, body):
+    body += b"\0" * (-len(body) % 4)
+    length = struct.pack(endian + "I", len(body) + 12)
+    return struct.pack(endian + "I", block_type) + length + body + length
+
+
+def _pcapng_file(endian, packets):
+    """A pcapng section with a raw-IP interface in nanoseconds, a custom
+    block and packets given as (nanoseconds, bytes, comment)."""
+    blocks = [
+        _pcapng_block(endian, 0x0A0D0D0A, struct.pack(endian + "IHHq", 0x1A2B3C4D, 1, 0, -1)),
+        _pcapng_block(endian, 1, struct.pack(endian + "HHI", 101, 0, 0)
+                      + struct.pack(endian + "HH", 9, 1) + b"\x09\0\0\0" + struct.pack(endian + "HH", 0, 0)),
+        _pcapng_block(endian, 0x00000BAD, b"custom block"),
+    ]
+    for ns, data, comment in packets:
+        option = struct.pack(endian + "HH", 1, len(comment)) + comment + b"\0" * (-len(comment) % 4)
+        blocks.append(_pcapng_block(endian, 6, struct.pack(
+            endian + "IIIII", 0, ns >> 32, ns & 0xffffffff, len(data), len(data),
+        ) + data + b"\0" * (-len(data) % 4) + option + struct.pack(endian + "HH", 0, 0)))
+    return b"".join(blocks)
+
+
+@pytest.mark.parametrize("endian", ["<", ">"])
+def test_store_reads_and_saves_pcapng(tmp_path, endian):
+    """pcapng packets are indexed lazily with their interface's linktype and
+    resolution, and saving keeps the other blocks and packet options."""
+    packets = [(1500000000123456789 + i, bytes(IP(dst="10.0.0.%d" % i) / UDP()), b"note %d" % i)
+               for i in range(3)]
+    source = tmp_path / "in.pcapng"
+    source.write_bytes(_pcapng_file(endian, packets))
+    store = PacketStore(str(source))
+    assert len(store) == 3 and store.linktype == 101
+    assert store.timestamp(1) == pytest.approx(1500000000.123456790)
+    assert store[2][IP].dst == "10.0.0.2"
+
+    # Unchanged files are copied back byte for byte
+    store.save(str(tmp_path / "same.pcapng"))
+    assert (tmp_path / "same.pcapng").read_bytes() == source.read_bytes()
+
+    store.patch(1, [(19, b"\x09")])
+    store.save(str(tmp_path / "out.pcapng"))
+    saved = rdpcap(str(tmp_path / "out.pcapng"))
+    assert [p[IP].dst for p in saved] == ["10.0.0.0", "10.0.0.9", "10.0.0.2"]
+    assert saved[1].comments == [b"note 1"]
+    assert b"custom block" in (tmp_path / "out.pcapng").read_bytes()
+    reopened = PacketStore(str(tmp_path / "out.pcapng"))
+    assert reopened.timestamp(1) == store.timestamp(1)
+    # Edited packets keep their block's timestamp to the nanosecond
+    assert list(reopened.index.units) == [ns for ns, _, _ in packets]
+    reopened.close()
+    store.close()
+
+
+def test_store_save_keeps_nanosecond_timestamps(tmp_path):
+    """Timestamps are written back from the record headers, or exactly from edited values."""
+    header = struct.pack("<IHHiIII", 0xa1b23c4d, 2, 4, 0, 0, 65535, 1)
+    data = bytes(Ether() / IP() / UDP())
+    records = b"".join(struct.pack("<IIII", 1700000000 + i, 123456789, len(data), len(data)) + data
+                       for i in range(3))
+    source = tmp_path / "nsec.pcap"
+    source.write_bytes(header + records)
+    store = PacketStore(str(source))
+    store.patch(0, [(0, b"\x02")])
+    store.set_timestamp(2, 1700000002.25)
+    store.save(str(tmp_path / "out.pcap"))
+    saved = PcapIndex(str(tmp_path / "out.pcap"))
+    assert list(zip(saved.secs, saved.fracs)) == [
+        (1700000000, 123456789), (1700000001, 123456789), (1700000002, 250000000),
+    ]
+    store.close()
+
+
+def _split_capture(tmp_path, parts):
+    """Write the records of the test capture to files by part number."""
+    packets = rdpcap(TEST_PCAP)
+    filenames = []
+    for part in range(max(parts) + 1):
+        filenames.append(str(tmp_path / f"part{part}.pcap"))
+        wrpcap(filenames[-1], [p for p, n in zip(packets, parts) if n == part])
+    return packets, filenames
+
+
+@pytest.mark.parametrize("rotated", [True, False])
+def test_store_merges_files_in_time_order(tmp_path, rotated):
+    """Several files open as one time-ordered capture, and saving writes
+    each file's rows back to a file of its own."""
+    parts = [i * 3 // 30 for i in range(30)] if rotated else [i % 3 for i in range(30)]
+    packets, filenames = _split_capture(tmp_path, parts)
+    store = PacketStore(filenames)
+    order = sorted(range(30), key=lambda i: (float(packets[i].time), parts[i]))
+    assert len(store) == 30
+    assert [bytes(store.raw(row)) for row in range(30)] == [bytes(packets[i]) for i in order]
+    assert [store.timestamp(row) for row in range(30)] == pytest.approx([float(packets[i].time) for i in order])
+    assert [m[0] for c in PacketSearch(store, compile_pattern("INVITE"), max_workers=0) for m in c] == [
+        row for row in range(30) if b"INVITE" in bytes(store.raw(row))]
+
+    store.patch(4, [(0, b"\xff")])
+    store.insert(5, Ether() / IP(dst="10.9.9.9"))
+    outputs = [str(tmp_path / f"out{part}.pcap") for part in range(3)]
+    store.save(outputs)
+    saved = [rdpcap(name) for name in outputs]
+    assert sum(len(p) for p in saved) == 31
+    edited_part = parts[order[4]]
+    assert bytes(saved[edited_part][[bytes(p)[:1] for p in saved[edited_part]].index(b"\xff")])[1:] == \
+        bytes(packets[order[4]])[1:]
+    assert any(IP in p and p[IP].dst == "10.9.9.9" for p in saved[edited_part])
+    with pytest.raises(ValueError):
+        store.save(outputs[0])
+    store.close()
+
+
+def test_store_notifies_listeners():
+    """Edits are reported as row-level changes."""
+
+    class Recorder:
+        def __init__(self):
+            self.events = []
+
+        def rows_changed(self, first, last):
+            self.events.append(("changed", first, last))
+
+        def rows_inserted(self, row, count):
+            self.events.append(("inserted", row, count))
+
+        def rows_removed(self, row, count):
+            self.events.append(("removed", row, count))
+
+        def rows_moved(self, row, new_row):
+            self.events.append(("moved", row, new_row))
+
+    store = PacketStore(TEST_PCAP)
+    recorder = Recorder()
+    store.add_listener(recorder)
+    store.set_timestamp(7, 1.0)
+    store.replace(8, b"\x00")
+    store.insert(9, store[1])
+    store.move(9, 2)
+    store.remove(2)
+    assert recorder.events == [
+        ("changed", 7, 7),
+        ("changed", 8, 8),
+        ("inserted", 9, 1),
+        ("moved", 9, 2),
+        ("removed", 2, 1),
+    ]
+    store.close()
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_store_bulk_timestamp_operations(monkeypatch, use_numpy):
+    """Shift, scale and re-space change a range and report it as one change."""
+    from pcap_hex_editor.capture import packet_store
+    if not use_numpy:
+        monkeypatch.setattr(packet_store, "numpy", None)
+    elif packet_store.numpy is None:
+        pytest.skip("numpy is not installed")
+    store = PacketStore(TEST_PCAP)
+
+    class Recorder:
+        def __init__(self):
+            self.changes = []
+
+        def rows_changed(self, first, last):
+            self.changes.append((first, last))
+
+    recorder = Recorder()
+    store.add_listener(recorder)
+    before = [store.timestamp(i) for i in range(len(store))]
+    store.shift_timestamps(100.0)
+    assert [store.timestamp(i) for i in range(len(store))] == pytest.approx([t + 100 for t in before])
+    store.scale_timestamps(0.5, 2, 5)
+    assert store.timestamp(2) == pytest.approx(before[2] + 100)
+    assert store.timestamp(5) == pytest.approx(before[2] + 100 + (before[5] - before[2]) / 2)
+    store.space_timestamps(0.25, 10, 12, start=50.0)
+    assert [store.timestamp(i) for i in (10, 11, 12)] == [50.0, 50.25, 50.5]
+    assert recorder.changes == [(0, len(store) - 1), (2, 5), (10, 12)]
+    store.remove_listener(recorder)
+    store.insert(0, store[1])  # The timestamps can still grow afterwards
+    with pytest.raises(IndexError):
+        store.shift_timestamps(1.0, 5, len(store))
+    store.close()
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_store_time_order(monkeypatch, use_numpy):
+    """Out-of-order rows are tracked through edits and time lookups use them."""
+    from pcap_hex_editor.capture import packet_store
+    if not use_numpy:
+        monkeypatch.setattr(packet_store, "numpy", None)
+    elif packet_store.numpy is None:
+        pytest.skip("numpy is not installed")
+    store = PacketStore(TEST_PCAP)
+    store.space_timestamps(1.0, start=100.0)
+    assert store.chronological and store.out_of_order_regions() == []
+    assert store.find_time(104.5) == 5
+    assert store.find_time(1000.0) == len(store)
+
+    packet = store[0]
+    packet.time = 110.0
+    assert store.insert_chronological(packet) == 11
+    store.remove(11)
+
+    store.set_timestamp(6, 102.5)
+    store.set_timestamp(20, 0.0)
+    store.set_timestamp(21, 1.0)
+    assert not store.chronological
+    assert store.out_of_order_regions() == [(6, 6), (20, 21)]
+    assert store.find_time(110.0) == 10
+    assert store.chronological_row(108.5, near=9) == 9
+    # Before the first later packet, not after the out-of-order ones at the end
+    assert store.chronological_row(108.5) == 9
+    assert store.chronological_row(0.5) == 0
+    assert store.chronological_row(200.0) == len(store)
+    store.move(6, 3)
+    assert store.out_of_order_regions() == [(20, 21)]
+    store.remove(20)
+    store.remove(20)
+    assert store.chronological
+    store.close()
+
+
+def test_header_summary_agrees_with_scapy():
+    """The scapy-free summaries name the same layers and addresses."""
+    store = PacketStore(TEST_PCAP)
+    for row in range(len(store)):
+        quick = header_summary(store.raw(row), store.linktype)
+        full = store[row].summary()
+        assert full.split(" ")[0] == quick.split(" ")[0]
+        for word in quick.split(" "):
+            if word.count(".") == 3:
+                assert word.split(":")[0] in full
+    assert header_summary(bytes(IP(src="10.0.0.1") / UDP(sport=53, dport=1234)), 101) == \
+        "IP / UDP 10.0.0.1:53 > 127.0.0.1:1234"
+    store.close()
+
+
+def _rebuilt(data):
+    """data with its lengths and checksums computed by scapy."""
+    packet = Ether(bytes(data))
+    for layer, fields in ((IP, ("len", "chksum")), (IPv6, ("plen",)), (UDP, ("len", "chksum")),
+                          (TCP, ("chksum",)), (ICMP, ("chksum",)), (ICMPv6EchoRequest, ("cksum",))):
+        if layer in packet:
+            for field in fields:
+                setattr(packet[layer], field, None)
+    return bytes(Ether(bytes(packet)))
+
+
+@pytest.mark.parametrize("packet", [
+    Ether() / IP(src="10.0.0.1", dst="10.0.0.2") / TCP(sport=1024, dport=80) / b"GET / HTTP/1.1",
+    Ether() / Dot1Q(vlan=7) / IP() / UDP(sport=53, dport=5353) / b"query",
+    Ether() / IP() / ICMP() / (b"ping" * 20),
+    Ether() / IPv6(src="fd00::1", dst="fd00::2") / UDP() / b"odd",
+    Ether() / IPv6() / ICMPv6EchoRequest(data=b"echo"),
+], ids=["tcp", "vlan-udp", "icmp", "ipv6-udp", "icmpv6"])
+def test_fix_packet_updates_checksums_incrementally(packet):
+    """Checksums updated from the edited words match a full recomputation."""
+    old = bytes(packet)
+    l3 = len(old) - len(packet[IP if IP in packet else IPv6])
+    addresses = (l3 + 12, 8) if IP in packet else (l3 + 8, 32)
+    for offset, size in (addresses, (len(old) - 3, 3), (l3 + 8, 1)):
+        data = bytearray(old)
+        data[offset:offset + size] = bytes(range(0x41, 0x41 + size))
+        changed = fix_packet(data, 1, old, [(offset, offset + size)])
+        assert bytes(data) == _rebuilt(data)
+        assert changed
+
+    if IP in packet:
+        # A checksum the edit wrote is kept
+        data = bytearray(old)
+        data[l3 + 8:l3 + 12] = b"\x01\x00\x12\x34"
+        fix_packet(data, 1, old, [(l3 + 8, l3 + 12)])
+        assert data[l3 + 10:l3 + 12] == b"\x12\x34"
+
+
+def test_fix_packet_sets_lengths_from_the_capture():
+    """Grown packets get their lengths fixed and the new bytes checksummed;
+    padded and truncated packets keep theirs."""
+    grown = bytearray(bytes(Ether() / IP() / UDP() / (b"payload" * 4)) + b"more bytes")
+    assert fix_packet(grown) != []
+    assert bytes(grown) == _rebuilt(grown)
+    assert grown[16:18] == (len(grown) - 14).to_bytes(2, "big")
+
+    padded = bytearray(bytes(Ether() / IP() / TCP()) + bytes(6))
+    assert fix_packet(padded) == []
+    truncated = bytearray(bytes(Ether() / IP() / UDP() / (b"x" * 100))[:60])
+    assert fix_packet(truncated, wirelen=142) == []
+    assert fix_packet(bytearray(b"\xff" * 60)) == []
+
+
+def test_store_fixup_after_raw_edits(tmp_path):
+    """Patches can fix up as they go, or later for all packets in one undoable edit."""
+    path = tmp_path / "fixup.pcap"
+    packets = [Ether() / IP(src="10.0.0.1") / UDP() / (b"payload" * 4), Ether() / IP() / TCP() / (b"data" * 8)]
+    wrpcap(str(path), packets * 3)
+    store = PacketStore(str(path))
+    store.patch(0, [(26, b"\xc0\xa8")], store[0], fixup=True)
+    assert bytes(store.raw(0)) == _rebuilt(store.raw(0))
+    assert store[0][IP].src == "192.168.0.1"
+
+    store.patch(1, [(len(store.raw(1)) - 1, b"!")])
+    store.replace(3, bytes(store.raw(3)) + b"tail")
+    assert bytes(store.raw(1)) != _rebuilt(store.raw(1))
+    before = [bytes(store.raw(row)) for row in range(len(store))]
+    assert store.fixup() == 2
+    for row in range(len(store)):
+        assert bytes(store.raw(row)) == _rebuilt(store.raw(row))
+    assert store.fixup() == 0
+    store.undo()
+    assert [bytes(store.raw(row)) for row in range(len(store))] == before
+    store.redo()
+    assert bytes(store.raw(3)) == _rebuilt(store.raw(3))
+    store.close()
+
+
+def test_lru_cache_bounds_and_counts():
+    """The cache evicts the least recently used entry and counts lookups."""
+    cache = LRUCache(2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert cache.get("b") is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_store_key_changes_on_edit():
+    """Editing a packet gives it a new cache key; moving it does not."""
+    store = PacketStore(TEST_PCAP)
+    key = store.key(4)
+    store.move(4, 0)
+    assert store.key(0) == key
+    store.set_timestamp(0, 2.0)
+    assert store.key(0) != key
+    store.close()
+
+
+def _store_state(store):
+    return [bytes(store.raw(row)) for row in range(len(store))], list(store._timestamps)
+
+
+def test_store_undo_redo_steps_through_edits(tmp_path):
+    """Every kind of edit can be undone and redone, back to the file."""
+    store = PacketStore(TEST_PCAP)
+    states = [_store_state(store)]
+    edits = [
+        lambda: store.patch(1, [(0, b"\xff\xff")]),
+        lambda: store.patch(1, [(4, b"\x00")]),
+        lambda: store.__setitem__(2, IP() / UDP()),
+        lambda: store.insert(3, IP(dst="10.1.2.3")),
+        lambda: store.remove(5),
+        lambda: store.move(0, 7),
+        lambda: store.set_timestamp(6, 12.5),
+        lambda: store.shift_timestamps(3600.125, 2, 9),
+        lambda: store.scale_timestamps(0.5),
+        lambda: store.space_timestamps(0.01, 10, 20),
+    ]
+    for edit in edits:
+        edit()
+        states.append(_store_state(store))
+    for state in reversed(states[:-1]):
+        assert store.undo() is not None
+        assert _store_state(store) == state
+    assert store.undo() is None
+    # Undone edits of the file's records leave nothing edited behind
+    assert not store._data
+    store.save(str(tmp_path / "same.pcap"))
+    with open(TEST_PCAP, "rb") as f:
+        assert (tmp_path / "same.pcap").read_bytes() == f.read()
+    for state in states[1:]:
+        store.redo()
+        assert _store_state(store) == state
+    assert store.redo() is None
+    store.close()
+
+
+def test_store_journal_keeps_deltas_under_its_limit():
+    """Journal entries hold only the changed bytes, and the oldest entries
+    are dropped beyond the memory limit."""
+    store = PacketStore(TEST_PCAP, undo_limit=2000)
+    store.replace(0, bytes(store.raw(0)) + b"\x00" * 300)
+    store.patch(0, [(10, b"\x01")])
+    assert store.journal.size < 1000
+    for row in range(1, 10):
+        store.patch(row, [(0, b"\x00" * 100)])
+    assert store.journal.size <= 2000
+    while store.undo() is not None:
+        pass
+    assert store.raw(1) == bytes(100) + bytes(store.raw(1))[100:]
+    assert bytes(store.raw(9))[:100] != bytes(100)
+    store.close()
+
+
+def test_summary_loader_matches_scapy():
+    """Summaries computed in worker processes match in-process dissection."""
+    store = PacketStore(TEST_PCAP)
+    chunks = list(SummaryLoader(store, chunk_size=8, max_workers=1))
+    assert [first for first, _ in chunks] == [0, 8, 16, 24]
+    summaries = [summary for _, chunk in chunks for summary in chunk]
+    assert summaries == [store[i].summary() for i in range(len(store))]
+    store.close()
+
+
+@pytest.mark.parametrize("max_workers", [0, 1])
+def test_search_finds_raw_bytes(max_workers):
+    """Searches scan raw bytes of file and edited packets, in row order."""
+    store = PacketStore(TEST_PCAP)
+    store.replace(20, b"xxINVITE")
+    pattern = compile_pattern("INVITE")
+    found = [m for chunk in PacketSearch(store, pattern, chunk_size=8, max_workers=max_workers) for m in chunk]
+    expected = []
+    for row in range(len(store)):
+        data = bytes(store.raw(row))
+        if b"INVITE" in data:
+            start = data.index(b"INVITE")
+            expected.append((row, start, start + 6))
+    assert found == expected
+    assert (20, 2, 8) in found
+    # Regex anchors apply to each packet, not to the file
+    anchored = compile_pattern("^xx", "regex")
+    assert [m for chunk in PacketSearch(store, anchored, max_workers=0) for m in chunk] == [(20, 0, 2)]
+    with pytest.raises(ValueError):
+        compile_pattern("zz", "hex")
+    store.close()
+
+
+def test_merged_index_reads_the_parts_and_sorts_unordered_ones(tmp_path):
+    """Record ids are looked up in the parts' own arrays, and a part out of
+    time order is sorted in with the others rather than heap merged."""
+    times = [[3, 1, 5], [2, 4]]
+    filenames = []
+    for part, part_times in enumerate(times):
+        packets = [Ether() / IP(dst=f"10.0.{part}.{i}") / UDP() for i in range(len(part_times))]
+        for packet, time in zip(packets, part_times):
+            packet.time = 1700000000 + time
+        filenames.append(str(tmp_path / f"part{part}.pcap"))
+        wrpcap(filenames[-1], packets)
+    index = MergedIndex(filenames)
+    assert len(index) == 5 and list(index.bases) == [0, 3]
+    assert index.offsets[4] == index.parts[1].offsets[1]
+    assert list(index.caplens[2:5]) == [index.parts[0].caplens[2]] + list(index.parts[1].caplens)
+    order, timestamps = index.merged_order()
+    assert list(timestamps) == [1700000000 + t for t in range(1, 6)]
+    assert list(order) == [1, 3, 0, 4, 2]
+    store = PacketStore(filenames)
+    assert [store[row][IP].dst for row in range(5)] == ["10.0.0.1", "10.0.1.0", "10.0.0.0", "10.0.1.1", "10.0.0.2"]
+    store.close()
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("udp", lambda p: UDP in p),
+    ("ip.src == 200.57.7.195", lambda p: IP in p and p[IP].src == "200.57.7.195"),
+    ("ip.addr == 200.57.7.0/24 and not udp.port == 5060",
+     lambda p: IP in p and "200.57.7." in p[IP].src + p[IP].dst
+     and not (UDP in p and 5060 in (p[UDP].sport, p[UDP].dport))),
+    ("frame.len in {100..500}", lambda p: 100 <= p.wirelen <= 500),
+    ("udp.port in {5060 8000..9000} || tcp",
+     lambda p: TCP in p or UDP in p and any(port == 5060 or 8000 <= port <= 9000
+                                             for port in (p[UDP].sport, p[UDP].dport))),
+])
+def test_display_filter_matches_scapy(text, expected):
+    """Compiled filters over raw bytes agree with the dissected packets."""
+    store = PacketStore(TEST_PCAP)
+    rows = [row for chunk in FilterScan(store, DisplayFilter(text), chunk_size=7, max_workers=0) for row in chunk]
+    assert rows == [row for row in range(len(store)) if expected(store[row])]
+    store.close()
+
+
+def test_display_filter_rejects_bad_filters():
+    """Malformed filters fail to compile with a ValueError."""
+    for text in ("ip.src == 5", "bogus", "udp and", "(udp", "ip.addr == 300.1.1.1"):
+        with pytest.raises(ValueError):
+            DisplayFilter(text)
+
+
+def test_filter_scan_in_worker_processes():
+    """Worker processes recompile the filter and see edited packets too."""
+    store = PacketStore(TEST_PCAP)
+    store.replace(3, bytes(store[0]))
+    serial = [row for chunk in FilterScan(store, DisplayFilter("udp"), max_workers=0) for row in chunk]
+    parallel = [row for chunk in FilterScan(store, DisplayFilter("udp"), chunk_size=8, max_workers=2) for row in chunk]
+    assert parallel == serial and 3 in serial
+    store.close()
+
+
+def test_display_filter_uses_each_records_linktype(tmp_path):
+    """Records of a merged capture are filtered with their own file's linktype."""
+    ether = [Ether() / IP(dst="10.0.0.1") / UDP(), Ether() / IP(dst="10.0.0.2") / TCP()]
+    raw = [IP(dst="10.0.0.3") / UDP(), IP(dst="10.0.0.4") / TCP()]
+    for i, packet in enumerate(ether + raw):
+        packet.time = 1700000000 + i
+    wrpcap(str(tmp_path / "ether.pcap"), ether)
+    wrpcap(str(tmp_path / "raw.pcap"), raw, linktype=101)
+    store = PacketStore([str(tmp_path / "ether.pcap"), str(tmp_path / "raw.pcap")])
+    assert [store.linktype_at(row) for row in range(4)] == [1, 1, 101, 101]
+    for max_workers in (0, 2):
+        scan = FilterScan(store, DisplayFilter("udp and ip.dst == 10.0.0.0/24", store.linktype),
+                          max_workers=max_workers)
+        assert [row for chunk in scan for row in chunk] == [0, 2]
+    display_filter = DisplayFilter("tcp", store.linktype)
+    assert display_filter(bytes(raw[1]), len(raw[1]), 0, 101)
+    assert not display_filter(bytes(raw[1]), len(raw[1]), 0)
+    store.close()
+
+
+@pytest.mark.parametrize("text", [
+    "setattr(pkt[IP], 'ttl', 64) if UDP in pkt else pkt",
+    "lambda p: p if UDP not in p else setattr(p[IP], 'ttl', 64)",
+    "if UDP in pkt: pkt[IP].ttl = 64",
+], ids=["expression", "lambda", "statements"])
+def test_transform_rewrites_packets_in_one_edit(tmp_path, text):
+    """Transformed packets keep valid checksums and are written as one undoable edit."""
+    path = tmp_path / "transform.pcap"
+    packets = [Ether() / IP(ttl=5) / UDP() / (b"payload" * 4), Ether() / IP(ttl=5) / TCP() / (b"data" * 8)]
+    wrpcap(str(path), packets * 4)
+    store = PacketStore(str(path))
+    before = [bytes(store.raw(row)) for row in range(len(store))]
+    serial = list(PacketTransform(store, text, max_workers=0))
+    parallel = list(PacketTransform(store, text, range(len(store)), chunk_size=3, max_workers=2))
+    changes = [change for _, chunk, _, _ in serial for change in chunk]
+    assert changes == [change for _, chunk, _, _ in parallel for change in chunk]
+    assert [row for row, _, _ in changes] == [0, 2, 4, 6]
+    assert sum(count for count, _, _, _ in parallel) == len(store)
+
+    assert store.replace_rows([row for row, _, _ in changes], [data for _, _, data in changes]) == 4
+    for row in range(len(store)):
+        assert bytes(store.raw(row)) == _rebuilt(store.raw(row))
+        assert store[row][IP].ttl == (64 if row % 2 == 0 else 5)
+    store.undo()
+    assert [bytes(store.raw(row)) for row in range(len(store))] == before
+    store.redo()
+    assert store[6][IP].ttl == 64
+    store.close()
+
+
+def test_transform_reports_failures():
+    """Packets the transform fails on are counted and left alone; bad syntax fails early."""
+    store = PacketStore(TEST_PCAP)
+    chunks = list(PacketTransform(store, "pkt[TCP].payload", max_workers=0))
+    failed = sum(chunk_failed for _, _, chunk_failed, _ in chunks)
+    changed = sum(len(changes) for _, changes, _, _ in chunks)
+    assert failed and failed + changed <= len(store)
+    assert all("IndexError" in message for _, _, _, errors in chunks for _, message in errors)
+    for text in ("", "pkt[IP].ttl ="):
+        with pytest.raises(ValueError):
+            compile_transform(text)
+    store.close()
+
+
+if __name__ == "__main__":
+    pytest.main([__file__])
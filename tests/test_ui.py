@@ -0,0 +1,235 @@
+"""
+Pilot tests of the panels of the PCAP Hex Editor
+"""
+
+import asyncio
+import os
+from scapy.all import Ether, IP, TCP, UDP
+from textual.worker import WorkerState
+from pcap_hex_editor import PcapHexEditorApp
+from pcap_hex_editor.capture import scapy_loaded
+from pcap_hex_editor.profiler import profiler
+from pcap_hex_editor.ui import FilterModal
+from benchmarks.generate import generate_capture
+
+TEST_PCAP = os.path.join(os.path.dirname(__file__), "..", "data", "test.pcap")
+
+
+def run_app(check, filename=TEST_PCAP, size=(160, 48)):
+    """Run check(app, pilot) against the app once scapy has loaded."""
+    async def run():
+        app = PcapHexEditorApp(filename)
+        async with app.run_test(size=size) as pilot:
+            while not scapy_loaded():
+                await pilot.pause(0.05)
+            await pilot.pause()
+            await check(app, pilot)
+            assert not [w for w in app.workers if w.state == WorkerState.ERROR]
+    asyncio.run(run())
+
+
+async def wait_for_dissection(app, pilot):
+    for _ in range(200):
+        if not app.dissection_panel.dissecting:
+            return
+        await pilot.pause(0.01)
+    raise AssertionError("dissection did not finish")
+
+
+def test_dissection_of_the_latest_selection_wins():
+    """Quick selections show the placeholder, then only the last packet's dissection."""
+    async def check(app, pilot):
+        panel = app.dissection_panel
+        shown = []
+        show = panel._show
+        panel._show = lambda text: (shown.append(text), show(text))
+        app.render_cache.clear()
+        for row in range(1, 11):
+            app.packet_list_panel.select(row)
+        assert panel.dissecting
+        await wait_for_dissection(app, pilot)
+        final = app.packets[10].show(dump=True)
+        assert panel.text == final
+        assert set(shown) == {panel.DISSECTING_PLACEHOLDER, final}
+        # The stale workers were cancelled and the panel still follows selections
+        app.packet_list_panel.select(3)
+        await wait_for_dissection(app, pilot)
+        assert panel.text == app.packets[3].show(dump=True)
+    run_app(check)
+
+
+def test_render_cache_is_keyed_by_generation(monkeypatch):
+    """Reselecting a packet reuses its dissection; an edit renders the new bytes."""
+    monkeypatch.setattr(profiler, "enabled", True)
+
+    async def check(app, pilot):
+        panel = app.dissection_panel
+        app.packet_list_panel.select(2)
+        await wait_for_dissection(app, pilot)
+        app.packet_list_panel.select(4)
+        await wait_for_dissection(app, pilot)
+
+        dissections = profiler.stats()["operations"]["show"]["count"]
+        hits = app.render_cache.hits
+        app.packet_list_panel.select(2)
+        assert not panel.dissecting
+        assert panel.text == app.packets[2].show(dump=True)
+        assert app.render_cache.hits > hits
+        await pilot.pause()
+        assert profiler.stats()["operations"]["show"]["count"] == dissections
+
+        # The IPv4 TTL; the edit bumps the packet's generation
+        app.on_hex_edit([(22, b"\x09")])
+        assert panel.dissecting
+        await wait_for_dissection(app, pilot)
+        assert "ttl       = 9" in panel.text
+        assert profiler.stats()["operations"]["show"]["count"] == dissections + 1
+    run_app(check)
+
+
+def _spy(calls, function):
+    def spy(arg):
+        calls.append(arg)
+        return function(arg)
+    return spy
+
+
+def test_hex_view_formats_only_visible_lines():
+    """A large packet costs a viewport of formatted lines, scrolled or not."""
+    async def check(app, pilot):
+        app.packets.replace(0, bytes(range(256)) * 40)
+        app.packet_list_panel.select(0)
+        await pilot.pause()
+        view = app.hex_editor_panel.hex_view
+        assert view.line_count == 640 and view.virtual_size.height == 640
+        lines = []
+        view.line_callback = _spy(lines, view.line_callback)
+        view.refresh()
+        await pilot.pause()
+        assert lines and set(lines) <= set(range(view.page_size))
+        lines.clear()
+        view.scroll_to(y=300, animate=False)
+        await pilot.pause()
+        top = round(view.scroll_y)
+        assert top == 300 and lines and set(lines) <= set(range(top, top + view.page_size))
+    run_app(check)
+
+
+def test_packet_list_renders_only_visible_and_changed_rows(tmp_path):
+    """The list formats the rows in view, tracks the store's length and
+    redraws only the lines of changed rows."""
+    filename = generate_capture(str(tmp_path / "large.pcap"), 5000)
+
+    async def check(app, pilot):
+        panel = app.packet_list_panel
+        view = panel.list_view
+        rows = []
+        view.row_text_callback = _spy(rows, view.row_text_callback)
+        view.invalidate()
+        await pilot.pause()
+        assert rows and set(rows) <= set(range(view.page_size))
+        assert view.virtual_size.height == len(app.packets) == 5000
+
+        app.packets.insert(3, app.packets[0])
+        await pilot.pause()
+        assert view.virtual_size.height == 5001
+        app.packets.remove(10)
+        app.packets.remove(10)
+        await pilot.pause()
+        assert view.virtual_size.height == 4999
+        app.packets.move(1, 4)
+        await pilot.pause()
+        assert view.virtual_size.height == 4999 == view.row_count
+
+        lines = []
+        view.render_line = _spy(lines, view.render_line)
+        rows.clear()
+        app.packets.replace(5, bytes(app.packets.raw(6)))
+        await pilot.pause()
+        assert rows == [5]
+        assert set(lines) == {5}
+    run_app(check, filename)
+
+
+async def wait_for_filter(app, pilot):
+    for _ in range(200):
+        if app.packet_list_panel._filter_running is None:
+            return
+        await pilot.pause(0.01)
+    raise AssertionError("filter did not finish")
+
+
+def test_filter_result_follows_rows_shifted_during_the_scan():
+    """Inserts, removals and moves while a filter scans make it scan again,
+    so the list never shows rows numbered before the change."""
+    async def check(app, pilot):
+        panel = app.packet_list_panel
+        panel.apply_filter("udp")
+        app.packets.insert(0, Ether() / IP() / TCP())
+        app.packets.remove(4)
+        app.packets.move(1, 6)
+        await wait_for_filter(app, pilot)
+        assert panel.filter_text == "udp"
+        assert list(panel.view_rows) == [row for row in range(len(app.packets)) if UDP in app.packets[row]]
+    run_app(check)
+
+
+def test_search_steps_through_the_hits_the_filter_shows():
+    """n/N and the jump to the first hit skip hits in packets the filter hides."""
+    async def check(app, pilot):
+        panel = app.packet_list_panel
+        panel.apply_filter("udp")
+        await wait_for_filter(app, pilot)
+        shown = list(panel.view_rows)
+        panel.select(2)
+        # Hits in all of the first 22 packets, TCP ones among them
+        panel.search("c839", "hex")
+        while [w for w in app.workers if w.group == "search" and not w.is_finished]:
+            await pilot.pause(0.01)
+        hits = [row for row in panel.match_rows if row in shown]
+        assert len(hits) < len(panel.match_rows) and panel.selected_index == 2
+        panel.next_match(1)
+        assert panel.selected_index == hits[hits.index(2) + 1]
+        panel.select(hits[-1])
+        panel.next_match(1)
+        assert panel.selected_index == hits[0]
+        panel.next_match(-1)
+        assert panel.selected_index == hits[-1]
+        assert panel.match_at(panel.selected_index) is not None
+    run_app(check)
+
+
+def test_invalid_filter_and_search_are_reported():
+    """Filters and patterns that do not parse show their error in the status bar."""
+    async def check(app, pilot):
+        panel = app.packet_list_panel
+        status_bar = app.query_one("#status-bar")
+        panel.apply_filter("udp and")
+        await pilot.pause()
+        assert app.status_message.startswith("Invalid filter:")
+        assert app.status_message in str(status_bar.render())
+        assert panel.view_rows is None
+        panel.search("zz", "hex")
+        await pilot.pause()
+        assert app.status_message.startswith("Invalid search pattern:")
+        assert app.status_message in str(status_bar.render())
+    run_app(check)
+
+
+def test_filter_modal_applies_the_filter():
+    """The filter dialog starts from the current filter and applies what is entered."""
+    async def check(app, pilot):
+        panel = app.packet_list_panel
+        panel.open_filter()
+        await pilot.pause()
+        assert isinstance(app.screen, FilterModal)
+        await pilot.press(*"udp", "enter")
+        await wait_for_filter(app, pilot)
+        assert panel.filter_text == "udp" and len(panel.view_rows) < len(app.packets)
+        panel.open_filter()
+        await pilot.pause()
+        assert app.screen.filter_input.value == "udp"
+        await pilot.press("escape")
+        await pilot.pause()
+        assert not isinstance(app.screen, FilterModal) and panel.filter_text == "udp"
+    run_app(check)